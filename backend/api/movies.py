@@ -1,121 +1,12 @@
 """
-Movies API endpoints (cleaned)
-Uses current_app.db_manager provided by server initialization
-"""
-
-from flask import Blueprint, jsonify, request, current_app
-
-movies_bp = Blueprint('movies', __name__)
-
-
-@movies_bp.route('/movies', methods=['GET'])
-def get_all_movies():
-    try:
-        db = current_app.db_manager
-        limit = request.args.get('limit', 100, type=int)
-        offset = request.args.get('offset', 0, type=int)
-
-        movies = db.get_all_movies() or []
-        total = len(movies)
-        page = movies[offset: offset + limit]
-
-        return jsonify({'success': True, 'count': len(page), 'total': total, 'offset': offset, 'limit': limit, 'movies': page}), 200
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-
-@movies_bp.route('/movies/<int:movie_id>', methods=['GET'])
-def get_movie_details(movie_id):
-    try:
-        db = current_app.db_manager
-        movie = db.get_movie_by_id(movie_id)
-        if not movie:
-            return jsonify({'success': False, 'error': 'Film non trouvé'}), 404
-
-        # attach ratings info
-        ratings = db.ratings_df[db.ratings_df['movieId'] == movie_id] if db.ratings_df is not None else None
-        if ratings is not None and not ratings.empty:
-            movie['avg_rating'] = round(float(ratings['rating'].mean()), 2)
-            movie['num_ratings'] = int(len(ratings))
-            movie['rating_distribution'] = {
-                '5': int((ratings['rating'] == 5.0).sum()),
-                '4': int(((ratings['rating'] >= 4.0) & (ratings['rating'] < 5.0)).sum()),
-                '3': int(((ratings['rating'] >= 3.0) & (ratings['rating'] < 4.0)).sum()),
-                '2': int(((ratings['rating'] >= 2.0) & (ratings['rating'] < 3.0)).sum()),
-                '1': int((ratings['rating'] < 2.0).sum())
-            }
-        else:
-            movie.update({'avg_rating': None, 'num_ratings': 0, 'rating_distribution': None})
-
-        return jsonify({'success': True, 'movie': movie}), 200
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-
-@movies_bp.route('/movies/search', methods=['GET'])
-def search_movies():
-    try:
-        q = request.args.get('q', '').strip()
-        limit = request.args.get('limit', 50, type=int)
-        if not q:
-            return jsonify({'success': False, 'error': 'q parameter is required'}), 400
-        db = current_app.db_manager
-        movies = db.search_movies(q)[:limit]
-        return jsonify({'success': True, 'query': q, 'count': len(movies), 'movies': movies}), 200
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-
-@movies_bp.route('/movies/genre/<genre>', methods=['GET'])
-def get_movies_by_genre(genre):
-    try:
-        limit = request.args.get('limit', 50, type=int)
-        if not genre.strip():
-            return jsonify({'success': False, 'error': 'Genre cannot be empty'}), 400
-        db = current_app.db_manager
-        movies = db.get_movies_by_genre(genre)[:limit]
-        return jsonify({'success': True, 'genre': genre, 'count': len(movies), 'movies': movies}), 200
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-
-@movies_bp.route('/movies/popular', methods=['GET'])
-def get_popular_movies():
-    try:
-        n = request.args.get('n', 10, type=int)
-        db = current_app.db_manager
-        movies = db.get_popular_movies(n)
-        return jsonify({'success': True, 'count': len(movies), 'movies': movies}), 200
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-
-@movies_bp.route('/movies/genres', methods=['GET'])
-def get_all_genres():
-    try:
-        db = current_app.db_manager
-        genres = db.get_all_genres()
-        return jsonify({'success': True, 'count': len(genres), 'genres': genres}), 200
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-"""
 Movies API endpoints
 Handles movie-related operations
 """
 
-from flask import Blueprint, jsonify, request
-import sys
-import os
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from database.db_manager import DatabaseManager
+from flask import Blueprint, jsonify, request, current_app
 
 movies_bp = Blueprint('movies', __name__)
 
-# Initialize database manager
-db = DatabaseManager()
-
 
 @movies_bp.route('/movies', methods=['GET'])
 def get_all_movies():
@@ -124,6 +15,7 @@ def get_all_movies():
     Query params: page, per_page
     """
     try:
+        db = current_app.db_manager
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
@@ -152,6 +44,7 @@ def get_all_movies():
 def get_movie_by_id(movie_id):
     """Get a specific movie by ID"""
     try:
+        db = current_app.db_manager
         movie = db.get_movie_by_id(movie_id)
         
         if movie is None:
@@ -197,6 +90,7 @@ def search_movies():
     Query params: q (query string), page, per_page
     """
     try:
+        db = current_app.db_manager
         query = request.args.get('q', '', type=str)
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
@@ -236,6 +130,7 @@ def get_movies_by_genre(genre):
     Query params: page, per_page
     """
     try:
+        db = current_app.db_manager
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
@@ -268,6 +163,7 @@ def get_popular_movies():
     Query params: n (number of movies), min_ratings (minimum rating count)
     """
     try:
+        db = current_app.db_manager
         n = request.args.get('n', 10, type=int)
         min_ratings = request.args.get('min_ratings', 10, type=int)
         
@@ -290,6 +186,7 @@ def get_popular_movies():
 def get_all_genres():
     """Get all unique genres"""
     try:
+        db = current_app.db_manager
         genres = db.get_all_genres()
         
         return jsonify({
@@ -309,6 +206,7 @@ def get_all_genres():
 def get_movie_ratings_endpoint(movie_id):
     """Get all ratings for a specific movie"""
     try:
+        db = current_app.db_manager
         ratings = db.get_movie_ratings(movie_id)
         
         return jsonify({
@@ -329,6 +227,7 @@ def get_movie_ratings_endpoint(movie_id):
 def get_movie_tags_endpoint(movie_id):
     """Get all tags for a specific movie"""
     try:
+        db = current_app.db_manager
         tags = db.get_movie_tags(movie_id)
         
         return jsonify({
@@ -3,8 +3,13 @@ Ratings & Tags API endpoints
 Handles user ratings and tags for movies
 """
 
+import io
+import time
+
 from flask import Blueprint, jsonify, request, current_app
 
+from config import MAX_BULK_RATINGS
+
 ratings_bp = Blueprint('ratings', __name__)
 
 
@@ -19,7 +24,7 @@ def add_rating():
     Body: {
         "userId": int (required),
         "movieId": int (required),
-        "rating": float (required, 0.5-5.0)
+        "rating": float (required, 0.5-5.0 in steps of 0.5)
     }
     """
     try:
@@ -37,11 +42,11 @@ def add_rating():
         movie_id = int(data['movieId'])
         rating = float(data['rating'])
         
-        # Validate rating value (MovieLens uses 0.5 to 5.0 scale)
-        if not (0.5 <= rating <= 5.0):
+        # Validate rating value (MovieLens uses 0.5 to 5.0 scale, in half stars)
+        if not (0.5 <= rating <= 5.0) or (rating * 2) % 1 != 0:
             return jsonify({
                 'success': False,
-                'error': 'Rating must be between 0.5 and 5.0'
+                'error': 'Rating must be between 0.5 and 5.0, in steps of 0.5'
             }), 400
         
         # Verify user exists
@@ -60,20 +65,30 @@ def add_rating():
                 'error': f'Movie with ID {movie_id} not found'
             }), 404
         
-        # Add rating
-        success = db.add_rating(user_id, movie_id, rating)
+        # Add or update rating
+        success, updated = db.upsert_rating(user_id, movie_id, rating)
         
         if success:
+            # Same incremental model update as /ratings/bulk, for a batch of one
+            recommender = current_app.recommender
+            if recommender is not None:
+                import pandas as pd  # imported on first use, keeps the module import light
+                change = pd.DataFrame({
+                    'userId': [user_id], 'movieId': [movie_id], 'rating': [rating], 'timestamp': [int(time.time())]
+                })
+                current_app.recommender = recommender.apply_ratings(db.ratings_df, change)
+            
             return jsonify({
                 'success': True,
-                'message': 'Rating added successfully',
+                'message': 'Rating updated successfully' if updated else 'Rating added successfully',
                 'data': {
                     'userId': user_id,
                     'movieId': movie_id,
                     'rating': rating,
-                    'movie_title': movie['title']
+                    'movie_title': movie['title'],
+                    'updated': updated
                 }
-            }), 201
+            }), 200 if updated else 201
         else:
             return jsonify({
                 'success': False,
@@ -92,6 +107,73 @@ def add_rating():
         }), 500
 
 
+@ratings_bp.route('/ratings/bulk', methods=['POST'])
+def add_ratings_bulk():
+    """
+    Add or update many ratings at once
+    Body (one of):
+        - JSON array: [{"userId": int, "movieId": int, "rating": float, "timestamp": int (optional)}, ...]
+        - JSON object: {"ratings": [...]}
+        - CSV upload (multipart field "file", or text/csv body) with the same columns
+    Invalid rows are skipped and reported; valid rows are upserted in one pass.
+    """
+    import pandas as pd  # imported on first use, keeps the module import light
+    
+    try:
+        db = current_app.db_manager
+        recommender = current_app.recommender
+        
+        if 'file' in request.files:
+            ratings = pd.read_csv(request.files['file'])
+        elif request.mimetype == 'text/csv':
+            ratings = pd.read_csv(io.BytesIO(request.get_data()))
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get('ratings')
+            if not isinstance(data, list):
+                return jsonify({
+                    'success': False,
+                    'error': 'Body must be a JSON array of ratings or a CSV upload'
+                }), 400
+            ratings = pd.DataFrame(data)
+        
+        if ratings.empty:
+            return jsonify({
+                'success': False,
+                'error': 'No ratings provided'
+            }), 400
+        
+        if len(ratings) > MAX_BULK_RATINGS:
+            return jsonify({
+                'success': False,
+                'error': f'Too many ratings (max {MAX_BULK_RATINGS} per request)'
+            }), 413
+        
+        summary, applied = db.add_ratings_bulk(ratings)
+        
+        # One incremental model update for the whole batch, published with a single reference swap
+        if recommender is not None:
+            current_app.recommender = recommender.apply_ratings(db.ratings_df, applied)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Ratings imported successfully',
+            'data': summary
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid data: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @ratings_bp.route('/ratings/user/<int:user_id>', methods=['GET'])
 def get_user_ratings(user_id):
     """
@@ -256,26 +338,12 @@ def delete_rating(user_id, movie_id):
                 'error': 'No ratings data available'
             }), 404
         
-        existing = db.ratings_df[
-            (db.ratings_df['userId'] == user_id) & 
-            (db.ratings_df['movieId'] == movie_id)
-        ]
-        
-        if existing.empty:
+        if not db.delete_rating(user_id, movie_id):
             return jsonify({
                 'success': False,
                 'error': 'Rating not found'
             }), 404
         
-        db.ratings_df = db.ratings_df.drop(existing.index).reset_index(drop=True)
-        
-        # Save to file
-        try:
-            from config import RATINGS_FILE
-            db.ratings_df.to_csv(RATINGS_FILE, index=False)
-        except:
-            pass  # If config not available, just keep in memory
-        
         return jsonify({
             'success': True,
             'message': 'Rating deleted successfully'
@@ -445,18 +513,8 @@ def get_movie_tags(movie_id):
         
         tags = db.get_movie_tags(movie_id)
         
-        # Count tag frequencies
-        tag_counts = {}
-        for tag_entry in tags:
-            tag = tag_entry['tag'].lower()
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
-        
-        # Create tag cloud data
-        tag_cloud = sorted(
-            [{'tag': tag, 'count': count} for tag, count in tag_counts.items()],
-            key=lambda x: x['count'],
-            reverse=True
-        )
+        # Tag cloud data from the maintained per-movie frequency table
+        tag_cloud = db.get_movie_tag_counts(movie_id, n=20)
         
         # Pagination for detailed tags
         total = len(tags)
@@ -470,7 +528,7 @@ def get_movie_tags(movie_id):
             'tags': paginated_tags,  # Keep for backward compatibility
             'movie_id': movie_id,
             'movie_title': movie.get('title', ''),
-            'tag_cloud': tag_cloud[:20],  # Top 20 most frequent tags
+            'tag_cloud': tag_cloud,  # Top 20 most frequent tags
             'count': total,
             'pagination': {
                 'page': page,
@@ -506,19 +564,8 @@ def get_popular_tags():
                 'count': 0
             }), 200
         
-        # Count all tags
-        tag_counts = {}
-        for _, row in db.tags_df.iterrows():
-            tag = str(row['tag']).lower().strip()
-            if tag:
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-        
-        # Sort and get top n
-        popular_tags = sorted(
-            [{'tag': tag, 'count': count} for tag, count in tag_counts.items()],
-            key=lambda x: x['count'],
-            reverse=True
-        )[:n]
+        # Top n from the maintained global tag frequency table
+        popular_tags = db.get_popular_tags(n)
         
         return jsonify({
             'success': True,
@@ -5,14 +5,170 @@ Handles all recommendation algorithms for MovieLens dataset
 
 from flask import Blueprint, jsonify, request, current_app
 
+from config import (
+    TRENDING_HALF_LIVES, TRENDING_DEFAULT_WINDOW,
+    BECAUSE_WATCHED_ROWS, BECAUSE_WATCHED_MAX_ROWS, BECAUSE_WATCHED_MIN_RATING,
+    RECOMMENDATION_MAX_RESULTS, DIVERSITY_SIMILARITIES
+)
+from utils.result_cache import encode_cursor, decode_cursor
+
 recommendations_bp = Blueprint('recommendations', __name__)
 
+# Model components each endpoint needs; endpoints not listed need the whole model
+REQUIRED_COMPONENTS = {
+    'get_content_recommendations': ('rating_matrix', 'genre_profiles'),
+    'get_popular_recommendations': ('rating_matrix',),
+    'get_trending_recommendations': ('rating_matrix', 'trending'),
+    'get_tag_recommendations': ('rating_matrix', 'tag_similarity'),
+    'get_item_recommendations': ('rating_matrix', 'movie_similarity'),
+    'get_because_you_watched': ('rating_matrix', 'movie_similarity'),
+    'get_collaborative_recommendations': ('rating_matrix', 'user_similarity'),
+    'get_similar_users': ('rating_matrix', 'user_similarity'),
+}
+
+
+@recommendations_bp.before_request
+def require_model():
+    """Answer 503 while the model components an endpoint needs are still building"""
+    recommender = current_app.recommender
+    components = REQUIRED_COMPONENTS.get(request.endpoint.rsplit('.', 1)[-1], ())
+    if recommender is not None and recommender.is_ready(*components):
+        return None
+    
+    response = jsonify({
+        'success': False,
+        'error': 'Recommendation model is still loading, please retry shortly',
+        'components': dict(recommender.status) if recommender is not None else {}
+    })
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+
+def parse_filters():
+    """
+    Read the optional recommendation filters from the query string
+    Query params:
+        - genre (comma-separated or repeated, movies with any of them)
+        - year_min, year_max (inclusive release year range)
+        - min_ratings (minimum rating count)
+        - exclude (comma-separated movie IDs)
+    Returns: (MovieFilter or None, error message or None)
+    """
+    from model.filters import MovieFilter  # imported on first use, keeps the module import light
+    
+    args = request.args
+    names = ('genre', 'year_min', 'year_max', 'min_ratings', 'exclude')
+    if not any(name in args for name in names):
+        return None, None
+    
+    bounds = {}
+    for name in ('year_min', 'year_max', 'min_ratings'):
+        value = args.get(name)
+        if value is None or value == '':
+            bounds[name] = None
+            continue
+        try:
+            bounds[name] = int(value)
+        except ValueError:
+            return None, f'Parameter {name} must be an integer'
+    
+    if bounds['min_ratings'] is not None and bounds['min_ratings'] < 0:
+        return None, 'Parameter min_ratings must not be negative'
+    if bounds['year_min'] is not None and bounds['year_max'] is not None and bounds['year_min'] > bounds['year_max']:
+        return None, 'Parameter year_min must not be greater than year_max'
+    
+    try:
+        exclude = [int(x) for value in args.getlist('exclude') for x in value.split(',') if x.strip()]
+    except ValueError:
+        return None, 'Parameter exclude must be a comma-separated list of movie IDs'
+    
+    genres = [g for value in args.getlist('genre') for g in value.split(',')]
+    return MovieFilter(genres=genres, exclude=exclude, **bounds), None
+
+
+def parse_diversity():
+    """
+    Read the optional diversity re-ranking from the query string
+    Query params:
+        - diversity (0 to 1, weight of dissimilarity in maximal marginal relevance; absent = off)
+        - diversify_by (item or genre similarity, default=item)
+    Returns: (diversity or None, similarity, error message or None)
+    """
+    by = request.args.get('diversify_by', 'item', type=str)
+    if by not in DIVERSITY_SIMILARITIES:
+        return None, by, f'Parameter diversify_by must be one of: {", ".join(DIVERSITY_SIMILARITIES)}'
+    
+    value = request.args.get('diversity')
+    if value is None or value == '':
+        return None, by, None
+    try:
+        diversity = float(value)
+    except ValueError:
+        return None, by, 'Parameter diversity must be a number'
+    if not 0 <= diversity <= 1:
+        return None, by, 'Parameter diversity must be between 0 and 1'
+    return diversity, by, None
+
+
+def parse_cursor(*query):
+    """
+    Read the optional pagination cursor from the query string
+    Query params:
+        - cursor (next_cursor of the previous page; absent = first page)
+    The ranked list is identified by query plus every query param but n and cursor,
+    so the page size may change between pages but the filters may not.
+    Returns: (list key, (offset, list generation or None) or None, error message or None)
+    """
+    params = tuple(sorted(
+        (name, tuple(values)) for name, values in request.args.lists() if name not in ('n', 'cursor')
+    ))
+    key = (*query, params)
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return key, (0, None), None
+    try:
+        return key, decode_cursor(key, cursor), None
+    except ValueError as e:
+        return key, None, str(e)
+
+
+def ranked_page(recommender, key, position, n, rank, score_field, decimals):
+    """
+    One page of a ranked recommendation list
+    The list is ranked once, RECOMMENDATION_MAX_RESULTS deep, by rank(depth) -> (movie ids, scores),
+    then kept in current_app.result_cache and sliced page by page until the data changes.
+    It is keyed on the database generation and on the version of `recommender`, the model rank()
+    uses: a request still holding the previous model never caches its list for the new one.
+    A cursor from an earlier generation is refused, since its list no longer exists.
+    Returns: (records, next cursor or None, error message or None); records is None when rank()
+    returns nothing
+    """
+    cache = current_app.result_cache
+    generation = [current_app.db_manager.generation, recommender.version]
+    offset, cursor_generation = position
+    if cursor_generation is not None and cursor_generation != generation:
+        return None, None, 'Cursor expired: the recommendations have changed, request the first page again'
+    ranked = cache.get(key, generation)
+    if ranked is None:
+        movie_ids, scores = rank(RECOMMENDATION_MAX_RESULTS)
+        if len(movie_ids) == 0:
+            return None, None, None
+        ranked = cache.put(key, generation, movie_ids, scores)
+    
+    movie_ids, scores = ranked
+    page = slice(offset, offset + n)
+    records = recommender.movie_records(
+        movie_ids[page], **{score_field: scores[page].astype(float).round(decimals)}
+    )
+    next_cursor = encode_cursor(key, offset + n, generation) if offset + n < len(movie_ids) else None
+    return records, next_cursor, None
+
 
 @recommendations_bp.route('/recommendations/content/<int:movie_id>', methods=['GET'])
 def get_content_recommendations(movie_id):
     """
     Get content-based recommendations (similar genres)
-    Query params: n (number of recommendations, default=10)
+    Query params: n (number of recommendations, default=10), filters (see parse_filters)
     """
     try:
         db = current_app.db_manager
@@ -26,6 +182,13 @@ def get_content_recommendations(movie_id):
                 'error': 'Parameter n must be between 1 and 100'
             }), 400
         
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
         # Verify movie exists
         movie = db.get_movie_by_id(movie_id)
         if not movie:
@@ -34,12 +197,13 @@ def get_content_recommendations(movie_id):
                 'error': f'Movie with ID {movie_id} not found'
             }), 404
         
-        recommendations = recommender.get_content_based_recommendations(movie_id, n=n)
+        recommendations = recommender.get_content_based_recommendations(movie_id, n=n, filters=filters)
         
         return jsonify({
             'success': True,
             'data': recommendations,
             'count': len(recommendations),
+            'filters': filters.to_dict() if filters else None,
             'movie_id': movie_id,
             'movie_title': movie['title'],
             'method': 'content-based (genre similarity)'
@@ -52,11 +216,63 @@ def get_content_recommendations(movie_id):
         }), 500
 
 
+@recommendations_bp.route('/recommendations/tags/<int:movie_id>', methods=['GET'])
+def get_tag_recommendations(movie_id):
+    """
+    Get content-based recommendations from tags and genres (TF-IDF similarity)
+    Query params: n (number of recommendations, default=10), filters (see parse_filters)
+    """
+    try:
+        db = current_app.db_manager
+        recommender = current_app.recommender
+        n = request.args.get('n', 9, type=int)
+        
+        if n <= 0 or n > 100:
+            return jsonify({
+                'success': False,
+                'error': 'Parameter n must be between 1 and 100'
+            }), 400
+        
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        # Verify movie exists
+        movie = db.get_movie_by_id(movie_id)
+        if not movie:
+            return jsonify({
+                'success': False,
+                'error': f'Movie with ID {movie_id} not found'
+            }), 404
+        
+        recommendations = recommender.get_tag_based_recommendations(movie_id, n=n, filters=filters)
+        
+        return jsonify({
+            'success': True,
+            'data': recommendations,
+            'count': len(recommendations),
+            'filters': filters.to_dict() if filters else None,
+            'movie_id': movie_id,
+            'movie_title': movie['title'],
+            'method': 'content-based (tag + genre TF-IDF similarity)'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @recommendations_bp.route('/recommendations/item/<int:movie_id>', methods=['GET'])
 def get_item_recommendations(movie_id):
     """
     Get item-based collaborative filtering recommendations
-    Query params: n (number of recommendations, default=10)
+    Query params: n (number of recommendations, default=10), filters (see parse_filters),
+    diversity, diversify_by (see parse_diversity)
     """
     try:
         db = current_app.db_manager
@@ -69,6 +285,20 @@ def get_item_recommendations(movie_id):
                 'error': 'Parameter n must be between 1 and 100'
             }), 400
         
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        diversity, diversify_by, error = parse_diversity()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
         # Verify movie exists
         movie = db.get_movie_by_id(movie_id)
         if not movie:
@@ -77,12 +307,16 @@ def get_item_recommendations(movie_id):
                 'error': f'Movie with ID {movie_id} not found'
             }), 404
         
-        recommendations = recommender.get_item_based_recommendations(movie_id, n=n)
+        recommendations = recommender.get_item_based_recommendations(
+            movie_id, n=n, filters=filters, diversity=diversity, diversify_by=diversify_by
+        )
         
         return jsonify({
             'success': True,
             'data': recommendations,
             'count': len(recommendations),
+            'filters': filters.to_dict() if filters else None,
+            'diversity': diversity,
             'movie_id': movie_id,
             'movie_title': movie['title'],
             'method': 'item-based collaborative filtering'
@@ -99,7 +333,8 @@ def get_item_recommendations(movie_id):
 def get_collaborative_recommendations(user_id):
     """
     Get user-based collaborative filtering recommendations
-    Query params: n (number of recommendations, default=10)
+    Query params: n (number of recommendations, default=10), filters (see parse_filters),
+    diversity, diversify_by (see parse_diversity), cursor (see parse_cursor)
     """
     try:
         db = current_app.db_manager
@@ -112,6 +347,27 @@ def get_collaborative_recommendations(user_id):
                 'error': 'Parameter n must be between 1 and 100'
             }), 400
         
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        diversity, diversify_by, error = parse_diversity()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        key, position, error = parse_cursor('collaborative', user_id)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
         # Verify user exists
         user = db.get_user_by_id(user_id)
         if not user:
@@ -120,12 +376,28 @@ def get_collaborative_recommendations(user_id):
                 'error': f'User with ID {user_id} not found'
             }), 404
         
-        recommendations = recommender.get_collaborative_recommendations(user_id, n=n)
+        recommendations, next_cursor, error = ranked_page(
+            recommender, key, position, n,
+            lambda depth: recommender.rank_collaborative(
+                user_id, n=depth, filters=filters, diversity=diversity, diversify_by=diversify_by
+            ),
+            'predicted_rating', 2
+        )
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        if recommendations is None:
+            recommendations = recommender.get_popular_recommendations(n=n, filters=filters)
         
         return jsonify({
             'success': True,
             'data': recommendations,
             'count': len(recommendations),
+            'next_cursor': next_cursor,
+            'filters': filters.to_dict() if filters else None,
+            'diversity': diversity,
             'user_id': user_id,
             'username': user['username'],
             'method': 'user-based collaborative filtering'
@@ -142,7 +414,7 @@ def get_collaborative_recommendations(user_id):
 def get_popular_recommendations():
     """
     Get popular movies recommendations
-    Query params: n (number of recommendations, default=10)
+    Query params: n (number of recommendations, default=10), filters (see parse_filters)
     """
     try:
         recommender = current_app.recommender
@@ -154,12 +426,20 @@ def get_popular_recommendations():
                 'error': 'Parameter n must be between 1 and 100'
             }), 400
         
-        recommendations = recommender.get_popular_recommendations(n=n)
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        recommendations = recommender.get_popular_recommendations(n=n, filters=filters)
         
         return jsonify({
             'success': True,
             'data': recommendations,
             'count': len(recommendations),
+            'filters': filters.to_dict() if filters else None,
             'method': 'popularity-based (weighted rating)'
         }), 200
         
@@ -170,13 +450,67 @@ def get_popular_recommendations():
         }), 500
 
 
+@recommendations_bp.route('/recommendations/trending', methods=['GET'])
+def get_trending_recommendations():
+    """
+    Get trending movies (time-decayed rating activity, updated as ratings arrive)
+    Query params:
+        - n (number of recommendations, default=10)
+        - filters (genre, year_min, year_max, min_ratings, exclude; see parse_filters)
+        - window (half-life of a rating's weight: week, month or year; default=month)
+    """
+    try:
+        recommender = current_app.recommender
+        n = request.args.get('n', 9, type=int)
+        window = request.args.get('window', TRENDING_DEFAULT_WINDOW, type=str)
+        
+        if n <= 0 or n > 100:
+            return jsonify({
+                'success': False,
+                'error': 'Parameter n must be between 1 and 100'
+            }), 400
+        
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        if window not in TRENDING_HALF_LIVES:
+            return jsonify({
+                'success': False,
+                'error': f'Parameter window must be one of: {", ".join(TRENDING_HALF_LIVES)}'
+            }), 400
+        
+        recommendations = recommender.get_trending_recommendations(n=n, window=window, filters=filters)
+        
+        return jsonify({
+            'success': True,
+            'data': recommendations,
+            'count': len(recommendations),
+            'filters': filters.to_dict() if filters else None,
+            'window': window,
+            'method': 'trending (time-decayed weighted rating)'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @recommendations_bp.route('/recommendations/hybrid/<int:user_id>', methods=['GET'])
 def get_hybrid_recommendations(user_id):
     """
     Get hybrid recommendations (combines multiple methods)
     Query params: 
         - n (number of recommendations, default=10)
+        - filters (genre, year_min, year_max, min_ratings, exclude; see parse_filters)
+        - diversity, diversify_by (diversity re-ranking; see parse_diversity)
         - movie_id (optional, for content-based boost)
+        - cursor (next page; see parse_cursor)
     """
     try:
         db = current_app.db_manager
@@ -190,6 +524,27 @@ def get_hybrid_recommendations(user_id):
                 'error': 'Parameter n must be between 1 and 100'
             }), 400
         
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        diversity, diversify_by, error = parse_diversity()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        key, position, error = parse_cursor('hybrid', user_id)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
         # Verify user exists
         user = db.get_user_by_id(user_id)
         if not user:
@@ -207,16 +562,33 @@ def get_hybrid_recommendations(user_id):
                     'error': f'Movie with ID {movie_id} not found'
                 }), 404
         
-        recommendations = recommender.get_hybrid_recommendations(
-            user_id, 
-            movie_id=movie_id, 
-            n=n
+        recommendations, next_cursor, error = ranked_page(
+            recommender, key, position, n,
+            lambda depth: recommender.rank_hybrid(
+                user_id,
+                movie_id=movie_id,
+                n=depth,
+                filters=filters,
+                diversity=diversity,
+                diversify_by=diversify_by
+            ),
+            'hybrid_score', 3
         )
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        if recommendations is None:
+            recommendations = recommender.get_popular_recommendations(n=n, filters=filters)
         
         return jsonify({
             'success': True,
             'data': recommendations,
             'count': len(recommendations),
+            'next_cursor': next_cursor,
+            'filters': filters.to_dict() if filters else None,
+            'diversity': diversity,
             'user_id': user_id,
             'username': user['username'],
             'movie_id': movie_id,
@@ -235,7 +607,8 @@ def get_personalized_recommendations(user_id):
     """
     Get personalized recommendations based on user's viewing history
     Automatically selects the best method based on user data
-    Query params: n (number of recommendations, default=10)
+    Query params: n (number of recommendations, default=10), filters (see parse_filters),
+    diversity, diversify_by (see parse_diversity), cursor (see parse_cursor; hybrid methods only)
     """
     try:
         db = current_app.db_manager
@@ -248,6 +621,27 @@ def get_personalized_recommendations(user_id):
                 'error': 'Parameter n must be between 1 and 100'
             }), 400
         
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        diversity, diversify_by, error = parse_diversity()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        key, position, error = parse_cursor('personalized', user_id)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
         # Verify user exists
         user = db.get_user_by_id(user_id)
         if not user:
@@ -259,31 +653,50 @@ def get_personalized_recommendations(user_id):
         # Check user's rating history
         user_ratings = db.get_user_ratings(user_id)
         
+        recommendations, next_cursor = None, None
         if not user_ratings:
-            # New user - return popular movies
-            recommendations = recommender.get_popular_recommendations(n=n)
             method = 'popular (new user)'
-        elif len(user_ratings) < 5:
-            # Few ratings - use hybrid with emphasis on popularity
-            recommendations = recommender.get_hybrid_recommendations(user_id, n=n)
-            method = 'hybrid (limited data)'
         else:
-            # Established user - use full hybrid
-            # Get user's most recently rated movie for content boost
-            recent_movie = max(user_ratings, key=lambda x: x.get('timestamp', 0))
-            movie_id = recent_movie['movieId']
+            if len(user_ratings) < 5:
+                # Few ratings - use hybrid with emphasis on popularity
+                movie_id = None
+                method = 'hybrid (limited data)'
+            else:
+                # Established user - use full hybrid
+                # Get user's most recently rated movie for content boost
+                recent_movie = max(user_ratings, key=lambda x: x.get('timestamp', 0))
+                movie_id = recent_movie['movieId']
+                method = 'hybrid (full personalization)'
             
-            recommendations = recommender.get_hybrid_recommendations(
-                user_id, 
-                movie_id=movie_id, 
-                n=n
+            recommendations, next_cursor, error = ranked_page(
+                recommender, key, position, n,
+                lambda depth: recommender.rank_hybrid(
+                    user_id,
+                    movie_id=movie_id,
+                    n=depth,
+                    filters=filters,
+                    diversity=diversity,
+                    diversify_by=diversify_by
+                ),
+                'hybrid_score', 3
             )
-            method = 'hybrid (full personalization)'
+            if error:
+                return jsonify({
+                    'success': False,
+                    'error': error
+                }), 400
+        
+        if recommendations is None:
+            # New user (or no hybrid candidates) - return popular movies
+            recommendations = recommender.get_popular_recommendations(n=n, filters=filters)
         
         return jsonify({
             'success': True,
             'data': recommendations,
             'count': len(recommendations),
+            'next_cursor': next_cursor,
+            'filters': filters.to_dict() if filters else None,
+            'diversity': diversity,
             'user_id': user_id,
             'username': user['username'],
             'method': method,
@@ -297,6 +710,84 @@ def get_personalized_recommendations(user_id):
         }), 500
 
 
+@recommendations_bp.route('/recommendations/because-you-watched/<int:user_id>', methods=['GET'])
+def get_because_you_watched(user_id):
+    """
+    Get "because you watched X" rows for the home page in one call, seeded by
+    the user's most recent high ratings (>= BECAUSE_WATCHED_MIN_RATING)
+    Query params:
+        - rows (number of rows, default=4)
+        - n (recommendations per row, default=10)
+        - filters (genre, year_min, year_max, min_ratings, exclude; see parse_filters)
+    """
+    try:
+        db = current_app.db_manager
+        recommender = current_app.recommender
+        n = request.args.get('n', 9, type=int)
+        rows = request.args.get('rows', BECAUSE_WATCHED_ROWS, type=int)
+        
+        if n <= 0 or n > 100:
+            return jsonify({
+                'success': False,
+                'error': 'Parameter n must be between 1 and 100'
+            }), 400
+        
+        if rows <= 0 or rows > BECAUSE_WATCHED_MAX_ROWS:
+            return jsonify({
+                'success': False,
+                'error': f'Parameter rows must be between 1 and {BECAUSE_WATCHED_MAX_ROWS}'
+            }), 400
+        
+        filters, error = parse_filters()
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        # Verify user exists
+        user = db.get_user_by_id(user_id)
+        if not user:
+            return jsonify({
+                'success': False,
+                'error': f'User with ID {user_id} not found'
+            }), 404
+        
+        # Recent favourites, most recent first
+        liked = sorted(
+            (r for r in db.get_user_ratings(user_id) if r['rating'] >= BECAUSE_WATCHED_MIN_RATING),
+            key=lambda r: r.get('timestamp', 0),
+            reverse=True
+        )
+        user_ratings = {r['movieId']: r['rating'] for r in liked}
+        
+        result = recommender.get_because_you_watched(
+            user_id,
+            [r['movieId'] for r in liked],
+            rows=rows,
+            n=n,
+            filters=filters
+        )
+        for row in result:
+            row['because_you_watched']['user_rating'] = user_ratings.get(row['because_you_watched']['movieId'])
+        
+        return jsonify({
+            'success': True,
+            'data': result,
+            'count': len(result),
+            'filters': filters.to_dict() if filters else None,
+            'user_id': user_id,
+            'username': user['username'],
+            'method': 'item-based (because you watched)'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @recommendations_bp.route('/recommendations/compare', methods=['POST'])
 def compare_methods():
     """
@@ -396,49 +887,35 @@ def get_similar_users(user_id):
                 'error': f'User with ID {user_id} not found'
             }), 404
         
-        if recommender.user_similarity_df is None:
+        if recommender.user_similarity is None:
             return jsonify({
                 'success': False,
                 'error': 'User similarity data not available'
             }), 404
         
-        if user_id not in recommender.user_similarity_df.index:
+        if user_id not in recommender.user_similarity.index:
             return jsonify({
                 'success': False,
                 'error': f'User {user_id} not in similarity matrix (may have no ratings)'
             }), 404
         
-        # Get similar users
-        similar_users = recommender.user_similarity_df[user_id].sort_values(ascending=False)
-        
-        # Exclude the user themselves
-        similar_users = similar_users[similar_users.index != user_id]
-        
-        # Filter out very low similarity
-        similar_users = similar_users[similar_users > 0.1]
+        # Top n neighbours (similarity > 0.1) with their co-rated movie counts
+        neighbours = recommender.get_similar_users(user_id, n=n)
         
-        # Get top n similar users
-        similar_users = similar_users.head(n)
+        # Fetch all neighbour accounts in one batch lookup
+        users = db.get_users_by_ids([neighbour['userId'] for neighbour in neighbours])
         
         # Build response with user info
-        result = []
-        for similar_user_id, similarity_score in similar_users.items():
-            similar_user = db.get_user_by_id(similar_user_id)
-            if similar_user:
-                # Get common movies
-                user_ratings = db.get_user_ratings(user_id)
-                similar_ratings = db.get_user_ratings(similar_user_id)
-                
-                user_movies = set(r['movieId'] for r in user_ratings)
-                similar_movies = set(r['movieId'] for r in similar_ratings)
-                common_movies = len(user_movies & similar_movies)
-                
-                result.append({
-                    'user_id': similar_user_id,
-                    'username': similar_user['username'],
-                    'similarity_score': round(float(similarity_score), 3),
-                    'common_movies': common_movies
-                })
+        result = [
+            {
+                'user_id': neighbour['userId'],
+                'username': users[neighbour['userId']]['username'],
+                'similarity_score': neighbour['similarity_score'],
+                'common_movies': neighbour['common_movies']
+            }
+            for neighbour in neighbours
+            if neighbour['userId'] in users
+        ]
         
         return jsonify({
             'success': True,
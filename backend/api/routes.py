@@ -65,6 +65,7 @@ def register_routes(app):
                 },
                 "Ratings": {
                     "POST /api/ratings": "Add or update a rating",
+                    "POST /api/ratings/bulk": "Add or update many ratings (JSON array or CSV upload)",
                     "GET /api/ratings/user/<id>": "Get ratings by user",
                     "GET /api/ratings/movie/<id>": "Get ratings for a movie"
                 },
@@ -76,10 +77,13 @@ def register_routes(app):
                 },
                 "Recommendations": {
                     "GET /api/recommendations/content/<movie_id>": "Content-based recommendations (by genre)",
+                    "GET /api/recommendations/tags/<movie_id>": "Content-based recommendations (tag + genre TF-IDF)",
                     "GET /api/recommendations/item/<movie_id>": "Item-based collaborative filtering",
                     "GET /api/recommendations/collaborative/<user_id>": "User-based collaborative filtering",
                     "GET /api/recommendations/popular": "Get globally popular movies",
+                    "GET /api/recommendations/trending": "Trending movies, time-decayed (params: n, window=week|month|year)",
                     "GET /api/recommendations/hybrid/<user_id>": "Hybrid recommendations (combined methods)",
+                    "GET /api/recommendations/because-you-watched/<user_id>": "Home page rows: similar movies to the user's recent favourites (params: rows, n)",
                     "POST /api/recommendations/compare": "Compare multiple recommendation methods",
                     "GET /api/recommendations/similar-users/<user_id>": "Find users with similar tastes"
                 }
@@ -88,6 +92,9 @@ def register_routes(app):
                 "page": "Page number (default: 1)",
                 "per_page": "Items per page (default: 20, max: 100)",
                 "n": "Number of recommendations (default: 10)",
+                "genre, year_min, year_max, min_ratings, exclude": "Recommendation filters (genre and exclude: comma-separated lists)",
+                "diversity, diversify_by": "Diversity re-ranking of item, collaborative and hybrid results (0-1; item|genre)",
+                "cursor": "next_cursor of the previous page of collaborative, hybrid and personalized recommendations",
                 "q": "Search query string",
                 "sort_by": "Sorting field (e.g., title, rating, timestamp)",
                 "order": "Sort order: asc | desc"
@@ -95,7 +102,8 @@ def register_routes(app):
             "response_format": {
                 "success": True,
                 "data": "...",
-                "pagination": "... (if applicable)"
+                "pagination": "... (if applicable)",
+                "next_cursor": "... (paginated recommendations; null on the last page)"
             },
             "error_format": {
                 "success": False,
@@ -0,0 +1,183 @@
+"""
+asgi.py - Point d'entrée ASGI (asyncio) pour servir les mêmes routes Flask
+
+La boucle asyncio ne fait que de l'I/O : chaque requête est exécutée sur un
+pool de threads borné, séparé selon le coût de la route (recommandations
+vs. catalogue), avec une limite de concurrence par endpoint. Les requêtes GET
+identiques reçues simultanément sont regroupées en un seul calcul.
+
+Usage :
+    CINEMATCH_ENV=production uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import io
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import (
+    ASYNC_HEAVY_PREFIXES, ASYNC_HEAVY_WORKERS, ASYNC_LIGHT_WORKERS,
+    ASYNC_HEAVY_CONCURRENCY, ASYNC_LIGHT_CONCURRENCY
+)
+from utils.metrics import CACHE_REQUESTS, increment
+
+
+class AsyncGateway:
+    """
+    Adaptateur ASGI autour d'une application WSGI (Flask) :
+      - exécuteurs bornés distincts pour les routes coûteuses et les routes légères
+      - limite de requêtes simultanées par endpoint
+      - regroupement (coalescing) des GET identiques en cours
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.heavy_executor = ThreadPoolExecutor(ASYNC_HEAVY_WORKERS, thread_name_prefix="heavy")
+        self.light_executor = ThreadPoolExecutor(ASYNC_LIGHT_WORKERS, thread_name_prefix="light")
+        self._limits = {}
+        self._inflight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await self._read_body(receive)
+        heavy = scope["path"].startswith(ASYNC_HEAVY_PREFIXES)
+
+        # Une requête profilée s'exécute toujours elle-même
+        if scope["method"] in ("GET", "HEAD") and not body and not self._header(scope, b"x-profile-token"):
+            key = (scope["method"], scope["path"], scope["query_string"], self._header(scope, b"authorization"))
+            task = self._inflight.get(key)
+            increment(CACHE_REQUESTS, cache="request_coalescing", result="miss" if task is None else "hit")
+            if task is None:
+                task = asyncio.ensure_future(self._dispatch(scope, body, heavy))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            status, headers, content = await asyncio.shield(task)
+        else:
+            status, headers, content = await self._dispatch(scope, body, heavy)
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+    # ======================================================
+    # === Exécution ===
+    # ======================================================
+
+    async def _dispatch(self, scope, body, heavy):
+        """Exécute la requête WSGI sur l'exécuteur adapté, sous la limite de son endpoint."""
+        endpoint = self._endpoint(scope)
+        limit = self._limits.get(endpoint)
+        if limit is None:
+            limit = asyncio.Semaphore(ASYNC_HEAVY_CONCURRENCY if heavy else ASYNC_LIGHT_CONCURRENCY)
+            self._limits[endpoint] = limit
+
+        executor = self.heavy_executor if heavy else self.light_executor
+        environ = self._build_environ(scope, body)
+        async with limit:
+            return await asyncio.get_running_loop().run_in_executor(executor, self._call_wsgi, environ)
+
+    def _call_wsgi(self, environ):
+        """Appelle l'application WSGI et retourne (status, headers, body)."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+        chunks = self.wsgi_app(environ, start_response)
+        try:
+            content = b"".join(chunks)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        return response["status"], response["headers"], content
+
+    def _endpoint(self, scope):
+        """Retourne le nom de l'endpoint Flask correspondant, ou le chemin brut."""
+        try:
+            adapter = self.wsgi_app.url_map.bind("localhost")
+            return adapter.match(scope["path"], method=scope["method"])[0]
+        except Exception:
+            return scope["path"]
+
+    # ======================================================
+    # === Protocole ASGI ===
+    # ======================================================
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.heavy_executor.shutdown(wait=False)
+                self.light_executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                return body
+
+    @staticmethod
+    def _header(scope, name):
+        return b",".join(value for key, value in scope["headers"] if key == name)
+
+    @staticmethod
+    def _build_environ(scope, body):
+        """Construit l'environ WSGI (PEP 3333) à partir du scope ASGI."""
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": str(server[0]),
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for key, value in scope["headers"]:
+            name = key.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = f"HTTP_{name}"
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+
+def create_application():
+    """
+    Charge les données et retourne l'application ASGI ; le modèle est construit
+    en arrière-plan (processus unique, pas de fork à attendre).
+    """
+    from server import app, initialize_system
+    from api.routes import register_routes
+
+    if not initialize_system(background=True):
+        raise RuntimeError("Impossible de démarrer le serveur sans données valides")
+    register_routes(app)
+    return AsyncGateway(app)
+
+
+application = create_application()
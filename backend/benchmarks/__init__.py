@@ -0,0 +1,6 @@
+"""
+Benchmarks du système de recommandation
+  - datasets : génération de jeux de données synthétiques au format MovieLens
+  - run      : mesure des chemins critiques (modèle, recommandations, accès aux données)
+  - compare  : comparaison de deux fichiers de résultats
+"""
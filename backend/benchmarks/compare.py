@@ -0,0 +1,73 @@
+"""
+compare.py - Compare deux fichiers de résultats de benchmarks.run
+
+Affiche les médianes (ou valeurs) et les pics mémoire avant / après, et le
+ratio par mesure.
+Le code de sortie vaut 1 si une mesure ralentit (ou consomme plus) au-delà du seuil.
+
+Usage (depuis backend/) :
+    python -m benchmarks.compare base.json new.json --threshold 0.10
+    python -m benchmarks.compare base.json new.json --match hybrid trending because_you_watched
+"""
+
+import argparse
+import json
+import sys
+
+
+def _load(path, match=None):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    results = {}
+    for r in report["results"]:
+        if match and not any(word in r["name"] for word in match):
+            continue
+        results[(r["scale"], r["name"])] = r
+        # Pic mémoire comparé comme une mesure à part
+        if "peak_mb" in r:
+            results[(r["scale"], f"{r['name']}.peak")] = {"unit": "MB", "value": r["peak_mb"]}
+    return report["meta"], results
+
+
+def _value(result):
+    return result.get("median", result.get("value"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare deux résultats de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="ralentissement toléré (0.10 = +10 %%)")
+    parser.add_argument("--match", nargs="+", help="ne compare que les mesures dont le nom contient l'un de ces mots")
+    args = parser.parse_args(argv)
+
+    base_meta, base = _load(args.base, args.match)
+    new_meta, new = _load(args.new, args.match)
+    print(f"base: {base_meta.get('commit')}   new: {new_meta.get('commit')}")
+    print(f"{'scale':<6} {'measure':<40} {'base':>12} {'new':>12} {'ratio':>8}")
+
+    regressions = []
+    for key in sorted(set(base) & set(new)):
+        before, after = _value(base[key]), _value(new[key])
+        if before is None or after is None:
+            continue
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  ▲ slower"
+            regressions.append(key)
+        elif ratio < 1 - args.threshold:
+            flag = "  ▼ faster"
+        unit = base[key].get("unit", "s")
+        scale = 1000 if unit == "s" else 1
+        print(f"{key[0]:<6} {key[1]:<40} {before * scale:>12.3f} {after * scale:>12.3f} {ratio:>8.2f}{flag}")
+
+    for key in sorted(set(base) ^ set(new)):
+        print(f"{key[0]:<6} {key[1]:<40} {'only in ' + ('base' if key in base else 'new'):>34}")
+
+    print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
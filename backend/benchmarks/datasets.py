@@ -0,0 +1,127 @@
+"""
+datasets.py - Jeux de données synthétiques au format MovieLens
+
+Génère movies / ratings / users / tags / links avec les mêmes colonnes que
+les CSV de data/ : popularité des films et activité des utilisateurs en
+longue traîne, notes par demi-étoile biaisées par film et par utilisateur.
+Même graine → mêmes fichiers.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Tailles calquées sur les jeux MovieLens publics
+SCALES = {
+    "100k": {"users": 610, "movies": 9742, "ratings": 100_000},
+    "1m": {"users": 6040, "movies": 3706, "ratings": 1_000_000},
+    "10m": {"users": 69878, "movies": 10677, "ratings": 10_000_000},
+}
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary",
+    "Drama", "Fantasy", "Film-Noir", "Horror", "IMAX", "Musical", "Mystery", "Romance",
+    "Sci-Fi", "Thriller", "War", "Western",
+]
+
+TITLE_WORDS = [
+    "Star", "Love", "Night", "War", "Man", "Dark", "Life", "Story", "King", "City",
+    "Last", "Dead", "Blue", "Lost", "Secret", "Girl", "House", "Time", "World", "Day",
+]
+
+TAGS_PER_RATING = 0.036  # ratio observé dans ml-latest-small
+TAG_VOCABULARY = 1500
+
+
+def generate(scale, seed=42):
+    """
+    Génère un jeu de données synthétique
+
+    Args:
+        scale: clé de SCALES ('100k', '1m', '10m')
+        seed: graine du générateur
+
+    Returns:
+        dict: table → DataFrame (movies, ratings, users, tags, links)
+    """
+    size = SCALES[scale]
+    rng = np.random.default_rng(seed)
+    n_users, n_movies, n_ratings = size["users"], size["movies"], size["ratings"]
+
+    movie_ids = np.arange(1, n_movies + 1)
+    user_ids = np.arange(1, n_users + 1)
+
+    # === Films ===
+    years = rng.integers(1920, 2019, n_movies)
+    words = rng.choice(TITLE_WORDS, (n_movies, 2))
+    titles = [f"{a} {b} {i} ({y})" for a, b, i, y in zip(words[:, 0], words[:, 1], movie_ids, years)]
+    n_genres = rng.integers(1, 4, n_movies)
+    genre_picks = rng.choice(len(GENRES), (n_movies, 3))
+    genres = ["|".join(sorted({GENRES[g] for g in picks[:k]})) for picks, k in zip(genre_picks, n_genres)]
+    movies = pd.DataFrame({"movieId": movie_ids, "title": titles, "genres": genres})
+
+    # === Notes : paires (utilisateur, film) tirées selon activité × popularité ===
+    popularity = rng.permutation(1.0 / np.arange(1, n_movies + 1) ** 0.9)
+    activity = rng.lognormal(0.0, 1.0, n_users)
+    oversample = int(n_ratings * 1.3)
+    users = rng.choice(user_ids, oversample, p=activity / activity.sum())
+    items = rng.choice(movie_ids, oversample, p=popularity / popularity.sum())
+    pairs = pd.DataFrame({"userId": users, "movieId": items}).drop_duplicates().head(n_ratings)
+
+    quality = rng.normal(3.5, 0.5, n_movies + 1)
+    bias = rng.normal(0.0, 0.4, n_users + 1)
+    raw = quality[pairs["movieId"].values] + bias[pairs["userId"].values] + rng.normal(0.0, 0.9, len(pairs))
+    ratings = pairs.assign(
+        rating=np.clip(np.round(raw * 2) / 2, 0.5, 5.0),
+        timestamp=rng.integers(946684800, 1537799250, len(pairs)),
+    ).sort_values(["userId", "movieId"], ignore_index=True)
+
+    # === Utilisateurs ===
+    users_df = pd.DataFrame({
+        "id": user_ids,
+        "username": [f"user{i}" for i in user_ids],
+        "firstname": "Bench",
+        "lastname": [f"User{i}" for i in user_ids],
+        "password": "password",
+    })
+
+    # === Tags : posés sur des notes existantes, vocabulaire en longue traîne ===
+    n_tags = int(len(ratings) * TAGS_PER_RATING)
+    tagged = ratings.iloc[rng.choice(len(ratings), n_tags, replace=False)]
+    vocabulary = 1.0 / np.arange(1, TAG_VOCABULARY + 1)
+    tag_words = rng.choice(TAG_VOCABULARY, n_tags, p=vocabulary / vocabulary.sum())
+    tags = pd.DataFrame({
+        "userId": tagged["userId"].values,
+        "movieId": tagged["movieId"].values,
+        "tag": [f"tag{t}" for t in tag_words],
+        "timestamp": tagged["timestamp"].values,
+    })
+
+    # === Liens ===
+    links = pd.DataFrame({
+        "movieId": movie_ids,
+        "imdbId": rng.integers(100000, 9999999, n_movies),
+        "tmdbId": rng.integers(1, 600000, n_movies),
+    })
+
+    return {"movies": movies, "ratings": ratings, "users": users_df, "tags": tags, "links": links}
+
+
+def write(tables, directory):
+    """Écrit les tables en CSV dans `directory` et retourne {table: chemin}."""
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for table, df in tables.items():
+        files[table] = os.path.join(directory, f"{table}.csv")
+        df.to_csv(files[table], index=False)
+    return files
+
+
+def ensure(scale, directory, seed=42):
+    """Retourne les fichiers CSV du jeu `scale`, générés s'ils n'existent pas encore."""
+    directory = os.path.join(directory, f"{scale}-seed{seed}")
+    files = {table: os.path.join(directory, f"{table}.csv") for table in ("movies", "ratings", "users", "tags", "links")}
+    if not all(os.path.exists(path) for path in files.values()):
+        write(generate(scale, seed), directory)
+    return files
@@ -0,0 +1,350 @@
+"""
+load.py - Test de charge HTTP avec un mélange de trafic réaliste
+
+Rejoue un mélange pondéré des routes de l'API (recherche, fiches films,
+recommandations, écritures de notes...) à un débit cible, en boucle
+ouverte : les requêtes partent à heure fixe, que les précédentes aient
+répondu ou non, et la latence est mesurée depuis l'heure d'envoi prévue
+(un serveur saturé ne ralentit donc pas le générateur). Rapporte par
+route le débit, les percentiles de latence et le taux d'erreurs.
+
+Usage (depuis backend/) :
+    # Démarre le serveur sur une copie des données, puis le charge
+    python -m benchmarks.load --start --rps 50 --duration 30
+    python -m benchmarks.load --start --server-cmd "gunicorn -c gunicorn.conf.py wsgi:app"
+    # Serveur déjà lancé (attention : ratings.add écrit des notes)
+    python -m benchmarks.load --url http://localhost:5000 --mix ratings.add=0
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from config import DATA_DIR
+
+# Routes rejouées : nom → (méthode, chemin)
+ROUTES = {
+    "movies.list": ("GET", "/api/movies?page={page}&per_page=20"),
+    "movies.search": ("GET", "/api/movies/search?q={query}"),
+    "movies.details": ("GET", "/api/movies/{movie_id}"),
+    "movies.popular": ("GET", "/api/movies/popular"),
+    "ratings.user": ("GET", "/api/ratings/user/{user_id}"),
+    "ratings.add": ("POST", "/api/ratings"),
+    "recommendations.content": ("GET", "/api/recommendations/content/{movie_id}"),
+    "recommendations.item": ("GET", "/api/recommendations/item/{movie_id}"),
+    "recommendations.personalized": ("GET", "/api/recommendations/personalized/{user_id}"),
+    "recommendations.because_watched": ("GET", "/api/recommendations/because-you-watched/{user_id}"),
+    "recommendations.popular": ("GET", "/api/recommendations/popular"),
+}
+
+# Poids par défaut : surtout de la navigation, quelques recommandations, peu d'écritures
+DEFAULT_MIX = {
+    "movies.list": 15,
+    "movies.search": 20,
+    "movies.details": 20,
+    "movies.popular": 5,
+    "ratings.user": 5,
+    "ratings.add": 5,
+    "recommendations.content": 5,
+    "recommendations.item": 10,
+    "recommendations.personalized": 10,
+    "recommendations.because_watched": 5,
+    "recommendations.popular": 5,
+}
+
+DATA_FILES = ("movies.csv", "ratings.csv", "users.csv", "tags.csv", "links.csv")
+
+
+# ======================================================
+# === Paramètres des requêtes ===
+# ======================================================
+
+class RequestFactory:
+    """Tire des paramètres plausibles (films populaires plus souvent, utilisateurs existants)."""
+
+    def __init__(self, data_dir, seed):
+        movies = pd.read_csv(os.path.join(data_dir, "movies.csv"), usecols=["movieId", "title"])
+        ratings = pd.read_csv(os.path.join(data_dir, "ratings.csv"), usecols=["userId", "movieId"])
+        self.random = random.Random(seed)
+        # Tirer des notes existantes pondère les films par leur popularité
+        self.movie_ids = ratings["movieId"].tolist()
+        self.user_ids = ratings["userId"].unique().tolist()
+        self.pages = max(1, len(movies) // 20)
+        words = movies["title"].str.extract(r"^(\w{3,})", expand=False).dropna().str.lower()
+        self.queries = words.value_counts().index[:200].tolist()
+
+    def build(self, route):
+        """Retourne (méthode, chemin, corps JSON ou None) pour une route."""
+        method, template = ROUTES[route]
+        params = {
+            "movie_id": self.random.choice(self.movie_ids),
+            "user_id": self.random.choice(self.user_ids),
+            "query": urllib.parse.quote(self.random.choice(self.queries)),
+            "page": self.random.randint(1, self.pages),
+        }
+        body = None
+        if route == "ratings.add":
+            body = {
+                "userId": params["user_id"],
+                "movieId": params["movie_id"],
+                "rating": self.random.randint(1, 10) / 2,
+            }
+        return method, template.format(**params), body
+
+
+# ======================================================
+# === Client HTTP ===
+# ======================================================
+
+class Client:
+    """Une connexion keep-alive par thread."""
+
+    def __init__(self, base_url, timeout):
+        url = urllib.parse.urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def send(self, method, path, body):
+        """Envoie une requête et retourne le code HTTP (None si erreur réseau)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            return None
+
+
+class RouteStats:
+    """Latences et codes de retour d'une route (thread-safe)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = {}
+
+    def record(self, latency, status):
+        with self.lock:
+            self.latencies.append(latency)
+            key = str(status) if status is not None else "network_error"
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    @property
+    def errors(self):
+        return sum(count for status, count in self.statuses.items() if not status.startswith(("2", "3")))
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+# ======================================================
+# === Génération de charge ===
+# ======================================================
+
+def run_load(client, factory, mix, rps, duration, concurrency, record=True):
+    """
+    Envoie rps × duration requêtes à intervalle régulier et retourne
+    (statistiques par route, durée réelle en secondes)
+    """
+    routes = [route for route, weight in mix.items() if weight > 0]
+    weights = [mix[route] for route in routes]
+    stats = {route: RouteStats() for route in routes}
+
+    def send(route, request, scheduled):
+        status = client.send(*request)
+        if record:
+            stats[route].record(time.perf_counter() - scheduled, status)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i in range(int(rps * duration)):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            route = factory.random.choices(routes, weights)[0]
+            executor.submit(send, route, factory.build(route), scheduled)
+    return stats, time.perf_counter() - start
+
+
+def summarize(stats, elapsed, label):
+    """Résultats par route au format de benchmarks.run (comparables avec benchmarks.compare)."""
+    results = []
+    all_latencies, total_errors = [], 0
+    for route, route_stats in sorted(stats.items()):
+        if not route_stats.latencies:
+            continue
+        all_latencies.extend(route_stats.latencies)
+        total_errors += route_stats.errors
+        results.append(_entry(label, f"load.{route}", route_stats.latencies, route_stats.errors, elapsed, route_stats.statuses))
+    if all_latencies:
+        results.append(_entry(label, "load.total", all_latencies, total_errors, elapsed))
+    return results
+
+
+def _entry(label, name, latencies, errors, elapsed, statuses=None):
+    ordered = sorted(latencies)
+    entry = {
+        "scale": label,
+        "name": name,
+        "unit": "s",
+        "samples": len(ordered),
+        "throughput_rps": (len(ordered) - errors) / elapsed,
+        "errors": errors,
+        "error_rate": errors / len(ordered),
+        "median": _percentile(ordered, 0.5),
+        "p95": _percentile(ordered, 0.95),
+        "p99": _percentile(ordered, 0.99),
+        "max": ordered[-1],
+    }
+    if statuses is not None:
+        entry["statuses"] = statuses
+    return entry
+
+
+def print_report(results):
+    print(f"\n{'route':<38} {'req':>6} {'ok/s':>8} {'err %':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}", file=sys.stderr)
+    for r in results:
+        print(
+            f"{r['name']:<38} {r['samples']:>6} {r['throughput_rps']:>8.1f} {r['error_rate'] * 100:>7.2f}"
+            f" {r['median'] * 1000:>9.1f} {r['p95'] * 1000:>9.1f} {r['p99'] * 1000:>9.1f}",
+            file=sys.stderr,
+        )
+
+
+# ======================================================
+# === Serveur local ===
+# ======================================================
+
+def start_server(command, port, data_dir, workdir, timeout):
+    """
+    Démarre le serveur sur une copie des données (les écritures ne touchent
+    pas data/) et attend que /api/health réponde 'healthy'
+    """
+    served = os.path.join(workdir, "data")
+    os.makedirs(served)
+    for name in DATA_FILES:
+        if os.path.exists(os.path.join(data_dir, name)):
+            shutil.copy(os.path.join(data_dir, name), served)
+
+    env = dict(os.environ, CINEMATCH_DATA_DIR=served, CINEMATCH_PORT=str(port), CINEMATCH_ENV="production")
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        shlex.split(command), cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"le serveur s'est arrêté (code {process.returncode}):\n{_tail(log.name)}")
+        try:
+            with urllib.request.urlopen(f"{url}/api/health", timeout=2) as response:
+                if json.load(response).get("status") == "healthy":
+                    return process, url
+        except OSError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"le serveur n'est pas prêt après {timeout}s:\n{_tail(log.name)}")
+
+
+def _tail(path, lines=20):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return "".join(f.readlines()[-lines:])
+
+
+# ======================================================
+# === Point d'entrée ===
+# ======================================================
+
+def _parse_mix(values):
+    mix = dict(DEFAULT_MIX)
+    for value in values or []:
+        route, _, weight = value.partition("=")
+        if route not in ROUTES:
+            raise SystemExit(f"route inconnue: {route} (disponibles: {', '.join(ROUTES)})")
+        mix[route] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge HTTP de l'API CineMatch")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="serveur déjà démarré (ex. http://localhost:5000)")
+    target.add_argument("--start", action="store_true", help="démarre un serveur local sur une copie des données")
+    parser.add_argument("--server-cmd", default=f"{shlex.quote(sys.executable)} server.py", help="commande lancée depuis backend/ avec --start")
+    parser.add_argument("--port", type=int, default=5099, help="port du serveur démarré avec --start")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--data-dir", default=DATA_DIR, help="données servies (et source des identifiants tirés)")
+    parser.add_argument("--mix", nargs="*", metavar="ROUTE=WEIGHT", help="modifie les poids du mélange par défaut")
+    parser.add_argument("--rps", type=float, default=20, help="débit cible (requêtes/s)")
+    parser.add_argument("--duration", type=float, default=30, help="durée mesurée (s)")
+    parser.add_argument("--warmup", type=float, default=5, help="durée de chauffe non mesurée (s)")
+    parser.add_argument("--concurrency", type=int, default=64, help="requêtes simultanées maximum côté client")
+    parser.add_argument("--timeout", type=float, default=30, help="timeout par requête (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="load", help="étiquette 'scale' des résultats JSON")
+    parser.add_argument("--output", help="fichier JSON de résultats (comparable avec benchmarks.compare)")
+    args = parser.parse_args(argv)
+
+    mix = _parse_mix(args.mix)
+    factory = RequestFactory(args.data_dir, args.seed)
+    workdir = tempfile.mkdtemp(prefix="cinematch-load-")
+    process = None
+    try:
+        url = args.url
+        if args.start:
+            print(f"⏳ Démarrage du serveur: {args.server_cmd}", file=sys.stderr)
+            process, url = start_server(args.server_cmd, args.port, args.data_dir, workdir, args.startup_timeout)
+        client = Client(url, args.timeout)
+
+        if args.warmup > 0:
+            print(f"🔥 Chauffe ({args.warmup:.0f}s)...", file=sys.stderr)
+            run_load(client, factory, mix, args.rps, args.warmup, args.concurrency, record=False)
+        print(f"🚀 {args.rps:g} req/s pendant {args.duration:.0f}s sur {url}", file=sys.stderr)
+        stats, elapsed = run_load(client, factory, mix, args.rps, args.duration, args.concurrency)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = summarize(stats, elapsed, args.label)
+    print_report(results)
+    if args.output:
+        meta = {"timestamp": datetime.now().isoformat(), "server": args.server_cmd if args.start else args.url,
+                "args": {key: value for key, value in vars(args).items() if key != "output"}}
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"meta": meta, "results": results}, indent=2) + "\n")
+        print(f"\n✓ Résultats écrits dans {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
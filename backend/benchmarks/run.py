@@ -0,0 +1,337 @@
+"""
+run.py - Benchmarks des chemins critiques (modèle, recommandations, accès aux données)
+
+Pour chaque échelle demandée : génère (ou réutilise) un jeu synthétique,
+charge la base, construit le modèle puis chronomètre chaque méthode de
+recommandation, la recherche, la pagination et les écritures de notes.
+Les pics mémoire sont mesurés avec tracemalloc dans une passe séparée
+(pour ne pas fausser les temps). Les résultats sont écrits en JSON.
+
+Usage (depuis backend/) :
+    python -m benchmarks.run --scales 100k 1m --output bench.json
+    python -m benchmarks.compare base.json bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import datasets
+from config import BECAUSE_WATCHED_MIN_RATING, MIN_RATINGS, TRENDING_HALF_LIVES
+from database.db_manager import DatabaseManager
+from database.storage import CSVStorage
+from model.recommender import MovieRecommender
+from utils.metrics import MODEL_BUILD_SECONDS, REGISTRY
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "cinematch-bench")
+SEARCH_QUERIES = ["star", "love", "night 12", "zzz"]
+
+
+# ======================================================
+# === Mesures ===
+# ======================================================
+
+def _quiet():
+    """Coupe les print() du code mesuré."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _summary(durations):
+    durations = sorted(durations)
+    return {
+        "unit": "s",
+        "samples": len(durations),
+        "min": durations[0],
+        "median": statistics.median(durations),
+        "mean": statistics.fmean(durations),
+        "p95": durations[min(len(durations) - 1, int(round(0.95 * (len(durations) - 1))))],
+        "max": durations[-1],
+    }
+
+
+def _peak_mb(fn):
+    """Exécute fn une fois sous tracemalloc et retourne (résultat, pic en Mo)."""
+    tracemalloc.start()
+    try:
+        with _quiet():
+            result = fn()
+        return result, tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+class Recorder:
+    """Accumule les résultats d'une échelle."""
+
+    def __init__(self, scale, memory):
+        self.scale = scale
+        self.memory = memory
+        self.results = []
+
+    def add(self, name, **fields):
+        self.results.append({"scale": self.scale, "name": name, **fields})
+        if "median" in fields:
+            detail = f"{fields['median'] * 1000:10.3f} ms"
+        elif "value" in fields:
+            detail = f"{fields['value']:10.1f} {fields['unit']}"
+        else:
+            detail = fields.get("skipped", "")
+        peak = f"  peak {fields['peak_mb']:.1f} MB" if "peak_mb" in fields else ""
+        print(f"  {name:<40} {detail}{peak}", file=sys.stderr)
+
+    def time_calls(self, name, fn, args_list):
+        """Chronomètre fn(*args) pour chaque jeu d'arguments."""
+        durations = []
+        for args in args_list:
+            start = time.perf_counter()
+            with _quiet():
+                fn(*args)
+            durations.append(time.perf_counter() - start)
+        self.add(name, **_summary(durations))
+
+    def time_stage(self, name, fn, repeat):
+        """Chronomètre une étape lourde (chargement, construction) et mesure son pic mémoire."""
+        peak = _peak_mb(fn)[1] if self.memory else None
+        durations = []
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with _quiet():
+                result = fn()
+            durations.append(time.perf_counter() - start)
+        fields = _summary(durations)
+        if peak is not None:
+            fields["peak_mb"] = peak
+        self.add(name, **fields)
+        return result
+
+
+# ======================================================
+# === Scénarios ===
+# ======================================================
+
+def _dense_gb(n_users, n_movies):
+    """Mémoire des matrices denses du modèle (user×item, user×user, item×item)."""
+    return (n_users * n_movies * 4 + n_users**2 * 8 + n_movies**2 * 8) / 2**30
+
+
+def bench_scale(scale, args):
+    rec = Recorder(scale, args.memory)
+    rng = np.random.default_rng(args.seed)
+    print(f"\n=== {scale} ===", file=sys.stderr)
+
+    source = datasets.ensure(scale, args.data_dir, args.seed)
+    with tempfile.TemporaryDirectory(prefix="cinematch-bench-") as workdir:
+        # Copie de travail : les écritures mesurées ne modifient pas le jeu en cache
+        files = {table: shutil.copy(path, workdir) for table, path in source.items()}
+
+        db = rec.time_stage("db.load", lambda: DatabaseManager(CSVStorage(files)), args.build_repeat)
+        ratings = db.ratings_df
+        n_users, n_movies = ratings["userId"].nunique(), ratings["movieId"].nunique()
+
+        movie_counts = ratings["movieId"].value_counts()
+        movie_ids = rng.choice(movie_counts[movie_counts >= MIN_RATINGS].index.values, args.samples)
+        user_ids = rng.choice(ratings["userId"].unique(), args.samples)
+
+        # === Accès aux données ===
+        rec.time_calls("db.get_movie_by_id", db.get_movie_by_id, [(int(m),) for m in movie_ids])
+        rec.time_calls("db.search_movies", db.search_movies, [(q,) for q in SEARCH_QUERIES * args.repeat])
+        rec.time_calls("db.get_user_ratings", db.get_user_ratings, [(int(u),) for u in user_ids])
+        rec.time_calls("db.get_popular_movies", db.get_popular_movies, [(10,)] * args.repeat)
+        rec.time_calls("db.get_movie_tag_counts", db.get_movie_tag_counts, [(int(m),) for m in movie_ids])
+
+        # === Modèle ===
+        needed = _dense_gb(n_users, n_movies)
+        recommender = None
+        if needed > args.max_dense_gb:
+            rec.add("model.build", skipped=f"dense matrices need {needed:.1f} GB (> --max-dense-gb {args.max_dense_gb})")
+        else:
+            recommender = rec.time_stage(
+                "model.build",
+                lambda: MovieRecommender(db.movies_df, db.ratings_df, db.tags_df),
+                args.build_repeat,
+            )
+            for component in MovieRecommender.COMPONENTS:
+                seconds = REGISTRY.get(MODEL_BUILD_SECONDS, component=component)
+                rec.add(f"model.build.{component}", **_summary([seconds]))
+
+        # === Recommandations ===
+        if recommender is not None:
+            movies = [(int(m),) for m in movie_ids]
+            users = [(int(u),) for u in user_ids]
+            rec.time_calls("recommend.content", recommender.get_content_based_recommendations, movies)
+            rec.time_calls("recommend.tags", recommender.get_tag_based_recommendations, movies)
+            rec.time_calls("recommend.item", recommender.get_item_based_recommendations, movies)
+            rec.time_calls("recommend.collaborative", recommender.get_collaborative_recommendations, users[:args.slow_samples])
+            rec.time_calls("recommend.similar_users", recommender.get_similar_users, users)
+            rec.time_calls("recommend.popular", recommender.get_popular_recommendations, [()] * args.repeat)
+            rec.time_calls("recommend.hybrid", recommender.get_hybrid_recommendations, users)
+            rec.time_calls("recommend.hybrid.movie", recommender.get_hybrid_recommendations,
+                           [(u, m) for (u,), (m,) in zip(users, movies)])
+            windows = [(10, window) for window in TRENDING_HALF_LIVES] * args.repeat
+            rec.time_calls("recommend.trending", recommender.get_trending_recommendations, windows)
+            seeds = _favourites(ratings, user_ids)
+            rec.time_calls("recommend.because_you_watched", recommender.get_because_you_watched,
+                           [(int(u), seeds[u]) for u in user_ids])
+            rec.time_calls("recommend.user_profile", recommender.get_user_profile, users)
+
+        # === Routes HTTP (sérialisation JSON comprise) ===
+        client = _client(db, recommender)
+        pages = rng.integers(1, max(2, len(db.movies_df) // 20), args.samples)
+        rec.time_calls("http.movies.page", client.get, [(f"/api/movies?page={p}&per_page=20",) for p in pages])
+        rec.time_calls("http.movies.search", client.get, [(f"/api/movies/search?q={q}",) for q in SEARCH_QUERIES * args.repeat])
+        rec.time_calls("http.movies.details", client.get, [(f"/api/movies/{m}",) for m in movie_ids])
+        if recommender is not None:
+            rec.time_calls("http.recommendations.item", client.get, [(f"/api/recommendations/item/{m}",) for m in movie_ids])
+            # Listes classées : première page calculée (cache vidé), puis page servie depuis le cache
+            hybrid = [(f"/api/recommendations/hybrid/{u}",) for u in user_ids]
+            trending = [(f"/api/recommendations/trending?window={w}",) for w in TRENDING_HALF_LIVES] * args.repeat
+            for name, urls in (("hybrid", hybrid), ("trending", trending)):
+                rec.time_calls(f"http.recommendations.{name}", _uncached(client.get), urls)
+                with _quiet():
+                    for (url,) in urls:
+                        client.get(url)
+                rec.time_calls(f"http.recommendations.{name}.cached", client.get, urls)
+            rec.time_calls("http.recommendations.because_you_watched", client.get,
+                           [(f"/api/recommendations/because-you-watched/{u}",) for u in user_ids])
+
+        # === Écritures ===
+        rated = set(zip(ratings["userId"].tolist(), ratings["movieId"].tolist()))
+        all_movies = db.movies_df["movieId"].values
+        new_pairs = []
+        while len(new_pairs) < args.samples:
+            pair = (int(rng.choice(user_ids)), int(rng.choice(all_movies)))
+            if pair not in rated and pair not in new_pairs:
+                new_pairs.append(pair)
+        existing = ratings.sample(args.samples, random_state=args.seed)[["userId", "movieId"]].astype(int).values.tolist()
+
+        rec.time_calls("write.rating_insert", db.upsert_rating, [(u, m, 4.0) for u, m in new_pairs])
+        rec.time_calls("write.rating_update", db.upsert_rating, [(u, m, 2.5) for u, m in existing])
+        rec.time_calls("write.rating_delete", db.delete_rating, new_pairs)
+
+        batch = ratings.sample(min(args.bulk_size, len(ratings)), random_state=args.seed + 1)[["userId", "movieId"]]
+        batch = batch.assign(rating=rng.choice(np.arange(1, 11) / 2, len(batch)))
+        summary, applied = None, None
+
+        def bulk():
+            nonlocal summary, applied
+            summary, applied = db.add_ratings_bulk(batch)
+
+        rec.time_calls("write.bulk_upsert", bulk, [()])
+        if recommender is not None:
+            # Mise à jour copy-on-write du modèle : durée et pic mémoire (copies faites pendant la bascule)
+            rec.time_stage("model.apply_ratings", lambda: recommender.apply_ratings(db.ratings_df, applied), 1)
+            single = applied.iloc[:1]
+            rec.time_stage("model.apply_ratings.single", lambda: recommender.apply_ratings(db.ratings_df, single), 1)
+        rec.time_calls("write.flush", db.flush, [()])
+
+    rec.add("process.max_rss", unit="MB", value=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+    return rec.results
+
+
+def _favourites(ratings, user_ids):
+    """Films aimés de chaque utilisateur, du plus récent au plus ancien (graines de « because you watched »)."""
+    liked = ratings[ratings["userId"].isin(user_ids) & (ratings["rating"] >= BECAUSE_WATCHED_MIN_RATING)]
+    liked = liked.sort_values("timestamp", ascending=False)
+    seeds = liked.groupby("userId")["movieId"].agg(list)
+    return {u: seeds.get(u, []) for u in user_ids}
+
+
+def _uncached(get):
+    """get() après avoir vidé le cache des listes classées : mesure leur calcul."""
+    import server
+
+    def call(*args):
+        server.app.result_cache.clear()
+        return get(*args)
+
+    return call
+
+
+def _client(db, recommender):
+    """Client de test Flask branché sur les objets mesurés."""
+    with _quiet():
+        import server
+        from api.routes import register_routes
+
+        server.app.db_manager = db
+        server.app.recommender = recommender
+        if "movies" not in server.app.blueprints:
+            register_routes(server.app)
+    return server.app.test_client()
+
+
+# ======================================================
+# === Point d'entrée ===
+# ======================================================
+
+def _metadata(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import scipy
+    import sklearn
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": {"numpy": np.__version__, "pandas": pd.__version__, "scipy": scipy.__version__, "sklearn": sklearn.__version__},
+        "args": {key: value for key, value in vars(args).items() if key != "output"},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks CineMatch sur données synthétiques")
+    parser.add_argument("--scales", nargs="+", default=["100k"], choices=sorted(datasets.SCALES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--samples", type=int, default=20, help="appels mesurés par méthode")
+    parser.add_argument("--slow-samples", type=int, default=3, help="appels mesurés pour le filtrage collaboratif")
+    parser.add_argument("--repeat", type=int, default=5, help="répétitions des appels sans argument variable")
+    parser.add_argument("--build-repeat", type=int, default=1, help="répétitions du chargement et de la construction")
+    parser.add_argument("--bulk-size", type=int, default=1000)
+    parser.add_argument("--max-dense-gb", type=float, default=4.0, help="au-delà, la construction du modèle est ignorée")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="désactive la passe tracemalloc")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="cache des jeux générés")
+    parser.add_argument("--output", default="-", help="fichier JSON de sortie ('-' : stdout)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in args.scales:
+        results.extend(bench_scale(scale, args))
+
+    report = json.dumps({"meta": _metadata(args), "results": results}, indent=2)
+    if args.output == "-":
+        print(report)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+        print(f"\n✓ Résultats écrits dans {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,13 @@ Contains all configuration parameters and file paths
 """
 
 import os
+import tempfile
 
 # ============================
 # BASE CONFIGURATION
 # ============================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+DATA_DIR = os.environ.get('CINEMATCH_DATA_DIR', os.path.join(BASE_DIR, 'data'))  # Override to serve a copy of the data
 
 # ============================
 # DATA FILE PATHS
@@ -23,6 +24,14 @@ LINKS_FILE = os.path.join(DATA_DIR, 'links.csv')
 TAGS_FILE = os.path.join(DATA_DIR, 'tags.csv')
 USERS_FILE = os.path.join(DATA_DIR, 'users.csv')
 
+# ============================
+# STORAGE BACKEND
+# ============================
+STORAGE_BACKEND = os.environ.get('CINEMATCH_STORAGE', 'csv')  # 'csv' or 'sqlite'
+SQLITE_FILE = os.path.join(DATA_DIR, 'cinematch.db')  # Created and imported from the CSVs on first use
+CSV_COMPACT_FRACTION = 0.2     # CSV updates/deletes are appended; rewrite the file once they exceed this share of its rows...
+CSV_COMPACT_MIN_ROWS = 1000    # ...and at least this many rows
+
 # ============================
 # RECOMMENDATION MODEL SETTINGS
 # ============================
@@ -32,14 +41,36 @@ MIN_RATINGS = 10  # Minimum number of ratings for a movie to be considered
 # ============================
 # API SERVER CONFIGURATION
 # ============================
+ENV = os.environ.get('CINEMATCH_ENV', 'development')  # 'development' or 'production'
+
 HOST = '0.0.0.0'  # Server host (0.0.0.0 = accessible from network)
-PORT = 5000       # Server port
-DEBUG = True      # Debug mode (set to False in production)
+PORT = int(os.environ.get('CINEMATCH_PORT', 5000))  # Server port
+DEBUG = ENV != 'production'  # Debug mode (disabled by the production profile)
 
 # Keep legacy names for backward compatibility
 API_HOST = HOST
 API_PORT = PORT
 
+# ============================
+# PRODUCTION SERVER (gunicorn, see gunicorn.conf.py)
+# ============================
+# Pre-forked worker processes: one per core with SQLite, a single one with CSV (single writing process)
+WORKERS = int(os.environ.get('CINEMATCH_WORKERS', (os.cpu_count() or 1) if STORAGE_BACKEND == 'sqlite' else 1))
+THREADS_PER_WORKER = int(os.environ.get('CINEMATCH_THREADS', 4))         # Threads per worker (gthread)
+WORKER_TIMEOUT = 120        # Seconds before a silent worker is killed and restarted
+GRACEFUL_TIMEOUT = 30       # Seconds a worker gets to finish in-flight requests on recycle/shutdown
+MAX_REQUESTS = 5000         # Recycle a worker after this many requests...
+MAX_REQUESTS_JITTER = 500   # ...plus a random jitter so workers don't restart together
+
+# ============================
+# ASYNC SERVER (uvicorn, see asgi.py)
+# ============================
+ASYNC_HEAVY_PREFIXES = ('/api/recommendations',)  # Routes run on the CPU-heavy executor
+ASYNC_HEAVY_WORKERS = 4        # Threads of the CPU-heavy executor
+ASYNC_LIGHT_WORKERS = 32       # Threads of the executor for cheap endpoints
+ASYNC_HEAVY_CONCURRENCY = 4    # Max in-flight requests per heavy endpoint
+ASYNC_LIGHT_CONCURRENCY = 32   # Max in-flight requests per cheap endpoint
+
 # ============================
 # SECURITY SETTINGS
 # ============================
@@ -63,17 +94,32 @@ CORS_ORIGINS = [
 LOG_LEVEL = 'INFO'  # Options: DEBUG, INFO, WARNING, ERROR, CRITICAL
 LOG_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
 
+# ============================
+# REQUEST PROFILING (opt-in, see utils/profiling.py)
+# ============================
+PROFILE_TOKEN = os.environ.get('CINEMATCH_PROFILE_TOKEN')  # Admin token for X-Profile-Token; unset = profiling disabled
+PROFILE_INTERVAL = 0.005    # Seconds between stack samples
+PROFILE_DIR = os.environ.get('CINEMATCH_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'cinematch-profiles'))
+PROFILE_HISTORY = 50        # Most recent profiles kept on disk
+
 # ============================
 # CACHE SETTINGS
 # ============================
 CACHE_ENABLED = True
 CACHE_TIMEOUT = 300  # Cache timeout in seconds (5 minutes)
+RESULT_CACHE_ENTRIES = 2048  # Ranked recommendation lists kept for pagination (LRU, ~4 KB each)
 
 # ============================
 # PAGINATION SETTINGS
 # ============================
 DEFAULT_PAGE_SIZE = 20
 MAX_PAGE_SIZE = 100
+RECOMMENDATION_MAX_RESULTS = 500  # Depth of a paginated recommendation list (computed once, then paged)
+
+# ============================
+# BULK IMPORT SETTINGS
+# ============================
+MAX_BULK_RATINGS = 100000  # Max ratings accepted by POST /api/ratings/bulk
 
 # ============================
 # RECOMMENDATION ALGORITHM WEIGHTS
@@ -86,12 +132,65 @@ HYBRID_WEIGHTS = {
     'popularity': 0.1      # Popularity-based
 }
 
+# ============================
+# TRENDING (time-decayed popularity, see model/trending.py)
+# ============================
+TRENDING_HALF_LIVES = {         # Half-life of a rating's weight per window, in seconds
+    'week': 7 * 24 * 3600,
+    'month': 30 * 24 * 3600,
+    'year': 365 * 24 * 3600,
+}
+TRENDING_DEFAULT_WINDOW = 'month'
+TRENDING_MIN_WEIGHT = 0.5       # Minimum decayed rating count (recent ratings) for a movie to trend
+TRENDING_PRIOR_RATINGS = 2      # Pseudo-ratings at the global average mixed into each movie's recent average
+TRENDING_REFERENCE = os.environ.get('CINEMATCH_TRENDING_REFERENCE', 'data')  # Scores decay to: 'data' (recent end of the loaded ratings), 'now' (request time) or a Unix time
+TRENDING_REFERENCE_QUANTILE = 0.999  # Quantile of the rating times used as the 'data' reference (ignores a few outlying late ratings)
+
 # ============================
 # SIMILARITY THRESHOLDS
 # ============================
 MIN_SIMILARITY_THRESHOLD = 0.1  # Minimum similarity score to consider
 TOP_SIMILAR_USERS = 50          # Number of similar users to consider
 
+# ============================
+# CANDIDATE GENERATION (two-stage hybrid recommendations)
+# ============================
+CANDIDATE_POOL_SIZE = 500       # Candidates scored exactly per request
+CANDIDATE_NEIGHBOR_MOVIES = 200 # Best movies of the user's nearest neighbours (TOP_SIMILAR_USERS)
+CANDIDATE_SEED_LIKES = 20       # User's highest-rated movies whose item neighbours are candidates
+ITEM_NEIGHBORS_K = 50           # Item neighbours precomputed per movie
+CANDIDATE_GENRES = 3            # User's favourite genres whose postings are candidates
+CANDIDATE_GENRE_POSTINGS = 50   # Most popular movies kept per genre
+CANDIDATE_TRENDING = 50         # Trending movies added to every candidate pool
+
+# ============================
+# DIVERSITY RE-RANKING (maximal marginal relevance, see model/diversity.py)
+# ============================
+MMR_POOL_SIZE = 200             # Best-ranked movies re-ranked when a diversity is requested
+DIVERSITY_SIMILARITIES = ('item', 'genre')  # Similarities diversify_by accepts (ratings cosine, genre cosine)
+
+# ============================
+# "BECAUSE YOU WATCHED" ROWS (home page)
+# ============================
+BECAUSE_WATCHED_ROWS = 4          # Rows per response, one per recent favourite
+BECAUSE_WATCHED_MAX_ROWS = 10     # Upper bound of the rows query parameter
+BECAUSE_WATCHED_MIN_RATING = 4.0  # Minimum rating for a movie to seed a row
+
+# ============================
+# TAG-BASED CONTENT SIMILARITY
+# ============================
+TAG_NEIGHBORS_K = 100           # Neighbours precomputed per movie (>= max n)
+SIMILARITY_BLOCK_SIZE = 1024    # Movies scored per block when precomputing neighbours
+SIMILARITY_PATCH_FRACTION = 0.25  # Share of rows a similarity matrix may override before an update copies it whole
+
+# ============================
+# OFFLINE EVALUATION (see model/evaluation.py)
+# ============================
+EVAL_TEST_FRACTION = 0.2         # Most recent share of ratings held out for testing
+EVAL_K = 10                      # Cut-off of precision@k, recall@k and NDCG@k
+EVAL_RELEVANCE_THRESHOLD = 4.0   # Held-out ratings at or above this count as relevant
+EVAL_BATCH_SIZE = 256            # Users scored together in one vectorized batch
+
 # ============================
 # VALIDATION
 # ============================
@@ -128,7 +227,9 @@ def print_config():
     print(f"🔗 Links File: {os.path.basename(LINKS_FILE)} {'✓' if os.path.exists(LINKS_FILE) else '✗'}")
     print(f"🏷️  Tags File: {os.path.basename(TAGS_FILE)} {'✓' if os.path.exists(TAGS_FILE) else '✗'}")
     print(f"👤 Users File: {os.path.basename(USERS_FILE)} {'✓' if os.path.exists(USERS_FILE) else '✗'}")
+    print(f"🗄️  Storage: {STORAGE_BACKEND}" + (f" ({os.path.basename(SQLITE_FILE)})" if STORAGE_BACKEND == 'sqlite' else ''))
     print(f"\n🌐 Server: http://{HOST}:{PORT}")
+    print(f"🏷️  Environment: {ENV}")
     print(f"🔧 Debug Mode: {'Enabled' if DEBUG else 'Disabled'}")
     print(f"📊 Min Ratings: {MIN_RATINGS}")
     print(f"🎯 Default Recommendations: {N_RECOMMENDATIONS}")
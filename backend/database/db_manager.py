@@ -1,75 +1,174 @@
+import atexit
 import os
 import sys
+import threading
 import time
+import numpy as np
 import pandas as pd
 
 # === Import des chemins depuis config.py ===
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import MOVIES_FILE, RATINGS_FILE
+from config import STORAGE_BACKEND
+from database.storage import apply_schema, create_storage
+from database.tag_index import TagIndex
+from database.writer import TableWriter
+from utils.metrics import DB_QUERY_SECONDS, timed
+from utils.validators import validate_rating_value
 
 
 class DatabaseManager:
     """
-    Gestionnaire de base de données locale (CSV) pour le système de recommandation de films.
-    Gère les fichiers :
-      - movies.csv
-      - ratings.csv
-      - users.csv
-      - tags.csv (optionnel)
-      - links.csv (optionnel)
+    Gestionnaire de base de données locale pour le système de recommandation de films.
+    Gère les tables :
+      - movies
+      - ratings
+      - users
+      - tags (optionnel)
+      - links (optionnel)
+    Les données sont servies depuis la mémoire ; la persistance est déléguée
+    à un stockage interchangeable (CSV par défaut, ou SQLite, voir config.STORAGE_BACKEND).
+
+    Concurrence :
+      - les lectures ne prennent aucun verrou : elles lisent des DataFrames et
+        index publiés, jamais modifiés sur place (copy-on-write) ;
+      - les écritures sont sérialisées par un verrou, publient d'abord le
+        nouveau DataFrame puis le nouvel index, et incrémentent `generation`
+        (clé utilisable par les caches) ;
+      - la persistance est faite par un thread d'écriture unique, les
+        lectures n'attendent donc jamais le stockage ; une écriture attend
+        sa sauvegarde (hors verrou) et signale son échec à l'appelant.
+
+    Coût d'une écriture de note : la ligne est retrouvée en O(1) par l'index,
+    mais la publication copie ratings_df (copy-on-write, O(N) en mémoire) ;
+    le stockage n'écrit que les lignes modifiées (ajout au journal CSV,
+    compacté de temps en temps, ou requête indexée SQLite).
+
+    Plusieurs processus (workers gunicorn) ont chacun leurs tables en mémoire :
+    une écriture n'est visible que dans le worker qui l'a reçue, jusqu'au
+    prochain chargement, même avec SQLite (qui ne partage que la persistance).
+    Le stockage CSV suppose un seul processus écrivain : gunicorn refuse de
+    démarrer plusieurs workers avec STORAGE_BACKEND='csv'.
     """
 
-    def __init__(self):
+    def __init__(self, storage=None):
         self.movies_df = None
         self.ratings_df = None
         self.users_df = None
         self.tags_df = None
         self.links_df = None
-        self.data_dir = os.path.dirname(MOVIES_FILE)
+        self._user_positions = {}
+        self._rating_positions = {}
+        self.tag_index = TagIndex()
+        self.generation = 0
+        self._write_lock = threading.Lock()
+        self._writer = TableWriter()
+        atexit.register(self._writer.flush)
+        self.storage = storage or create_storage(STORAGE_BACKEND)
         self.load_data()
 
     # ======================================================
     # === Chargement des données ===
     # ======================================================
 
+    @timed(DB_QUERY_SECONDS)
     def load_data(self):
-        """Charge les différents fichiers CSV et initialise les DataFrames."""
+        """Charge les différentes tables depuis le stockage et initialise les DataFrames."""
         try:
             # === Films ===
-            self.movies_df = self._load_csv(MOVIES_FILE, "films", required=True)
+            self.movies_df = self.storage.load("movies", required=True)
             # === Notes ===
-            self.ratings_df = self._load_csv(RATINGS_FILE, "ratings", required=True)
+            self.ratings_df = self.storage.load("ratings", required=True)
             # === Utilisateurs ===
-            self.users_df = self._load_csv(os.path.join(self.data_dir, "users.csv"), "utilisateurs", required=False)
+            self.users_df = self.storage.load("users")
             # === Tags (optionnels) ===
-            self.tags_df = self._load_csv(os.path.join(self.data_dir, "tags.csv"), "tags", required=False)
+            self.tags_df = self.storage.load("tags")
             # === Liens (optionnels) ===
-            self.links_df = self._load_csv(os.path.join(self.data_dir, "links.csv"), "liens", required=False)
+            self.links_df = self.storage.load("links")
+
+            self._index_users()
+            self._index_ratings()
+            self.tag_index = TagIndex.build(self.tags_df)
 
         except Exception as e:
             print(f"❌ Erreur lors du chargement des données : {e}")
             raise
 
-    def _load_csv(self, path, label, required=False):
-        """Charge un fichier CSV s'il existe, sinon retourne None."""
-        if os.path.exists(path):
-            df = pd.read_csv(path, encoding="utf-8", on_bad_lines="warn")
-            print(f"✓ {len(df)} {label} chargés depuis {os.path.basename(path)}")
-            return df
-        elif required:
-            raise FileNotFoundError(f"Fichier requis introuvable : {path}")
-        else:
-            print(f"ℹ️  Fichier {os.path.basename(path)} non trouvé (optionnel)")
-            return None
+    def _index_users(self):
+        """Construit l'index id → position des utilisateurs dans users_df."""
+        if self.users_df is None:
+            self._user_positions = {}
+            return
+        self._user_positions = {int(uid): pos for pos, uid in enumerate(self.users_df["id"])}
+
+    @staticmethod
+    def _rating_key(user_id, movie_id):
+        """Clé entière unique d'un couple (utilisateur, film)."""
+        return (int(user_id) << 32) | int(movie_id)
+
+    def _index_ratings(self):
+        """
+        Dédoublonne les notes (la plus récente l'emporte) puis construit l'index
+        (utilisateur, film) → position dans ratings_df.
+        Cet index n'est utilisé que par les écritures, sous le verrou d'écriture.
+        """
+        ratings = self.ratings_df
+        duplicated = ratings.duplicated(["userId", "movieId"], keep=False)
+        if duplicated.any():
+            before = len(ratings)
+            ratings = (
+                ratings.sort_values("timestamp", kind="stable")
+                .drop_duplicates(["userId", "movieId"], keep="last")
+                .sort_index()
+                .reset_index(drop=True)
+            )
+            self.ratings_df = ratings
+            self._writer.submit(self.storage.replace, "ratings", ratings)
+            print(f"⚠️  {before - len(ratings)} ratings en double supprimés")
+
+        keys = (ratings["userId"].to_numpy("int64") << 32) | ratings["movieId"].to_numpy("int64")
+        self._rating_positions = dict(zip(keys.tolist(), range(len(keys))))
+
+    @staticmethod
+    def _append(df, rows):
+        """
+        Retourne un nouveau DataFrame `df` + `rows` qui garde les types compacts :
+        les catégories sont étendues aux nouvelles valeurs au lieu de repasser en objets.
+        """
+        for column in df.select_dtypes("category").columns:
+            new = pd.Index(rows[column].dropna().unique()).difference(df[column].cat.categories)
+            if len(new):
+                df = df.assign(**{column: df[column].cat.add_categories(new)})
+        rows = rows[df.columns].astype(df.dtypes.to_dict())
+        return pd.concat([df, rows], ignore_index=True)
+
+    def _publish(self, operation, *args):
+        """Termine une écriture : incrémente la génération et planifie sa persistance (retourne son Future)."""
+        self.generation += 1
+        return self._writer.submit(operation, *args)
+
+    @staticmethod
+    def _persisted(saved):
+        """Attend la sauvegarde d'une écriture ; False si le stockage a échoué (erreur déjà journalisée)."""
+        try:
+            saved.result()
+            return True
+        except Exception:
+            return False
+
+    def flush(self):
+        """Attend la fin des sauvegardes en cours."""
+        self._writer.flush()
 
     # ======================================================
     # === Méthodes Films ===
     # ======================================================
 
+    @timed(DB_QUERY_SECONDS)
     def get_all_movies(self):
         """Retourne tous les films sous forme de liste de dictionnaires."""
         return [] if self.movies_df is None else self.movies_df.to_dict("records")
 
+    @timed(DB_QUERY_SECONDS)
     def get_movie_by_id(self, movie_id):
         """Retourne les informations d’un film selon son ID."""
         if self.movies_df is None:
@@ -77,6 +176,7 @@ class DatabaseManager:
         movie = self.movies_df[self.movies_df["movieId"] == movie_id]
         return movie.iloc[0].to_dict() if not movie.empty else None
 
+    @timed(DB_QUERY_SECONDS)
     def search_movies(self, query):
         """Recherche les films contenant le texte donné dans leur titre."""
         if not query or self.movies_df is None:
@@ -85,6 +185,7 @@ class DatabaseManager:
         results = self.movies_df[self.movies_df["title"].str.lower().str.contains(query, na=False)]
         return results.to_dict("records")
 
+    @timed(DB_QUERY_SECONDS)
     def get_movies_by_genre(self, genre):
         """Retourne les films d’un genre spécifique."""
         if not genre or self.movies_df is None:
@@ -92,6 +193,7 @@ class DatabaseManager:
         results = self.movies_df[self.movies_df["genres"].str.contains(genre, case=False, na=False)]
         return results.to_dict("records")
 
+    @timed(DB_QUERY_SECONDS)
     def get_all_genres(self):
         """Retourne la liste de tous les genres uniques."""
         if self.movies_df is None or "genres" not in self.movies_df.columns:
@@ -101,13 +203,16 @@ class DatabaseManager:
             all_genres.update(g.split("|"))
         return sorted(all_genres)
 
+    @timed(DB_QUERY_SECONDS)
     def get_popular_movies(self, n=6, min_ratings=10):
         """Retourne les films les mieux notés avec au moins `min_ratings` avis."""
         if self.movies_df is None or self.ratings_df is None:
             return []
 
+        # Moyennes calculées en float64 (les notes sont stockées en float32)
+        ratings = self.ratings_df
         stats = (
-            self.ratings_df.groupby("movieId")["rating"]
+            ratings["rating"].astype("float64").groupby(ratings["movieId"])
             .agg(["count", "mean"])
             .rename(columns={"count": "num_ratings", "mean": "avg_rating"})
             .reset_index()
@@ -123,28 +228,160 @@ class DatabaseManager:
     # === Méthodes Ratings ===
     # ======================================================
 
+    @timed(DB_QUERY_SECONDS)
     def add_rating(self, user_id, movie_id, rating):
-        """Ajoute un rating (note) pour un utilisateur et un film."""
-        if not (0 <= rating <= 5):
-            print("❌ Rating invalide : doit être entre 0 et 5")
-            return False
+        """Ajoute ou met à jour la note d'un utilisateur pour un film."""
+        return self.upsert_rating(user_id, movie_id, rating)[0]
+
+    @timed(DB_QUERY_SECONDS)
+    def upsert_rating(self, user_id, movie_id, rating):
+        """
+        Ajoute la note d'un utilisateur pour un film, ou remplace celle qui existe.
+        La ligne existante est retrouvée en O(1) grâce à l'index (utilisateur, film),
+        mais une mise à jour copie ratings_df avant de le publier (O(N)) ;
+        le stockage n'écrit que la ligne modifiée.
+        La note suit les mêmes règles que la route et l'import en bloc : 0.5 à 5.0
+        par pas de 0.5 (0 signifie « non noté » pour le modèle).
+
+        Returns:
+            tuple: (succès, True si une note existante a été mise à jour)
+        """
+        valid, error = validate_rating_value(rating)
+        if not valid:
+            print(f"❌ Rating invalide : {error}")
+            return False, False
         if self.get_movie_by_id(movie_id) is None:
             print(f"❌ Film introuvable (ID: {movie_id})")
-            return False
+            return False, False
 
+        key = self._rating_key(user_id, movie_id)
+        timestamp = int(time.time())
         new_entry = pd.DataFrame(
-            {"userId": [user_id], "movieId": [movie_id], "rating": [rating], "timestamp": [int(time.time())]}
+            {"userId": [user_id], "movieId": [movie_id], "rating": [rating], "timestamp": [timestamp]}
         )
-        self.ratings_df = pd.concat([self.ratings_df, new_entry], ignore_index=True)
-
-        try:
-            self.ratings_df.to_csv(RATINGS_FILE, index=False)
-            print(f"✓ Rating ajouté : user {user_id} → movie {movie_id} → {rating}★")
-            return True
-        except Exception as e:
-            print(f"❌ Erreur lors de la sauvegarde du rating : {e}")
-            return False
-
+        with self._write_lock:
+            pos = self._rating_positions.get(key)
+            if pos is None:
+                self.ratings_df = self._append(self.ratings_df, new_entry)
+                self._rating_positions[key] = len(self.ratings_df) - 1
+                saved = self._publish(self.storage.insert, "ratings", new_entry)
+            else:
+                ratings = self.ratings_df.copy()
+                ratings.loc[pos, "rating"] = rating
+                ratings.loc[pos, "timestamp"] = timestamp
+                self.ratings_df = ratings
+                saved = self._publish(self.storage.upsert, "ratings", new_entry, ["userId", "movieId"])
+
+        updated = pos is not None
+        if not self._persisted(saved):
+            return False, updated
+        print(f"✓ Rating {'mis à jour' if updated else 'ajouté'} : user {user_id} → movie {movie_id} → {rating}★")
+        return True, updated
+
+    @timed(DB_QUERY_SECONDS)
+    def delete_rating(self, user_id, movie_id):
+        """
+        Supprime la note d'un utilisateur pour un film. Retourne False si elle n'existe pas.
+        La dernière ligne prend la place de la ligne supprimée : seule sa
+        position change dans l'index. Le nouveau ratings_df publié est une
+        copie (O(N)) ; le stockage n'écrit que la suppression.
+        Lève l'erreur du stockage si la suppression n'a pas pu être sauvegardée.
+        """
+        key = self._rating_key(user_id, movie_id)
+        with self._write_lock:
+            pos = self._rating_positions.get(key)
+            if pos is None:
+                return False
+            ratings = self.ratings_df
+            last = len(ratings) - 1
+            order = np.arange(last)
+            if pos != last:
+                order[pos] = last
+            self.ratings_df = ratings.take(order).reset_index(drop=True)
+
+            del self._rating_positions[key]
+            if pos != last:
+                moved = ratings.iloc[last]
+                self._rating_positions[self._rating_key(moved["userId"], moved["movieId"])] = pos
+            saved = self._publish(self.storage.delete, "ratings", {"userId": user_id, "movieId": movie_id})
+
+        saved.result()  # erreur du stockage remontée à l'appelant
+        print(f"✓ Rating supprimé : user {user_id} → movie {movie_id}")
+        return True
+
+    @timed(DB_QUERY_SECONDS)
+    def add_ratings_bulk(self, ratings):
+        """
+        Ajoute ou met à jour des notes en bloc : validation vectorisée, une seule
+        fusion en mémoire et une seule écriture dans le stockage
+
+        Args:
+            ratings: DataFrame avec les colonnes userId, movieId, rating (timestamp optionnel)
+
+        Returns:
+            tuple: (dict résumé, DataFrame des notes appliquées)
+        Raises:
+            ValueError: colonnes manquantes
+            Exception: erreur du stockage si les notes n'ont pas pu être sauvegardées
+        """
+        missing = [column for column in ("userId", "movieId", "rating") if column not in ratings.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+
+        batch = pd.DataFrame({
+            "userId": pd.to_numeric(ratings["userId"], errors="coerce"),
+            "movieId": pd.to_numeric(ratings["movieId"], errors="coerce"),
+            "rating": pd.to_numeric(ratings["rating"], errors="coerce"),
+            "timestamp": pd.to_numeric(ratings["timestamp"], errors="coerce") if "timestamp" in ratings.columns else None,
+        }, index=ratings.index)
+
+        # Première raison de rejet de chaque ligne (None = valide)
+        reasons = pd.Series(None, index=batch.index, dtype=object)
+
+        def reject(mask, reason):
+            reasons[mask & reasons.isna()] = reason
+
+        reject(batch[["userId", "movieId", "rating"]].isna().any(axis=1), "champ manquant ou non numérique")
+        reject(~batch["rating"].between(0.5, 5.0) | ((batch["rating"] * 2) % 1 != 0), "note invalide (0.5 à 5.0 par pas de 0.5)")
+        if self.users_df is not None:
+            reject(~batch["userId"].isin(list(self._user_positions)), "utilisateur introuvable")
+        reject(~batch["movieId"].isin(self.movies_df["movieId"]), "film introuvable")
+
+        valid = batch[reasons.isna()].astype({"userId": "int64", "movieId": "int64", "rating": "float64"})
+        valid["timestamp"] = valid["timestamp"].fillna(int(time.time())).astype("int64")
+        valid = apply_schema("ratings", valid.drop_duplicates(["userId", "movieId"], keep="last").reset_index(drop=True))
+
+        keys = (valid["userId"].to_numpy("int64") << 32) | valid["movieId"].to_numpy("int64")
+        saved = None
+        with self._write_lock:
+            index = self._rating_positions
+            positions = np.array([index.get(key, -1) for key in keys.tolist()], dtype=np.int64)
+            existing = positions >= 0
+            updated = int(existing.sum())
+            if not valid.empty:
+                ratings = self.ratings_df.copy()
+                for column in ("rating", "timestamp"):
+                    ratings.loc[positions[existing], column] = valid.loc[existing, column].to_numpy()
+                added = valid[~existing]
+                start = len(ratings)
+                self.ratings_df = self._append(ratings, added)
+                index.update(zip(keys[~existing].tolist(), range(start, start + len(added))))
+                saved = self._publish(self.storage.upsert, "ratings", valid, ["userId", "movieId"])
+        if saved is not None:
+            saved.result()  # erreur du stockage remontée à l'appelant
+
+        rejected = reasons.dropna()
+        summary = {
+            "received": int(len(batch)),
+            "inserted": int(len(valid) - updated),
+            "updated": int(updated),
+            "rejected": int(len(rejected)),
+            "errors": [{"row": int(row), "error": reason} for row, reason in rejected.head(100).items()],
+        }
+        print(f"✓ Import de ratings : {summary['inserted']} ajoutés, {summary['updated']} mis à jour, {summary['rejected']} rejetés")
+        return summary, valid
+
+    @timed(DB_QUERY_SECONDS)
     def get_user_ratings(self, user_id):
         """Retourne toutes les notes d’un utilisateur avec les infos des films."""
         if self.ratings_df is None:
@@ -152,22 +389,44 @@ class DatabaseManager:
         data = self.ratings_df[self.ratings_df["userId"] == user_id]
         return data.merge(self.movies_df, on="movieId", how="left").to_dict("records")
 
+    @timed(DB_QUERY_SECONDS)
+    def get_movie_ratings(self, movie_id):
+        """Retourne toutes les notes d’un film."""
+        if self.ratings_df is None:
+            return []
+        return self.ratings_df[self.ratings_df["movieId"] == movie_id].to_dict("records")
+
+    @timed(DB_QUERY_SECONDS)
     def get_movie_avg_rating(self, movie_id):
         """Retourne la moyenne des notes d’un film."""
         data = self.ratings_df[self.ratings_df["movieId"] == movie_id]
-        return None if data.empty else data["rating"].mean()
+        return None if data.empty else float(data["rating"].astype("float64").mean())
 
     # ======================================================
     # === Méthodes Utilisateurs ===
     # ======================================================
 
+    @timed(DB_QUERY_SECONDS)
     def get_user_by_id(self, user_id):
         """Retourne un utilisateur selon son ID."""
-        if self.users_df is None:
+        # L'index est lu avant le DataFrame (publié en premier par les écritures)
+        pos = self._user_positions.get(user_id)
+        users = self.users_df
+        if users is None:
             return None
-        user = self.users_df[self.users_df["id"] == user_id]
-        return user.iloc[0].to_dict() if not user.empty else None
-
+        return None if pos is None else users.iloc[pos].to_dict()
+
+    @timed(DB_QUERY_SECONDS)
+    def get_users_by_ids(self, user_ids):
+        """Retourne {id: utilisateur} pour une liste d'IDs, en une seule lecture indexée."""
+        index = self._user_positions
+        users = self.users_df
+        if users is None:
+            return {}
+        positions = [index[uid] for uid in user_ids if uid in index]
+        return {int(user["id"]): user for user in users.iloc[positions].to_dict("records")}
+
+    @timed(DB_QUERY_SECONDS)
     def get_user_by_username(self, username):
         """Retourne un utilisateur selon son username."""
         if self.users_df is None:
@@ -175,6 +434,7 @@ class DatabaseManager:
         user = self.users_df[self.users_df["username"] == username]
         return user.iloc[0].to_dict() if not user.empty else None
 
+    @timed(DB_QUERY_SECONDS)
     def authenticate_user(self, username, password):
         """Vérifie les identifiants d'un utilisateur."""
         user = self.get_user_by_username(username)
@@ -192,28 +452,36 @@ class DatabaseManager:
             }
         return None
 
+    @timed(DB_QUERY_SECONDS)
     def add_user(self, username, firstname, lastname, password):
         """Crée un nouvel utilisateur."""
         if self.users_df is None:
             return False
-        if not self.users_df[self.users_df["username"] == username].empty:
-            print(f"❌ Username '{username}' déjà existant")
-            return False
 
-        new_id = int(self.users_df["id"].max()) + 1 if not self.users_df.empty else 1
-        new_user = pd.DataFrame(
-            {"id": [new_id], "username": [username], "firstname": [firstname], "lastname": [lastname], "password": [password]}
-        )
+        with self._write_lock:
+            users = self.users_df
+            if not users[users["username"] == username].empty:
+                print(f"❌ Username '{username}' déjà existant")
+                return False
 
-        self.users_df = pd.concat([self.users_df, new_user], ignore_index=True)
-        try:
-            self.users_df.to_csv(os.path.join(self.data_dir, "users.csv"), index=False)
-            print(f"✓ Utilisateur '{username}' créé avec succès (ID: {new_id})")
-            return True
-        except Exception as e:
-            print(f"❌ Erreur lors de l’enregistrement : {e}")
+            new_id = int(users["id"].max()) + 1 if not users.empty else 1
+            new_user = pd.DataFrame(
+                {"id": [new_id], "username": [username], "firstname": [firstname], "lastname": [lastname], "password": [password]}
+            )
+
+            self.users_df = self._append(users, new_user)
+            positions = dict(self._user_positions)
+            positions[new_id] = len(self.users_df) - 1
+            self._user_positions = positions
+            saved = self._publish(self.storage.insert, "users", new_user)
+
+        if not self._persisted(saved):
             return False
 
+        print(f"✓ Utilisateur '{username}' créé avec succès (ID: {new_id})")
+        return True
+
+    @timed(DB_QUERY_SECONDS)
     def get_all_users(self):
         """Retourne tous les utilisateurs."""
         return [] if self.users_df is None else self.users_df.to_dict("records")
@@ -222,36 +490,67 @@ class DatabaseManager:
     # === Méthodes Tags (optionnelles) ===
     # ======================================================
 
+    @timed(DB_QUERY_SECONDS)
     def add_tag(self, user_id, movie_id, tag):
         """Ajoute un tag à un film."""
         if self.get_movie_by_id(movie_id) is None:
             print(f"❌ Film introuvable (ID: {movie_id})")
             return False
 
-        if self.tags_df is None:
-            self.tags_df = pd.DataFrame(columns=["userId", "movieId", "tag", "timestamp"])
-
         new_tag = pd.DataFrame({"userId": [user_id], "movieId": [movie_id], "tag": [tag], "timestamp": [int(time.time())]})
-        self.tags_df = pd.concat([self.tags_df, new_tag], ignore_index=True)
-
-        try:
-            self.tags_df.to_csv(os.path.join(self.data_dir, "tags.csv"), index=False)
-            print(f"✓ Tag '{tag}' ajouté au film {movie_id}")
-            return True
-        except Exception as e:
-            print(f"❌ Erreur lors de la sauvegarde du tag : {e}")
+        with self._write_lock:
+            tags = self.tags_df
+            if tags is None:
+                tags = apply_schema("tags", pd.DataFrame(columns=["userId", "movieId", "tag", "timestamp"]))
+            self.tags_df = self._append(tags, new_tag)
+            self.tag_index = self.tag_index.with_tag(user_id, movie_id, tag, len(self.tags_df) - 1)
+            saved = self._publish(self.storage.insert, "tags", new_tag)
+
+        if not self._persisted(saved):
             return False
 
+        print(f"✓ Tag '{tag}' ajouté au film {movie_id}")
+        return True
+
+    @timed(DB_QUERY_SECONDS)
     def get_movie_tags(self, movie_id):
         """Retourne tous les tags d’un film."""
-        if self.tags_df is None:
-            return []
-        return self.tags_df[self.tags_df["movieId"] == movie_id].to_dict("records")
+        rows = self.tag_index.rows_by_movie.get(movie_id)
+        tags = self.tags_df
+        return [] if tags is None or rows is None else tags.iloc[rows].to_dict("records")
+
+    @timed(DB_QUERY_SECONDS)
+    def get_user_tags(self, user_id):
+        """Retourne tous les tags créés par un utilisateur."""
+        rows = self.tag_index.rows_by_user.get(user_id)
+        tags = self.tags_df
+        return [] if tags is None or rows is None else tags.iloc[rows].to_dict("records")
+
+    @timed(DB_QUERY_SECONDS)
+    def get_popular_tags(self, n=20):
+        """Retourne les `n` tags (normalisés) les plus utilisés avec leur fréquence."""
+        return self.tag_index.popular(n)
+
+    @timed(DB_QUERY_SECONDS)
+    def get_movie_tag_counts(self, movie_id, n=20):
+        """Retourne les `n` tags (normalisés) les plus fréquents d'un film."""
+        return self.tag_index.for_movie(movie_id, n)
 
     # ======================================================
     # === Méthodes Liens (optionnelles) ===
     # ======================================================
 
+    @timed(DB_QUERY_SECONDS)
+    def get_movie_links(self, movie_id):
+        """Retourne les identifiants IMDb / TMDb d’un film, ou None."""
+        if self.links_df is None:
+            return None
+        row = self.links_df[self.links_df["movieId"] == movie_id]
+        if row.empty:
+            return None
+        return {key: (None if pd.isna(value) else value) for key, value in row.iloc[0].to_dict().items()}
+
+    @timed(DB_QUERY_SECONDS)
     def get_imdb_url(self, movie_id):
         """Retourne l’URL IMDb d’un film."""
         if self.links_df is None:
@@ -262,6 +561,7 @@ class DatabaseManager:
         imdb_id = str(int(row.iloc[0]["imdbId"])).zfill(7)
         return f"https://www.imdb.com/title/tt{imdb_id}/"
 
+    @timed(DB_QUERY_SECONDS)
     def get_tmdb_url(self, movie_id):
         """Retourne l’URL TMDb d’un film."""
         if self.links_df is None:
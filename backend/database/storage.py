@@ -0,0 +1,284 @@
+import os
+import sqlite3
+import sys
+import threading
+import pandas as pd
+
+# === Import des chemins depuis config.py ===
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    MOVIES_FILE, RATINGS_FILE, USERS_FILE, TAGS_FILE, LINKS_FILE, SQLITE_FILE,
+    CSV_COMPACT_FRACTION, CSV_COMPACT_MIN_ROWS
+)
+
+CSV_FILES = {
+    "movies": MOVIES_FILE,
+    "ratings": RATINGS_FILE,
+    "users": USERS_FILE,
+    "tags": TAGS_FILE,
+    "links": LINKS_FILE,
+}
+
+# Chaînes stockées par Arrow si pyarrow est installé (optionnel), sinon objets Python
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "object"
+
+# Types compacts des tables en mémoire (ids int32, notes float32, textes répétés en catégories)
+SCHEMAS = {
+    "movies": {"movieId": "int32", "title": STRING_DTYPE, "genres": "category"},
+    "ratings": {"userId": "int32", "movieId": "int32", "rating": "float32", "timestamp": "uint32"},
+    "users": {"id": "int32", "username": STRING_DTYPE, "firstname": STRING_DTYPE, "lastname": STRING_DTYPE, "password": STRING_DTYPE},
+    "tags": {"userId": "int32", "movieId": "int32", "tag": "category", "timestamp": "uint32"},
+    "links": {"movieId": "int32", "imdbId": "Int32", "tmdbId": "Int32"},
+}
+
+# Clés des tables modifiées par upsert / delete (journal CSV : la dernière ligne d'une clé l'emporte)
+KEYS = {
+    "ratings": ["userId", "movieId"],
+}
+
+LABELS = {
+    "movies": "films",
+    "ratings": "ratings",
+    "users": "utilisateurs",
+    "tags": "tags",
+    "links": "liens",
+}
+
+
+def apply_schema(table, df):
+    """Convertit les colonnes connues d'une table vers leurs types compacts."""
+    schema = {column: dtype for column, dtype in SCHEMAS[table].items() if column in df.columns}
+    if "genres" in schema:
+        df["genres"] = df["genres"].fillna("")
+    return df.astype(schema)
+
+
+def resolve_log(table, df):
+    """
+    État d'une table CSV écrite en journal (voir CSVStorage) : la dernière ligne
+    de chaque clé l'emporte, et une ligne dont seules les clés sont remplies
+    (pierre tombale) supprime la clé.
+    """
+    keys = KEYS.get(table)
+    if keys is None or df.empty:
+        return df
+    df = df.drop_duplicates(keys, keep="last")
+    values = [column for column in df.columns if column not in keys]
+    if values:
+        df = df[df[values].notna().any(axis=1)]
+    return df.reset_index(drop=True)
+
+
+class CSVStorage:
+    """
+    Stockage historique par fichiers CSV.
+
+    Toutes les écritures sont des ajouts en fin de fichier, en O(lignes écrites) :
+      - insert et upsert ajoutent les lignes (la dernière ligne d'une clé l'emporte) ;
+      - delete ajoute une pierre tombale (les clés seules) ;
+      - au chargement, le journal est résolu (resolve_log).
+    Le fichier est compacté (réécrit avec les seules lignes vivantes) quand les
+    lignes ajoutées par upsert / delete dépassent CSV_COMPACT_FRACTION de ses
+    lignes (et CSV_COMPACT_MIN_ROWS) : le coût O(N) de la réécriture est amorti
+    sur autant d'écritures.
+    """
+
+    name = "csv"
+
+    def __init__(self, files=None):
+        self.files = files or CSV_FILES
+        self._rows = {}      # Lignes vivantes par table, au dernier chargement ou compactage
+        self._log_rows = {}  # Lignes ajoutées par upsert / delete depuis
+
+    def load(self, table, required=False):
+        """Charge une table depuis son fichier CSV s'il existe, sinon retourne None."""
+        path = self.files[table]
+        if os.path.exists(path):
+            df = apply_schema(table, self._read(table))
+            print(f"✓ {len(df)} {LABELS[table]} chargés depuis {os.path.basename(path)}")
+            return df
+        elif required:
+            raise FileNotFoundError(f"Fichier requis introuvable : {path}")
+        else:
+            print(f"ℹ️  Fichier {os.path.basename(path)} non trouvé (optionnel)")
+            return None
+
+    def insert(self, table, rows):
+        """Ajoute des lignes en fin de fichier (crée le fichier avec en-tête si besoin)."""
+        path = self.files[table]
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        rows.to_csv(path, mode="a", header=not exists, index=False)
+
+    def delete(self, table, keys):
+        """Supprime la ligne dont les clés valent `keys` : ajoute sa pierre tombale."""
+        self._append_log(table, pd.DataFrame([keys]))
+
+    def upsert(self, table, rows, keys):
+        """Remplace les lignes ayant les mêmes clés que `rows` : les ajoute en fin de fichier."""
+        self._append_log(table, rows)
+
+    def replace(self, table, rows):
+        """Remplace tout le contenu de la table."""
+        self._write(rows, self.files[table])
+        self._rows[table], self._log_rows[table] = len(rows), 0
+
+    def _read(self, table):
+        """Lit le fichier d'une table et résout son journal."""
+        df = resolve_log(table, pd.read_csv(self.files[table], encoding="utf-8", on_bad_lines="warn"))
+        self._rows[table], self._log_rows[table] = len(df), 0
+        return df
+
+    def _append_log(self, table, rows):
+        """Ajoute des lignes de journal dans l'ordre des colonnes du fichier, puis compacte si besoin."""
+        columns = pd.read_csv(self.files[table], nrows=0).columns
+        self.insert(table, rows.reindex(columns=columns))
+        self._log_rows[table] = self._log_rows.get(table, 0) + len(rows)
+        if table not in self._rows:
+            self._read(table)  # Taille inconnue (table jamais chargée par cette instance)
+        elif self._log_rows[table] > max(CSV_COMPACT_MIN_ROWS, CSV_COMPACT_FRACTION * self._rows[table]):
+            self.replace(table, self._read(table))
+
+    @staticmethod
+    def _write(df, path):
+        """Réécrit un fichier de manière atomique."""
+        tmp_path = f"{path}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+class SQLiteStorage:
+    """
+    Stockage SQLite embarqué (stdlib) :
+      - tables indexées, journal WAL
+      - requêtes paramétrées (préparées et mises en cache par sqlite3)
+      - une connexion par thread (et par processus)
+      - import initial en bloc depuis les CSV existants
+    """
+
+    name = "sqlite"
+
+    SCHEMA = {
+        "movies": "CREATE TABLE IF NOT EXISTS movies (movieId INTEGER PRIMARY KEY, title TEXT, genres TEXT)",
+        "ratings": "CREATE TABLE IF NOT EXISTS ratings (userId INTEGER, movieId INTEGER, rating REAL, timestamp INTEGER)",
+        "users": "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, username TEXT, firstname TEXT, lastname TEXT, password TEXT)",
+        "tags": "CREATE TABLE IF NOT EXISTS tags (userId INTEGER, movieId INTEGER, tag TEXT, timestamp INTEGER)",
+        "links": "CREATE TABLE IF NOT EXISTS links (movieId INTEGER PRIMARY KEY, imdbId INTEGER, tmdbId INTEGER)",
+    }
+
+    INDEXES = [
+        "CREATE INDEX IF NOT EXISTS idx_ratings_user_movie ON ratings (userId, movieId)",
+        "CREATE INDEX IF NOT EXISTS idx_ratings_movie ON ratings (movieId)",
+        "CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)",
+        "CREATE INDEX IF NOT EXISTS idx_tags_user ON tags (userId)",
+        "CREATE INDEX IF NOT EXISTS idx_tags_movie ON tags (movieId)",
+    ]
+
+    def __init__(self, path=SQLITE_FILE, csv_files=None):
+        self.path = path
+        self._local = threading.local()
+        self._tables = {}
+
+        created = not os.path.exists(path)
+        with self._connection() as conn:
+            for statement in list(self.SCHEMA.values()) + self.INDEXES:
+                conn.execute(statement)
+        if created:
+            self.import_csv(csv_files or CSV_FILES)
+
+    def _connection(self):
+        """
+        Retourne la connexion du thread courant (ouverte à la première utilisation).
+        Une connexion héritée d'un fork n'est jamais réutilisée : chaque processus ouvre la sienne.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _columns(self, table):
+        columns = self._tables.get(table)
+        if columns is None:
+            columns = [row[1] for row in self._connection().execute(f"PRAGMA table_info({table})")]
+            self._tables[table] = columns
+        return columns
+
+    def import_csv(self, csv_files):
+        """Importe en bloc les CSV existants (une transaction par table)."""
+        for table, path in csv_files.items():
+            if not os.path.exists(path):
+                continue
+            df = resolve_log(table, pd.read_csv(path, encoding="utf-8", on_bad_lines="warn"))
+            self._insert_many(table, df)
+            print(f"✓ {len(df)} {LABELS[table]} importés dans {os.path.basename(self.path)}")
+
+    def load(self, table, required=False):
+        """Charge une table entière, ou None si elle est vide et optionnelle."""
+        df = apply_schema(table, pd.read_sql_query(f"SELECT * FROM {table}", self._connection()))
+        if df.empty and table not in ("ratings", "tags"):
+            if required:
+                raise FileNotFoundError(f"Table requise vide : {table} ({self.path})")
+            print(f"ℹ️  Table {table} vide (optionnelle)")
+            return None
+        print(f"✓ {len(df)} {LABELS[table]} chargés depuis {os.path.basename(self.path)}")
+        return df
+
+    def insert(self, table, rows):
+        """Insère des lignes (requête paramétrée, une transaction)."""
+        self._insert_many(table, rows)
+
+    def delete(self, table, keys):
+        """Supprime les lignes dont les colonnes valent `keys` (lookup indexé)."""
+        where = " AND ".join(f"{column} = ?" for column in keys)
+        with self._connection() as conn:
+            conn.execute(f"DELETE FROM {table} WHERE {where}", [self._native(v) for v in keys.values()])
+
+    def upsert(self, table, rows, keys):
+        """Remplace les lignes ayant les mêmes clés que `rows` (une transaction, lookups indexés)."""
+        where = " AND ".join(f"{column} = ?" for column in keys)
+        key_values = rows[keys].astype(object).itertuples(index=False, name=None)
+        with self._connection() as conn:
+            conn.executemany(f"DELETE FROM {table} WHERE {where}", ([self._native(v) for v in row] for row in key_values))
+            conn.executemany(*self._insert_statement(table, rows))
+
+    def replace(self, table, rows):
+        """Remplace tout le contenu de la table (une transaction)."""
+        with self._connection() as conn:
+            conn.execute(f"DELETE FROM {table}")
+            conn.executemany(*self._insert_statement(table, rows))
+
+    def _insert_many(self, table, df):
+        with self._connection() as conn:
+            conn.executemany(*self._insert_statement(table, df))
+
+    def _insert_statement(self, table, df):
+        """Retourne (requête INSERT paramétrée, lignes) pour executemany."""
+        columns = self._columns(table)
+        placeholders = ", ".join("?" for _ in columns)
+        statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        values = df[columns].astype(object).where(df[columns].notna(), None).itertuples(index=False, name=None)
+        return statement, ([self._native(v) for v in row] for row in values)
+
+    @staticmethod
+    def _native(value):
+        """Convertit les scalaires numpy en types Python acceptés par sqlite3."""
+        return value.item() if hasattr(value, "item") else value
+
+
+def create_storage(backend):
+    """Retourne le stockage demandé : 'csv' (défaut) ou 'sqlite'."""
+    if backend == "sqlite":
+        return SQLiteStorage()
+    return CSVStorage()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+class TagIndex:
+    """
+    Index des tags, immuable une fois construit :
+      - tags normalisés (minuscules, sans espaces) encodés en codes entiers
+      - fréquences globales et par film, triées par fréquence décroissante
+      - positions des lignes de tags_df par utilisateur et par film
+    Un ajout produit un nouvel index (copy-on-write) ; les lecteurs concurrents
+    continuent d'utiliser l'ancien sans verrou.
+    """
+
+    def __init__(self, vocab=None, codes=None, counts=None, movie_counts=None, rows_by_user=None, rows_by_movie=None):
+        self.vocab = vocab if vocab is not None else []
+        self.codes = codes if codes is not None else {}
+        self.counts = counts if counts is not None else np.zeros(0, dtype=np.int64)
+        self.movie_counts = movie_counts if movie_counts is not None else {}
+        self.rows_by_user = rows_by_user if rows_by_user is not None else {}
+        self.rows_by_movie = rows_by_movie if rows_by_movie is not None else {}
+        self._popular_order = None
+
+    @classmethod
+    def build(cls, tags_df):
+        """Construit l'index complet à partir de tags_df (vectorisé)."""
+        if tags_df is None or tags_df.empty:
+            return cls()
+
+        normalized = tags_df["tag"].astype(str).str.lower().str.strip()
+        codes, vocab = pd.factorize(normalized)
+        vocab = list(vocab)
+
+        # Les tags vides sont indexés mais jamais comptés
+        counted = normalized.ne("").values
+        counts = np.bincount(codes[counted], minlength=len(vocab))
+
+        per_movie = (
+            pd.DataFrame({"movieId": tags_df["movieId"].values[counted], "code": codes[counted]})
+            .groupby(["movieId", "code"]).size()
+            .reset_index(name="count")
+            .sort_values(["movieId", "count", "code"], ascending=[True, False, True])
+        )
+        movie_counts = {
+            int(movie_id): (group["code"].values, group["count"].values)
+            for movie_id, group in per_movie.groupby("movieId", sort=False)
+        }
+
+        return cls(
+            vocab=vocab,
+            codes={tag: code for code, tag in enumerate(vocab)},
+            counts=counts,
+            movie_counts=movie_counts,
+            rows_by_user={int(k): v for k, v in tags_df.groupby("userId").indices.items()},
+            rows_by_movie={int(k): v for k, v in tags_df.groupby("movieId").indices.items()},
+        )
+
+    def with_tag(self, user_id, movie_id, tag, row):
+        """Retourne un nouvel index incluant le tag ajouté à la ligne `row`."""
+        rows_by_user = dict(self.rows_by_user)
+        rows_by_user[user_id] = np.append(rows_by_user.get(user_id, []), row).astype(np.int64)
+        rows_by_movie = dict(self.rows_by_movie)
+        rows_by_movie[movie_id] = np.append(rows_by_movie.get(movie_id, []), row).astype(np.int64)
+
+        normalized = str(tag).lower().strip()
+        if not normalized:
+            return TagIndex(self.vocab, self.codes, self.counts, self.movie_counts, rows_by_user, rows_by_movie)
+
+        vocab, codes, counts = self.vocab, self.codes, self.counts.copy()
+        code = codes.get(normalized)
+        if code is None:
+            code = len(vocab)
+            vocab = vocab + [normalized]
+            codes = dict(codes)
+            codes[normalized] = code
+            counts = np.append(counts, 0)
+        counts[code] += 1
+
+        movie_codes, movie_counts = self.movie_counts.get(movie_id, (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)))
+        hit = np.flatnonzero(movie_codes == code)
+        if hit.size:
+            movie_counts = movie_counts.copy()
+            movie_counts[hit[0]] += 1
+        else:
+            movie_codes, movie_counts = np.append(movie_codes, code), np.append(movie_counts, 1)
+        per_movie = dict(self.movie_counts)
+        per_movie[movie_id] = self._sort_counts(movie_codes, movie_counts)
+
+        return TagIndex(vocab, codes, counts, per_movie, rows_by_user, rows_by_movie)
+
+    @staticmethod
+    def _sort_counts(codes, counts):
+        """Trie (codes, comptes) par fréquence décroissante, puis par ordre d'apparition."""
+        order = np.lexsort((codes, -counts))
+        return codes[order], counts[order]
+
+    def popular(self, n=20):
+        """Retourne les `n` tags les plus utilisés avec leur fréquence."""
+        if self._popular_order is None:
+            self._popular_order = np.argsort(-self.counts, kind="stable")
+        top = self._popular_order[:n]
+        return [{"tag": self.vocab[code], "count": int(self.counts[code])} for code in top if self.counts[code] > 0]
+
+    def for_movie(self, movie_id, n=20):
+        """Retourne les `n` tags les plus fréquents d'un film."""
+        codes, counts = self.movie_counts.get(movie_id, ([], []))
+        return [{"tag": self.vocab[code], "count": int(count)} for code, count in zip(codes[:n], counts[:n])]
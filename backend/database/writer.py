@@ -0,0 +1,73 @@
+import os
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+
+from utils.metrics import DB_WRITE_FAILURES, increment
+
+# Writers vivants, réinitialisés dans le processus enfant après un fork
+_WRITERS = weakref.WeakSet()
+
+
+class TableWriter:
+    """
+    Thread d'écriture unique : applique les modifications au stockage hors du
+    chemin des requêtes, dans l'ordre où elles ont été publiées.
+
+    Le thread est démarré à la première écriture de chaque processus. Un fork
+    (workers gunicorn avec preload_app) ne copie pas les threads : l'enfant
+    repart avec une file vide et démarre son propre thread, au lieu d'empiler
+    des écritures que personne ne traitera.
+
+    Chaque écriture planifiée retourne un Future : l'appelant peut attendre
+    sa sauvegarde et récupérer l'erreur du stockage. Les échecs sont aussi
+    comptés dans DB_WRITE_FAILURES.
+    """
+
+    def __init__(self):
+        self._reset()
+        _WRITERS.add(self)
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, operation, *args):
+        """Planifie operation(*args) sur le thread d'écriture et retourne son Future."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    thread = threading.Thread(target=self._run, name="table-writer", daemon=True)
+                    thread.start()
+                    self._thread = thread
+        future = Future()
+        self._queue.put((operation, args, future))
+        return future
+
+    def flush(self):
+        """Attend que toutes les écritures planifiées soient terminées."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            operation, args, future = self._queue.get()
+            try:
+                future.set_result(operation(*args))
+            except Exception as e:
+                table = args[0] if args else operation.__name__
+                print(f"❌ Erreur lors de l'écriture ({table}) : {e}")
+                increment(DB_WRITE_FAILURES, table=table)
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+
+def _after_fork():
+    """La file, le verrou et le thread du parent sont inutilisables dans l'enfant : on repart de zéro."""
+    for writer in list(_WRITERS):
+        writer._reset()
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,72 @@
+"""
+gunicorn.conf.py - Configuration du serveur de production (pre-fork multi-workers)
+
+Le modèle est chargé une seule fois dans le processus maître (preload_app) puis
+partagé en copy-on-write avec les workers. Les workers sont recyclés
+progressivement (max_requests + jitter) et arrêtés proprement (graceful_timeout).
+
+Écritures : chaque worker démarre son propre thread d'écriture après le fork et
+garde ses tables et son modèle en mémoire. Le stockage CSV suppose un seul
+processus écrivain : avec CSV, un seul worker est lancé par défaut et le
+serveur refuse de démarrer avec plusieurs. SQLite (CINEMATCH_STORAGE=sqlite)
+partage la persistance mais pas les lectures : une écriture n'est visible que
+dans le worker qui l'a reçue, jusqu'au redémarrage des autres. Pour relire ses
+écritures d'une requête à l'autre, garder un seul worker (et plus de threads).
+
+Usage :
+    CINEMATCH_ENV=production gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import gc
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import (
+    HOST, PORT, WORKERS, THREADS_PER_WORKER, WORKER_TIMEOUT,
+    GRACEFUL_TIMEOUT, MAX_REQUESTS, MAX_REQUESTS_JITTER, LOG_LEVEL, STORAGE_BACKEND
+)
+
+# ============================
+# SERVER SOCKET
+# ============================
+bind = f"{HOST}:{PORT}"
+
+# ============================
+# WORKERS
+# ============================
+workers = WORKERS
+worker_class = "gthread"
+threads = THREADS_PER_WORKER
+preload_app = True  # Données et modèle chargés avant le fork (copy-on-write)
+
+# ============================
+# RECYCLAGE DES WORKERS
+# ============================
+timeout = WORKER_TIMEOUT
+graceful_timeout = GRACEFUL_TIMEOUT
+max_requests = MAX_REQUESTS
+max_requests_jitter = MAX_REQUESTS_JITTER
+
+# ============================
+# LOGGING
+# ============================
+loglevel = LOG_LEVEL.lower()
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    """Gèle les objets chargés par le maître pour que le GC des workers ne touche pas leurs pages."""
+    gc.freeze()
+
+
+def on_starting(server):
+    """Refuse de démarrer plusieurs workers qui écriraient dans les mêmes fichiers CSV."""
+    if STORAGE_BACKEND == "csv" and server.cfg.workers > 1:
+        server.log.error(
+            "Stockage CSV avec %d workers : les écritures de workers différents s'écraseraient. "
+            "Utiliser CINEMATCH_WORKERS=1 ou CINEMATCH_STORAGE=sqlite.", server.cfg.workers
+        )
+        raise SystemExit(1)
@@ -0,0 +1,42 @@
+"""
+Diversity-aware re-ranking with maximal marginal relevance (MMR).
+
+MMR picks items greedily, each time the candidate maximising
+    trade_off * relevance - (1 - trade_off) * max similarity to the picks so far
+The "max similarity to the picks" of every candidate is kept in one vector
+and updated with a single np.maximum per pick. So selecting k out of C
+candidates costs O(k * C), and no candidate x candidate matrix is built.
+"""
+
+import numpy as np
+
+
+def mmr(relevance, similarity_to, k, trade_off):
+    """
+    Greedy maximal marginal relevance.
+
+    Args:
+        relevance: (C,) candidate scores, higher is better (any scale, rescaled to [0, 1])
+        similarity_to: function i -> (C,) similarity of candidate i to every candidate, in [0, 1]
+        k: number of candidates to select
+        trade_off: 1 keeps the relevance order, 0 only maximises diversity
+
+    Returns:
+        positions of the selected candidates, in selection order
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    k = min(k, len(relevance))
+    low, high = relevance.min(initial=0.0), relevance.max(initial=0.0)
+    relevance = (relevance - low) / (high - low) if high > low else np.zeros(len(relevance))
+
+    gain = trade_off * relevance
+    max_similarity = np.zeros(len(relevance))
+    available = np.ones(len(relevance), dtype=bool)
+    selected = np.empty(k, dtype=np.int64)
+    for step in range(k):
+        marginal = np.where(available, gain - (1 - trade_off) * max_similarity, -np.inf)
+        pick = int(np.argmax(marginal))
+        selected[step] = pick
+        available[pick] = False
+        np.maximum(max_similarity, similarity_to(pick), out=max_similarity)
+    return selected
@@ -0,0 +1,279 @@
+"""
+Offline evaluation of the recommender.
+
+Splits the ratings in time (train on the past, test on the most recent
+ratings), builds the model on the training part and measures how well each
+scoring method ranks the held-out movies a user liked: precision@k,
+recall@k and NDCG@k. Users are scored in vectorized batches
+(MovieRecommender.score_users), and the batches are spread over a pool of
+forked worker processes that share the built model copy-on-write.
+
+The hybrid is evaluated the way it is served by default: each user's
+candidate pool (generate_candidates) is scored and normalised on its own.
+Use --hybrid-scoring full to rank the whole catalogue instead.
+
+Usage (from backend/):
+    python -m model.evaluation
+    python -m model.evaluation --methods hybrid collaborative --k 20 --workers 4
+    python -m model.evaluation --weights collaborative=0.6 popularity=0 --top-similar-users 30
+    python -m model.evaluation --methods hybrid --hybrid-scoring full
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    DATA_DIR, HYBRID_WEIGHTS, MIN_RATINGS, TOP_SIMILAR_USERS, EVAL_TEST_FRACTION,
+    EVAL_K, EVAL_RELEVANCE_THRESHOLD, EVAL_BATCH_SIZE
+)
+from database.storage import CSVStorage
+from model.recommender import MovieRecommender
+
+# Shared with forked workers (set before the pool starts, never pickled)
+_STATE = {}
+
+# How the hybrid ranks movies: the served two-stage path, or every movie of the catalogue
+HYBRID_SCORING = ("candidates", "full")
+
+
+# =======================================================
+# ================ TRAIN / TEST SPLIT ===================
+# =======================================================
+def temporal_split(ratings, test_fraction=EVAL_TEST_FRACTION, by="global"):
+    """
+    Split ratings in time.
+
+    by="global": every rating after the (1 - test_fraction) timestamp quantile
+    is held out, as if the model had been trained at that date.
+    by="user": the most recent test_fraction of each user's ratings is held
+    out, so every user with enough history is evaluated.
+
+    Returns:
+        (train, test) DataFrames
+    """
+    if by == "global":
+        cutoff = ratings["timestamp"].quantile(1 - test_fraction)
+        held_out = ratings["timestamp"] > cutoff
+    elif by == "user":
+        rank = ratings.groupby("userId")["timestamp"].rank(method="first", ascending=False)
+        held_out = rank <= np.floor(ratings.groupby("userId")["timestamp"].transform("size") * test_fraction)
+    else:
+        raise ValueError(f"Unknown split: {by} (expected 'global' or 'user')")
+    return ratings[~held_out], ratings[held_out]
+
+
+# =======================================================
+# ===================== METRICS =========================
+# =======================================================
+def ranking_metrics(top, relevant, n_relevant, k):
+    """
+    Per-user precision@k, recall@k and NDCG@k with binary relevance.
+
+    Args:
+        top: (users, k) column positions of the recommendations (-1 = none)
+        relevant: (users, n_movies) boolean matrix of held-out relevant movies
+        n_relevant: relevant held-out movies per user (including unknown movies)
+    """
+    hits = np.take_along_axis(relevant, np.maximum(top, 0), axis=1) & (top >= 0)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal = np.cumsum(discounts)[np.minimum(n_relevant, k) - 1]
+    return hits.sum(axis=1) / k, hits.sum(axis=1) / n_relevant, (hits * discounts).sum(axis=1) / ideal
+
+
+def _evaluate_batch(method, start):
+    """Score one batch of evaluated users with one method and return metric sums."""
+    state = _STATE
+    stop = start + state["batch_size"]
+    users = state["users"][start:stop]
+    seeds = state["seeds"][start:stop] if method in ("hybrid", "content") else None
+
+    if method == "hybrid" and state["hybrid_scoring"] == "candidates":
+        top = _candidate_top(users, seeds)
+    else:
+        scores = state["recommender"].score_users(
+            users, method, seed_movies=seeds, weights=state["weights"],
+            neighbors=state["neighbors"], min_ratings=state["min_ratings"],
+        )
+        top = MovieRecommender.top_movies(scores, state["k"])
+    relevant = state["relevant"][start:stop].toarray()
+    precision, recall, ndcg = ranking_metrics(top, relevant, state["n_relevant"][start:stop], state["k"])
+    return method, precision.sum(), recall.sum(), ndcg.sum(), len(users)
+
+
+def _candidate_top(users, seeds):
+    """Top-k column positions of the served hybrid: each user's candidate pool, scored on its own."""
+    state = _STATE
+    recommender = state["recommender"]
+    top = np.full((len(users), state["k"]), -1, dtype=np.int64)
+    for i, (user, seed) in enumerate(zip(users, seeds)):
+        columns = recommender.generate_candidates(user, seed)
+        if columns.size == 0:
+            continue
+        scores = recommender.score_users(
+            [user], "hybrid", seed_movies=[seed], weights=state["weights"],
+            neighbors=state["neighbors"], min_ratings=state["min_ratings"], columns=columns,
+        )
+        best = MovieRecommender.top_movies(scores, state["k"])[0]
+        top[i, :len(best)] = np.where(best >= 0, columns[np.maximum(best, 0)], -1)
+    return top
+
+
+# =======================================================
+# ==================== EVALUATION =======================
+# =======================================================
+def evaluate(movies, ratings, tags=None, methods=MovieRecommender.SCORERS, k=EVAL_K,
+             threshold=EVAL_RELEVANCE_THRESHOLD, test_fraction=EVAL_TEST_FRACTION, split="global",
+             workers=None, batch_size=EVAL_BATCH_SIZE, weights=None, neighbors=TOP_SIMILAR_USERS,
+             min_ratings=MIN_RATINGS, hybrid_scoring="candidates"):
+    """
+    Train on the past, rank the held-out future, and average the metrics per method.
+    hybrid_scoring: "candidates" (two-stage, as served) or "full" (whole catalogue)
+
+    Returns:
+        dict with the split sizes, timings and {method: {precision, recall, ndcg}}
+    """
+    train, test = temporal_split(ratings, test_fraction, split)
+    # Tags written after a user's held-out period started would leak the future
+    if tags is not None and split == "global":
+        tags = tags[tags["timestamp"] <= train["timestamp"].max()]
+    elif tags is not None:
+        first_test = tags["userId"].map(test.groupby("userId")["timestamp"].min())
+        tags = tags[first_test.isna() | (tags["timestamp"] < first_test)]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender = MovieRecommender(movies, train, tags)
+    build_seconds = time.perf_counter() - start
+
+    # Users known to the model with at least one relevant held-out movie
+    liked = test[test["rating"] >= threshold]
+    liked = liked[liked["userId"].isin(recommender.user_index)]
+    users = np.sort(liked["userId"].unique())
+    rows = pd.Index(users).get_indexer(liked["userId"])
+    columns = recommender.movie_index.get_indexer(liked["movieId"])
+    known = columns >= 0
+    relevant = csr_matrix(
+        (np.ones(known.sum(), dtype=bool), (rows[known], columns[known])), shape=(len(users), len(recommender.movie_index))
+    )
+    n_relevant = np.bincount(rows, minlength=len(users))
+
+    # Hybrid and content seeds: each user's most recent training rating
+    latest = train.sort_values("timestamp").groupby("userId")["movieId"].last()
+
+    _STATE.update(
+        recommender=recommender, users=users, seeds=latest.reindex(users).tolist(), relevant=relevant,
+        n_relevant=n_relevant, k=k, batch_size=batch_size, weights=weights or HYBRID_WEIGHTS,
+        neighbors=neighbors, min_ratings=min_ratings, hybrid_scoring=hybrid_scoring,
+    )
+    tasks = [(method, offset) for method in methods for offset in range(0, len(users), batch_size)]
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+            batches = list(pool.map(_evaluate_batch, *zip(*tasks)))
+    else:
+        workers = 1
+        batches = [_evaluate_batch(*task) for task in tasks]
+    _STATE.clear()
+    scoring_seconds = time.perf_counter() - start
+
+    totals = {method: np.zeros(4) for method in methods}
+    for method, *sums in batches:
+        totals[method] += sums
+
+    return {
+        "split": split,
+        "train_ratings": len(train),
+        "test_ratings": len(test),
+        "evaluated_users": len(users),
+        "k": k,
+        "relevance_threshold": threshold,
+        "hybrid_scoring": hybrid_scoring,
+        "workers": workers,
+        "build_seconds": build_seconds,
+        "scoring_seconds": scoring_seconds,
+        "methods": {
+            method: {
+                "precision": precision / count if count else 0.0,
+                "recall": recall / count if count else 0.0,
+                "ndcg": ndcg / count if count else 0.0,
+            }
+            for method, (precision, recall, ndcg, count) in totals.items()
+        },
+    }
+
+
+# =======================================================
+# ======================== CLI ==========================
+# =======================================================
+def _parse_weights(values):
+    weights = dict(HYBRID_WEIGHTS)
+    for value in values or []:
+        name, _, weight = value.partition("=")
+        if name not in HYBRID_WEIGHTS:
+            raise SystemExit(f"Unknown hybrid weight: {name} (expected one of {', '.join(HYBRID_WEIGHTS)})")
+        weights[name] = float(weight)
+    return weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline evaluation of the recommendation methods")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory holding movies.csv, ratings.csv and tags.csv")
+    parser.add_argument("--methods", nargs="+", default=list(MovieRecommender.SCORERS), choices=MovieRecommender.SCORERS)
+    parser.add_argument("--k", type=int, default=EVAL_K)
+    parser.add_argument("--threshold", type=float, default=EVAL_RELEVANCE_THRESHOLD, help="minimum held-out rating counted as relevant")
+    parser.add_argument("--test-fraction", type=float, default=EVAL_TEST_FRACTION)
+    parser.add_argument("--split", choices=["global", "user"], default="global")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=EVAL_BATCH_SIZE)
+    parser.add_argument("--weights", nargs="*", metavar="NAME=WEIGHT", help="override HYBRID_WEIGHTS entries")
+    parser.add_argument("--top-similar-users", type=int, default=TOP_SIMILAR_USERS)
+    parser.add_argument("--min-ratings", type=int, default=MIN_RATINGS, help="minimum ratings for a movie to be recommended")
+    parser.add_argument("--hybrid-scoring", choices=HYBRID_SCORING, default="candidates",
+                        help="rank the hybrid over each user's candidate pool (as served) or the whole catalogue")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    files = {table: os.path.join(args.data_dir, f"{table}.csv") for table in ("movies", "ratings", "tags")}
+    storage = CSVStorage(files)
+    with contextlib.redirect_stdout(io.StringIO()):
+        movies, ratings = storage.load("movies", required=True), storage.load("ratings", required=True)
+        tags = storage.load("tags")
+
+    results = evaluate(
+        movies, ratings, tags, methods=args.methods, k=args.k, threshold=args.threshold,
+        test_fraction=args.test_fraction, split=args.split, workers=args.workers,
+        batch_size=args.batch_size, weights=_parse_weights(args.weights),
+        neighbors=args.top_similar_users, min_ratings=args.min_ratings, hybrid_scoring=args.hybrid_scoring,
+    )
+
+    print(f"Split: {results['split']} | train {results['train_ratings']} | test {results['test_ratings']} "
+          f"| {results['evaluated_users']} users evaluated | hybrid over {results['hybrid_scoring']}")
+    print(f"Model build {results['build_seconds']:.1f}s | scoring {results['scoring_seconds']:.1f}s "
+          f"on {results['workers']} worker(s)\n")
+    k = results["k"]
+    print(f"{'method':<15} {f'precision@{k}':>13} {f'recall@{k}':>11} {f'ndcg@{k}':>9}")
+    for method, scores in results["methods"].items():
+        print(f"{method:<15} {scores['precision']:>13.4f} {scores['recall']:>11.4f} {scores['ndcg']:>9.4f}")
+
+    if args.output:
+        results["args"] = {key: value for key, value in vars(args).items() if key != "output"}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Recommendation filters pushed down into scoring.
+
+A MovieFilter is turned into a boolean mask over the catalogue before the
+top-n selection, so a filtered query still returns exactly n results (when
+n movies qualify) in a single pass, instead of over-fetching and filtering
+the ranked list afterwards.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class MovieFilter:
+    """Genre, release year, rating count and excluded-id restrictions on recommended movies."""
+
+    def __init__(self, genres=None, year_min=None, year_max=None, min_ratings=None, exclude=None):
+        """
+        Args:
+            genres: keep movies having at least one of these genres (case-insensitive)
+            year_min, year_max: inclusive release year range (movies without a year are dropped)
+            min_ratings: minimum rating count, overriding the method's default
+            exclude: movie ids never to recommend
+        """
+        self.genres = {g.strip().lower() for g in genres or [] if g.strip()}
+        self.year_min = year_min
+        self.year_max = year_max
+        self.min_ratings = min_ratings
+        self.exclude = np.unique(np.asarray(list(exclude or []), dtype=np.int64))
+
+    def restricts_catalogue(self):
+        """True when some movies are filtered out regardless of their rating count."""
+        return bool(self.genres) or self.year_min is not None or self.year_max is not None or self.exclude.size > 0
+
+    def catalogue_mask(self, movies_df, years):
+        """
+        Boolean mask over movies_df rows of the movies passing the genre, year and exclusion filters.
+
+        Args:
+            years: release year of each movies_df row (NaN when unknown)
+        """
+        mask = np.ones(len(movies_df), dtype=bool)
+        if self.genres:
+            # Evaluate each distinct genre string once, then broadcast through the codes
+            codes, uniques = pd.factorize(movies_df["genres"])
+            matches = np.array(
+                [not self.genres.isdisjoint(str(value).lower().split("|")) for value in uniques], dtype=bool
+            )
+            mask &= (codes >= 0) & matches[np.maximum(codes, 0)]
+        if self.year_min is not None:
+            mask &= years >= self.year_min
+        if self.year_max is not None:
+            mask &= years <= self.year_max
+        if self.exclude.size:
+            mask &= ~np.isin(movies_df["movieId"].values, self.exclude)
+        return mask
+
+    def _key(self):
+        return (
+            frozenset(self.genres), self.year_min, self.year_max, self.min_ratings, tuple(self.exclude.tolist())
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, MovieFilter):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        """Equal filters hash alike, so concurrent identical requests share one computation (see single_flight)."""
+        return hash(self._key())
+
+    def to_dict(self):
+        return {
+            "genres": sorted(self.genres),
+            "year_min": self.year_min,
+            "year_max": self.year_max,
+            "min_ratings": self.min_ratings,
+            "exclude": self.exclude.tolist(),
+        }
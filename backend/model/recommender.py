@@ -1,262 +1,690 @@
 import pandas as pd
 import numpy as np
+from sklearn.feature_extraction.text import TfidfTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 from scipy.sparse import csr_matrix
+import copy
 import os
 import sys
+import threading
+import time
 
 # Allow imports from parent folder
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import N_RECOMMENDATIONS, MIN_RATINGS
+from utils.metrics import MODEL_BUILD_SECONDS, MODEL_BUILDS, RECOMMENDER_CALL_SECONDS, increment, set_gauge, timed
+from utils.singleflight import SingleFlight, single_flight
+from config import (
+    N_RECOMMENDATIONS, MIN_RATINGS, MIN_SIMILARITY_THRESHOLD, TOP_SIMILAR_USERS,
+    HYBRID_WEIGHTS, TAG_NEIGHBORS_K, SIMILARITY_BLOCK_SIZE, SIMILARITY_PATCH_FRACTION,
+    TRENDING_HALF_LIVES, TRENDING_DEFAULT_WINDOW, TRENDING_MIN_WEIGHT, TRENDING_PRIOR_RATINGS,
+    TRENDING_REFERENCE, TRENDING_REFERENCE_QUANTILE,
+    CANDIDATE_POOL_SIZE, CANDIDATE_NEIGHBOR_MOVIES, CANDIDATE_SEED_LIKES, ITEM_NEIGHBORS_K, CANDIDATE_GENRES,
+    CANDIDATE_GENRE_POSTINGS, CANDIDATE_TRENDING, BECAUSE_WATCHED_ROWS, MMR_POOL_SIZE, DIVERSITY_SIMILARITIES
+)
+from model.diversity import mmr
+from model.similarity import SimilarityMatrix
+from model.trending import TrendingIndex
 
 
 class MovieRecommender:
     """
     A hybrid movie recommender system supporting:
-    - Content-based filtering
+    - Content-based filtering (genres, or TF-IDF over tags + genres)
     - Item-based collaborative filtering
     - User-based collaborative filtering
     - Popularity-based ranking
     - Combined hybrid recommendation
     """
 
-    def __init__(self, movies_df, ratings_df):
-        self.movies_df = movies_df.copy()
-        self.ratings_df = ratings_df.copy()
-        self.user_item_matrix = None
-        self.movie_similarity_df = None
-        self.user_similarity_df = None
-        self.prepare_data()
+    # Model components, in build order
+    COMPONENTS = ("rating_matrix", "genre_profiles", "trending", "movie_similarity", "user_similarity", "tag_similarity")
+
+    # Methods score_users() can rank every movie with, for a batch of users
+    SCORERS = ("popular", "content", "tags", "item", "collaborative", "hybrid")
+
+    def __init__(self, movies_df, ratings_df, tags_df=None, build=True):
+        # DataFrames are shared with the DatabaseManager and treated as read-only
+        self.movies_df = movies_df
+        self.ratings_df = ratings_df
+        self.tags_df = tags_df
+        self._single_flight = SingleFlight()
+        self._update_lock = threading.Lock()
+        self._versions = {"latest": self}  # Shared by every version derived through apply_ratings
+        self.version = 0  # Incremented for each version returned by apply_ratings (cache key)
+        self.user_index = None
+        self.movie_index = None
+        self.rating_matrix = None
+        self.rated_matrix = None
+        self.genre_names = None
+        self.movie_genre_matrix = None
+        self.user_genre_sums = None
+        self.user_genre_counts = None
+        self.genre_postings = None
+        self.movie_stats = None
+        self.column_counts = None
+        self.column_sums = None
+        self.column_averages = None
+        self.popularity_order = None
+        self.movie_years = None
+        self.column_rows = None
+        self.row_columns = None
+        self.trending = None
+        self.tag_movie_ids = None
+        self.tag_neighbors = None
+        self.tag_neighbor_scores = None
+        self.movie_similarity = None
+        self.item_neighbors = None
+        self.user_similarity = None
+        self.status = {component: "pending" for component in self.COMPONENTS}
+        if build:
+            self.build()
+
+    def build(self):
+        """Build every model component (safe to run in a background thread, once per instance)."""
+        with self._update_lock:
+            self.prepare_data()
+
+    def is_ready(self, *components):
+        """True once the given components (all of them by default) are built."""
+        return all(self.status[c] == "ready" for c in components or self.COMPONENTS)
 
     # =======================================================
     # =============== DATA PREPARATION =======================
     # =======================================================
     def prepare_data(self):
-        """Prepare data matrices for similarity calculations."""
+        """Prepare data matrices for similarity calculations, one component at a time."""
         try:
-            # Ensure genres are strings and non-null
-            if "genres" in self.movies_df.columns:
-                self.movies_df["genres"] = self.movies_df["genres"].fillna("").astype(str)
-
-            # Create user-item matrix: rows = users, cols = movies
-            self.user_item_matrix = (
-                self.ratings_df.pivot_table(index="userId", columns="movieId", values="rating")
-                .fillna(0)
-            )
-
-            print(f"✓ User-Item matrix: {self.user_item_matrix.shape}")
+            self._build_component("rating_matrix", self._build_rating_matrix)
+            self._build_component("genre_profiles", self._build_genre_matrix)
+            self._build_component("trending", self._build_trending)
 
             # Precompute similarities
-            self._calculate_movie_similarity()
-            self._calculate_user_similarity()
+            self._build_component("movie_similarity", self._calculate_movie_similarity)
+            self._build_component("user_similarity", self._calculate_user_similarity)
+            self._build_component("tag_similarity", self._calculate_tag_similarity)
 
         except Exception as e:
             print(f"❌ Error in prepare_data: {e}")
             raise
 
+    def _build_component(self, component, builder):
+        """
+        Run one build stage and record its status.
+        An instance is built once: rebuilds go into a new instance that is only
+        published when complete (see apply_ratings), so the served model never
+        mixes components from different builds.
+        """
+        self.status[component] = "building"
+        start = time.perf_counter()
+        try:
+            builder()
+        except Exception:
+            self.status[component] = "failed"
+            increment(MODEL_BUILDS, component=component, result="failed")
+            raise
+        self.status[component] = "ready"
+        set_gauge(MODEL_BUILD_SECONDS, time.perf_counter() - start, component=component)
+        increment(MODEL_BUILDS, component=component, result="ready")
+
+    def _build_rating_matrix(self):
+        """Build the user-item matrix, its sparse views and the per-movie stats."""
+        # Create user-item matrix: rows = users, cols = movies
+        user_item_matrix = (
+            self.ratings_df.pivot_table(index="userId", columns="movieId", values="rating")
+            .fillna(0)
+        )
+
+        # Only the sparse views are kept (shared by the similarity builds and the overlap counts),
+        # with the user ids of the rows and movie ids of the columns
+        self.user_index = user_item_matrix.index
+        self.movie_index = user_item_matrix.columns
+        self.rating_matrix = csr_matrix(user_item_matrix.values)
+        self.rated_matrix = (self.rating_matrix > 0).astype(np.int32)
+
+        print(f"✓ User-Item matrix: {user_item_matrix.shape}")
+
+        # Release years ("Title (1995)") and row <-> column maps between movies_df and the matrix, for filters
+        years = self.movies_df["title"].astype(str).str.extract(r"\((\d{4})\)\s*$")[0]
+        self.movie_years = pd.to_numeric(years, errors="coerce").values
+        self.row_columns = self.movie_index.get_indexer(self.movies_df["movieId"])
+        first_rows = pd.Series(np.arange(len(self.movies_df)), index=self.movies_df["movieId"].values)
+        first_rows = first_rows[~first_rows.index.duplicated()]
+        self.column_rows = first_rows.reindex(self.movie_index).fillna(-1).astype(np.int64).values
+
+        self._update_movie_stats()
+
+    def _update_movie_stats(self, sums=None, counts=None):
+        """
+        Per-movie rating stats, indexed by movieId, plus counts, sums, averages
+        and popularity order aligned with the rating matrix columns.
+        Aggregated from ratings_df, or taken from per-column rating sums and
+        counts when given (incremental updates).
+        """
+        if counts is None:
+            # Aggregate in float64: ratings are stored as float32
+            ratings = self.ratings_df
+            self.movie_stats = (
+                ratings["rating"].astype("float64").groupby(ratings["movieId"])
+                .agg(["mean", "count"])
+                .rename(columns={"mean": "avg_rating", "count": "rating_count"})
+            )
+            stats = self.movie_stats.reindex(self.movie_index)
+            counts = stats["rating_count"].fillna(0).values
+            sums = (stats["avg_rating"] * stats["rating_count"]).fillna(0).values
+        else:
+            rated = counts > 0
+            self.movie_stats = pd.DataFrame(
+                {"avg_rating": sums[rated] / counts[rated], "rating_count": counts[rated].astype(np.int64)},
+                index=pd.Index(self.movie_index[rated], name="movieId"),
+            )
+        self.column_counts = counts
+        self.column_sums = sums
+        self.column_averages = _ratio(sums, counts)
+        # Columns by decreasing popularity, for the candidate top-up of filtered queries
+        self.popularity_order = np.argsort(-self._popularity_scores(), kind="stable")
+
+    def _build_genre_matrix(self):
+        """Build the movie × genre incidence matrix and per-user genre aggregates."""
+        try:
+            genres = (
+                self.movies_df.drop_duplicates("movieId")
+                .set_index("movieId")["genres"]
+                .reindex(self.movie_index)
+                .astype(object)
+                .fillna("")
+            )
+            incidence = genres.str.get_dummies(sep="|")
+
+            self.genre_names = incidence.columns.values
+            self.movie_genre_matrix = csr_matrix(incidence.values, dtype=np.float64)
+
+            # Rating sums and counts per (user, genre), one sparse product each
+            self.user_genre_sums = (self.rating_matrix @ self.movie_genre_matrix).toarray()
+            self.user_genre_counts = (self.rated_matrix @ self.movie_genre_matrix).toarray()
+
+            self._build_genre_postings()
+            print(f"✓ Genre matrix: {self.movie_genre_matrix.shape}")
+
+        except Exception as e:
+            print(f"❌ Error building genre matrix: {e}")
+            raise
+
+    def _build_genre_postings(self):
+        """Candidate postings: the most popular recommendable movies of each genre."""
+        popularity = self._popularity_scores()
+        popularity = np.where(self.column_counts >= MIN_RATINGS, popularity, np.nan)
+        by_genre = self.movie_genre_matrix.tocsc()
+        postings = []
+        for g in range(len(self.genre_names)):
+            members = by_genre.indices[by_genre.indptr[g]:by_genre.indptr[g + 1]]
+            members = members[np.isfinite(popularity[members])]
+            postings.append(members[np.argsort(-popularity[members], kind="stable")[:CANDIDATE_GENRE_POSTINGS]])
+        self.genre_postings = postings
+
+    def _build_trending(self):
+        """Build the time-decayed rating accumulators (updated in place as ratings arrive)."""
+        self.trending = TrendingIndex(
+            self.movies_df["movieId"].values, self.ratings_df, TRENDING_HALF_LIVES,
+            TRENDING_REFERENCE, TRENDING_REFERENCE_QUANTILE
+        )
+        print(f"✓ Trending accumulators: {len(self.trending.movie_ids)} movies × {len(TRENDING_HALF_LIVES)} windows")
+
     def _calculate_movie_similarity(self):
         """Compute cosine similarity between movies (item-based CF)."""
         try:
-            movie_matrix = self.user_item_matrix.T
-            if movie_matrix.empty:
+            if 0 in self.rating_matrix.shape:
                 print("⚠️ No movies found for similarity.")
                 return
 
-            movie_sparse = csr_matrix(movie_matrix.values)
-            similarity = cosine_similarity(movie_sparse)
+            similarity = cosine_similarity(self.rating_matrix.T)
 
-            self.movie_similarity_df = pd.DataFrame(
-                similarity, index=movie_matrix.index, columns=movie_matrix.index
-            )
+            self.movie_similarity = SimilarityMatrix(similarity, self.movie_index)
+
+            # Top neighbours per movie, for candidate generation
+            neighbors = np.empty((len(similarity), min(ITEM_NEIGHBORS_K, len(similarity) - 1)), dtype=np.int32)
+            for start in range(0, len(similarity), SIMILARITY_BLOCK_SIZE):
+                stop = min(start + SIMILARITY_BLOCK_SIZE, len(similarity))
+                neighbors[start:stop] = self._top_neighbors(similarity[start:stop], np.arange(start, stop), neighbors.shape[1])
+            self.item_neighbors = neighbors
             print("✓ Movie similarity matrix computed.")
 
         except Exception as e:
             print(f"❌ Error computing movie similarity: {e}")
             raise
 
+    def _top_neighbors(self, rows, own, k):
+        """Column positions of the k most similar movies for each similarity row (excluding itself)."""
+        rows = rows.copy()
+        rows[np.arange(len(own)), own] = -np.inf
+        return self.top_movies(rows, k)
+
     def _calculate_user_similarity(self):
         """Compute cosine similarity between users (user-based CF)."""
         try:
-            if self.user_item_matrix.empty:
+            if 0 in self.rating_matrix.shape:
                 print("⚠️ No users found for similarity.")
                 return
 
-            user_sparse = csr_matrix(self.user_item_matrix.values)
-            similarity = cosine_similarity(user_sparse)
+            similarity = cosine_similarity(self.rating_matrix)
 
-            self.user_similarity_df = pd.DataFrame(
-                similarity, index=self.user_item_matrix.index, columns=self.user_item_matrix.index
-            )
+            self.user_similarity = SimilarityMatrix(similarity, self.user_index)
             print("✓ User similarity matrix computed.")
 
         except Exception as e:
             print(f"❌ Error computing user similarity: {e}")
             raise
 
+    def _calculate_tag_similarity(self):
+        """Precompute top-K neighbours from a TF-IDF matrix over movie tags and genres."""
+        try:
+            # Rows of the TF-IDF matrix follow movies_df row order
+            movie_ids = self.movies_df["movieId"].values
+            positions = pd.Series(np.arange(len(movie_ids)), index=movie_ids)
+            positions = positions[~positions.index.duplicated()]
+
+            # Tokens: normalised tags, plus one prefixed token per genre
+            tokens = []
+            if self.tags_df is not None and not self.tags_df.empty:
+                tags = self.tags_df[["movieId", "tag"]].copy()
+                tags["tag"] = tags["tag"].astype(str).str.lower().str.strip()
+                tokens.append(tags[tags["tag"] != ""].rename(columns={"tag": "token"}))
+
+            genres = self.movies_df[["movieId", "genres"]].copy()
+            genres["token"] = genres["genres"].str.split("|")
+            genres = genres.explode("token")
+            genres = genres[(genres["token"] != "") & (genres["token"] != "(no genres listed)")]
+            genres["token"] = "genre:" + genres["token"]
+            tokens.append(genres[["movieId", "token"]])
+
+            tokens = pd.concat(tokens, ignore_index=True)
+            tokens = tokens[tokens["movieId"].isin(positions.index)]
+            rows = positions.loc[tokens["movieId"]].values
+            cols, vocab = pd.factorize(tokens["token"])
+
+            counts = csr_matrix(
+                (np.ones(len(rows)), (rows, cols)), shape=(len(movie_ids), len(vocab))
+            )
+            tfidf = TfidfTransformer(sublinear_tf=True).fit_transform(counts).tocsr()
+
+            # Only movies with enough ratings can be recommended
+            eligible = np.flatnonzero(
+                self.movie_stats["rating_count"].reindex(movie_ids).fillna(0).values >= MIN_RATINGS
+            )
+            candidates = tfidf[eligible].T.tocsc()
+            k = min(TAG_NEIGHBORS_K, len(eligible))
+
+            neighbors = np.full((len(movie_ids), k), -1, dtype=np.int32)
+            scores = np.zeros((len(movie_ids), k), dtype=np.float32)
+
+            for start in range(0, len(movie_ids), SIMILARITY_BLOCK_SIZE):
+                stop = min(start + SIMILARITY_BLOCK_SIZE, len(movie_ids))
+                block = (tfidf[start:stop] @ candidates).toarray()
+
+                # Exclude each movie from its own neighbour list
+                own = np.isin(eligible, np.arange(start, stop))
+                block[eligible[own] - start, np.flatnonzero(own)] = 0
+
+                top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(block, top, axis=1)
+                order = np.argsort(-top_scores, axis=1, kind="stable")
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+                neighbors[start:stop] = np.where(top_scores > 0, eligible[top], -1)
+                scores[start:stop] = top_scores
+
+            self.tag_movie_ids = positions
+            self.tag_neighbors = neighbors
+            self.tag_neighbor_scores = scores
+            print(f"✓ Tag similarity neighbours computed: {neighbors.shape}")
+
+        except Exception as e:
+            print(f"❌ Error computing tag similarity: {e}")
+            raise
+
+    @timed(RECOMMENDER_CALL_SECONDS)
+    def apply_ratings(self, ratings_df, changes):
+        """
+        Return the model updated with a batch of new or updated ratings.
+
+        The model being served is never modified (copy-on-write): the changed
+        matrices are rebuilt as new objects in a shallow copy that shares every
+        unchanged component, and the caller publishes it with one reference swap
+        (app.recommender = ...). Only the changed matrix cells, the genre
+        aggregates of the affected users, the genre candidate postings and the
+        similarity rows/columns of the affected users and movies are recomputed,
+        and only those are copied (see _with_ratings). Ratings from users or movies
+        unknown to the matrix change its shape, so they trigger a full rebuild
+        into a new instance instead. Tag neighbours are left as built until the
+        next full rebuild; the trending accumulators are shared by every version
+        and updated in place.
+
+        Calls are serialised and always start from the latest version returned,
+        so a caller holding an older one does not drop a concurrent update.
+        """
+        with self._update_lock:
+            base = self._versions["latest"]
+            if not changes.empty:
+                base.update_trending(changes["movieId"].values, changes["rating"].values, changes["timestamp"].values)
+            if changes.empty or not base.is_ready():
+                # A pending build will start from the new ratings
+                base.ratings_df = ratings_df
+                return base
+
+            users = base.user_index.get_indexer(changes["userId"])
+            movies = base.movie_index.get_indexer(changes["movieId"])
+            if (users < 0).any() or (movies < 0).any():
+                print("ℹ️ New users or movies in ratings batch, rebuilding the model")
+                updated = MovieRecommender(base.movies_df, ratings_df, base.tags_df, build=False)
+                updated._share_versions(base)
+                updated.prepare_data()
+            else:
+                updated = base._with_ratings(ratings_df, changes, users, movies)
+            updated.version = base.version + 1
+            self._versions["latest"] = updated
+            return updated
+
+    def _share_versions(self, other):
+        """Serialise updates with `other` and the versions derived from it."""
+        self._update_lock = other._update_lock
+        self._versions = other._versions
+
+    def _with_ratings(self, ratings_df, changes, users, movies):
+        """
+        Shallow copy of this model with the given rating cells changed (nothing shared is written to).
+        Costs O(ratings) for the sparse matrices and O((changed users + movies) × n) for the
+        similarities: only their changed rows are stored, on top of the shared matrices (see
+        model/similarity.py).
+        """
+        updated = copy.copy(self)
+        updated.status = dict(self.status)
+        updated._single_flight = SingleFlight()  # Calls in flight on this version must not answer for the new one
+        updated.ratings_df = ratings_df
+
+        # Changed cells (the last rating wins when a pair repeats) and the ratings they replace
+        cells = pd.DataFrame({"row": users, "column": movies, "rating": changes["rating"].values})
+        cells = cells.drop_duplicates(["row", "column"], keep="last")
+        rows, columns, ratings = cells["row"].values, cells["column"].values, cells["rating"].values.astype(np.float64)
+        previous = np.asarray(self.rating_matrix[rows, columns], dtype=np.float64).ravel()
+
+        matrix = self.rating_matrix.tocoo()
+        width = matrix.shape[1]
+        kept = ~np.isin(matrix.row.astype(np.int64) * width + matrix.col, rows * width + columns)
+        updated.rating_matrix = csr_matrix(
+            (
+                np.concatenate([matrix.data[kept], ratings.astype(matrix.dtype)]),
+                (np.concatenate([matrix.row[kept], rows]), np.concatenate([matrix.col[kept], columns])),
+            ),
+            shape=matrix.shape,
+        )
+        updated.rated_matrix = (updated.rating_matrix > 0).astype(np.int32)
+
+        counts, sums = self.column_counts.copy(), self.column_sums.copy()
+        np.add.at(counts, columns, previous == 0)
+        np.add.at(sums, columns, ratings - previous)
+        updated._update_movie_stats(sums, counts)
+        updated._build_genre_postings()  # Popularity changed
+
+        users, movies = np.unique(rows), np.unique(columns)
+        sums, counts = self.user_genre_sums.copy(), self.user_genre_counts.copy()
+        sums[users] = (updated.rating_matrix[users] @ self.movie_genre_matrix).toarray()
+        counts[users] = (updated.rated_matrix[users] @ self.movie_genre_matrix).toarray()
+        updated.user_genre_sums, updated.user_genre_counts = sums, counts
+
+        similarity = cosine_similarity(updated.rating_matrix[users], updated.rating_matrix)
+        updated.user_similarity = self.user_similarity.with_rows(users, similarity, SIMILARITY_PATCH_FRACTION)
+
+        item_matrix = updated.rating_matrix.T.tocsr()
+        similarity = cosine_similarity(item_matrix[movies], item_matrix)
+        updated.movie_similarity = self.movie_similarity.with_rows(movies, similarity, SIMILARITY_PATCH_FRACTION)
+        neighbors = self.item_neighbors.copy()
+        neighbors[movies] = self._top_neighbors(similarity, movies, neighbors.shape[1])
+        updated.item_neighbors = neighbors
+
+        print(f"✓ Model updated: {len(changes)} ratings, {len(users)} users, {len(movies)} movies")
+        return updated
+
+    def update_trending(self, movie_ids, ratings, timestamps):
+        """Record new rating events in the trending accumulators (no-op until they are built)."""
+        if self.trending is not None:
+            self.trending.add(movie_ids, ratings, timestamps)
+
     # =======================================================
     # ============= RECOMMENDATION METHODS ==================
     # =======================================================
-    def get_content_based_recommendations(self, movie_id, n=N_RECOMMENDATIONS):
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_content_based_recommendations(self, movie_id, n=N_RECOMMENDATIONS, filters=None):
         """Recommend similar movies by genre (Jaccard similarity)."""
         try:
             movie = self.movies_df[self.movies_df["movieId"] == movie_id]
             if movie.empty:
                 return []
 
+            # Jaccard against every movie at once: |A ∩ B| / (|A| + |B| - |A ∩ B|)
             base_genres = set(str(movie.iloc[0]["genres"]).split("|"))
+            common = self.movie_genre_matrix @ np.isin(self.genre_names, list(base_genres)).astype(np.float64)
+            sizes = self.movie_genre_matrix.getnnz(axis=1)
+            similarity = _ratio(common, sizes + len(base_genres) - common)
 
-            def jaccard_similarity(genres):
-                other = set(str(genres).split("|"))
-                return len(base_genres & other) / len(base_genres | other) if other else 0
-
-            recs = self.movies_df.copy()
-            recs["similarity"] = recs["genres"].apply(jaccard_similarity)
-            recs = recs[recs["movieId"] != movie_id]
-            recs = recs[recs["similarity"] > 0]
-
-            if recs.empty:
+            allowed = self._allowed_columns(filters, MIN_RATINGS) & (similarity > 0)
+            if movie_id in self.movie_index:
+                allowed[self.movie_index.get_loc(movie_id)] = False
+            candidates = np.flatnonzero(allowed)
+            if candidates.size == 0:
                 return []
 
-            # Add ratings info
-            stats = (
-                self.ratings_df.groupby("movieId")["rating"]
-                .agg(["mean", "count"])
-                .rename(columns={"mean": "avg_rating", "count": "rating_count"})
-                .reset_index()
+            top = candidates[np.lexsort((-self.column_averages[candidates], -similarity[candidates]))[:n]]
+            return self.movie_records(
+                self.movie_index.values[top], similarity=np.round(similarity[top], 3)
             )
 
-            recs = recs.merge(stats, on="movieId", how="left")
-            recs = recs[recs["rating_count"].fillna(0) >= MIN_RATINGS]
-
-            recs = recs.sort_values(["similarity", "avg_rating"], ascending=[False, False]).head(n)
-            recs["avg_rating"] = recs["avg_rating"].round(2)
-            recs["similarity"] = recs["similarity"].round(3)
-
-            return recs[["movieId", "title", "genres", "avg_rating", "rating_count", "similarity"]].to_dict("records")
-
         except Exception as e:
             print(f"❌ Error in content-based recommendations: {e}")
             return []
 
-    def get_item_based_recommendations(self, movie_id, n=N_RECOMMENDATIONS):
-        """Recommend similar movies using user rating patterns."""
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_tag_based_recommendations(self, movie_id, n=N_RECOMMENDATIONS, filters=None):
+        """
+        Recommend similar movies by TF-IDF cosine similarity over tags and genres.
+        Filters apply to the TAG_NEIGHBORS_K precomputed neighbours, so a very
+        selective filter may return fewer than n movies.
+        """
         try:
-            if self.movie_similarity_df is None or movie_id not in self.movie_similarity_df.index:
+            if self.tag_neighbors is None or movie_id not in self.tag_movie_ids.index:
+                return []
+
+            pos = self.tag_movie_ids.loc[movie_id]
+            neighbors, scores = self.tag_neighbors[pos], self.tag_neighbor_scores[pos]
+            keep = neighbors >= 0
+            if filters is not None:
+                keep &= self._allowed_rows(filters, 0)[np.maximum(neighbors, 0)]
+            neighbors, scores = neighbors[keep][:n], scores[keep][:n]
+            if neighbors.size == 0:
                 return []
 
-            similar_movies = (
-                self.movie_similarity_df[movie_id]
-                .drop(movie_id)
-                .sort_values(ascending=False)
-                .head(n * 2)
+            return self.movie_records(
+                self.movies_df["movieId"].values[neighbors], similarity=np.round(scores.astype(float), 3)
             )
 
-            recs = []
-            for mid, score in similar_movies.items():
-                movie = self.movies_df[self.movies_df["movieId"] == mid]
-                if movie.empty:
-                    continue
-
-                ratings = self.ratings_df[self.ratings_df["movieId"] == mid]
-                if len(ratings) < MIN_RATINGS:
-                    continue
-
-                recs.append({
-                    "movieId": mid,
-                    "title": movie.iloc[0]["title"],
-                    "genres": movie.iloc[0]["genres"],
-                    "similarity_score": round(float(score), 3),
-                    "avg_rating": round(ratings["rating"].mean(), 2),
-                    "rating_count": len(ratings)
-                })
+        except Exception as e:
+            print(f"❌ Error in tag-based recommendations: {e}")
+            return []
+
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_item_based_recommendations(self, movie_id, n=N_RECOMMENDATIONS, filters=None,
+                                       diversity=None, diversify_by="item"):
+        """Recommend similar movies using user rating patterns (optionally diversified, see diversify)."""
+        try:
+            if self.movie_similarity is None or movie_id not in self.movie_similarity.index:
+                return []
+
+            column = self.movie_index.get_loc(movie_id)
+            similarity = self.movie_similarity.row(column)
+            allowed = self._allowed_columns(filters, MIN_RATINGS)
+            allowed[column] = False
+            top = self.top_movies(np.where(allowed, similarity, -np.inf)[None, :], n if diversity is None else MMR_POOL_SIZE)[0]
+            top = top[top >= 0]
+            if diversity is not None:
+                top = top[self.diversify(top, similarity[top], n, diversity, diversify_by)]
 
-            return sorted(recs, key=lambda x: x["similarity_score"], reverse=True)[:n]
+            return self.movie_records(
+                self.movie_index.values[top],
+                similarity_score=np.round(similarity[top].astype(float), 3),
+            )
 
         except Exception as e:
             print(f"❌ Error in item-based recommendations: {e}")
             return []
 
-    def get_collaborative_recommendations(self, user_id, n=N_RECOMMENDATIONS):
-        """Recommend movies based on similar users' preferences."""
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_because_you_watched(self, user_id, seed_movies, rows=BECAUSE_WATCHED_ROWS, n=N_RECOMMENDATIONS, filters=None):
+        """
+        "Because you watched X" rows: item-based neighbours of the first `rows`
+        seed movies known to the model (the user's recent favourites, most
+        recent first), from one batched similarity lookup. Rows share one
+        de-duplication: a movie only appears in the earliest row that ranks
+        it, and never when the user already rated it.
+
+        Returns:
+            list of {"because_you_watched": seed movie, "recommendations": [...]}, empty rows dropped
+        """
         try:
-            if self.user_similarity_df is None or user_id not in self.user_item_matrix.index:
-                return self.get_popular_recommendations(n)
-
-            user_ratings = self.user_item_matrix.loc[user_id]
-            unrated = user_ratings[user_ratings == 0].index
-            similar_users = (
-                self.user_similarity_df[user_id]
-                .drop(user_id)
-                .sort_values(ascending=False)
-                .head(50)
+            if self.movie_similarity is None:
+                return []
+
+            seeds = self.movie_index.get_indexer(list(seed_movies))
+            seeds = pd.unique(seeds[seeds >= 0])[:rows]
+            if seeds.size == 0:
+                return []
+
+            allowed = self._allowed_columns(filters, MIN_RATINGS)
+            if user_id in self.user_index:
+                allowed[self.rated_matrix[self.user_index.get_loc(user_id)].indices] = False
+            allowed[seeds] = False
+
+            # n * rows per seed: each row still gets n movies whatever the earlier rows took
+            similarity = self.movie_similarity.rows(seeds)
+            ranked = self.top_movies(np.where(allowed, similarity, -np.inf), n * len(seeds))
+
+            taken = np.zeros(len(allowed), dtype=bool)
+            picks = []
+            for candidates in ranked:
+                candidates = candidates[candidates >= 0]
+                candidates = candidates[~taken[candidates]][:n]
+                taken[candidates] = True
+                picks.append(candidates)
+
+            # Format every row in one pass, then split it back per seed
+            movie_ids = self.movie_index.values
+            seed_records = self.movie_records(movie_ids[seeds])
+            records = self.movie_records(
+                movie_ids[np.concatenate(picks)],
+                similarity_score=np.round(np.concatenate([row[c] for row, c in zip(similarity, picks)]).astype(float), 3),
             )
+            bounds = np.cumsum([0] + [len(c) for c in picks])
+            return [
+                {"because_you_watched": seed_record, "recommendations": records[start:stop]}
+                for seed_record, start, stop in zip(seed_records, bounds[:-1], bounds[1:])
+                if stop > start
+            ]
 
-            predictions = []
-            for mid in unrated:
-                sim_ratings = self.user_item_matrix.loc[similar_users.index, mid]
-                mask = sim_ratings > 0
-                if mask.sum() == 0:
-                    continue
-
-                weights = similar_users[mask]
-                ratings = sim_ratings[mask]
-                predicted = np.dot(weights, ratings) / weights.sum()
-                predictions.append((mid, predicted))
-
-            if not predictions:
-                return self.get_popular_recommendations(n)
-
-            top_preds = sorted(predictions, key=lambda x: x[1], reverse=True)[:n]
-            recs = []
-
-            for mid, pred in top_preds:
-                movie = self.movies_df[self.movies_df["movieId"] == mid]
-                if movie.empty:
-                    continue
-
-                movie_ratings = self.ratings_df[self.ratings_df["movieId"] == mid]
-                recs.append({
-                    "movieId": mid,
-                    "title": movie.iloc[0]["title"],
-                    "genres": movie.iloc[0]["genres"],
-                    "predicted_rating": round(float(pred), 2),
-                    "avg_rating": round(movie_ratings["rating"].mean(), 2) if not movie_ratings.empty else None,
-                    "rating_count": len(movie_ratings)
-                })
+        except Exception as e:
+            print(f"❌ Error in because-you-watched recommendations: {e}")
+            return []
 
-            return recs
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_collaborative_recommendations(self, user_id, n=N_RECOMMENDATIONS, filters=None,
+                                          diversity=None, diversify_by="item"):
+        """Recommend movies based on similar users' preferences (optionally diversified, see diversify)."""
+        try:
+            movie_ids, scores = self.rank_collaborative(user_id, n, filters, diversity, diversify_by)
+            if movie_ids.size == 0:
+                return self.get_popular_recommendations(n, filters=filters)
+
+            return self.movie_records(movie_ids, predicted_rating=np.round(scores.astype(float), 2))
 
         except Exception as e:
             print(f"❌ Error in collaborative recommendations: {e}")
-            return self.get_popular_recommendations(n)
+            return self.get_popular_recommendations(n, filters=filters)
 
-    def get_popular_recommendations(self, n=N_RECOMMENDATIONS):
-        """Recommend globally popular movies."""
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def rank_collaborative(self, user_id, n=N_RECOMMENDATIONS, filters=None, diversity=None, diversify_by="item"):
+        """
+        Returns:
+            (movie ids, predicted ratings) behind get_collaborative_recommendations, best first
+            (empty when the user cannot be scored)
+        """
+        if self.user_similarity is None or user_id not in self.user_index:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        # Predictions exist only for movies rated by the nearest neighbours (one sparse product)
+        scores = self.score_users(
+            [user_id], "collaborative", min_ratings=self._min_ratings(filters, 0),
+            allowed=self._allowed_columns(filters, 0),
+        )[0]
+        top = self.top_movies(scores[None, :], n if diversity is None else MMR_POOL_SIZE)[0]
+        top = top[top >= 0]
+        if diversity is not None and top.size:
+            top = top[self.diversify(top, scores[top], n, diversity, diversify_by)]
+        return self.movie_index.values[top], scores[top]
+
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_similar_users(self, user_id, n=N_RECOMMENDATIONS, min_similarity=MIN_SIMILARITY_THRESHOLD):
+        """Return the top-n most similar users along with their co-rated movie counts."""
         try:
-            stats = (
-                self.ratings_df.groupby("movieId")["rating"]
-                .agg(["count", "mean"])
-                .rename(columns={"count": "rating_count", "mean": "avg_rating"})
-                .reset_index()
-            )
+            if self.user_similarity is None or user_id not in self.user_similarity.index:
+                return []
+
+            row = self.user_index.get_loc(user_id)
+            scores = self.user_similarity.row(row)
+            scores[row] = -np.inf
 
-            stats = stats[stats["rating_count"] >= MIN_RATINGS]
-            if stats.empty:
+            candidates = np.flatnonzero(scores > min_similarity)
+            top = candidates[np.argsort(-scores[candidates], kind="stable")[:n]]
+            if top.size == 0:
                 return []
 
-            # Weighted rating (Bayesian)
-            C = stats["avg_rating"].mean()
-            m = stats["rating_count"].quantile(0.7)
-            stats["weighted_rating"] = (
-                (stats["rating_count"] / (stats["rating_count"] + m)) * stats["avg_rating"]
-                + (m / (stats["rating_count"] + m)) * C
-            )
+            # Co-rated counts for all neighbours in one binary sparse product
+            common = (self.rated_matrix[top] @ self.rated_matrix[row].T).toarray().ravel()
+            user_ids = self.user_index.values[top]
+
+            return [
+                {
+                    "userId": int(uid),
+                    "similarity_score": round(float(scores[pos]), 3),
+                    "common_movies": int(count)
+                }
+                for uid, pos, count in zip(user_ids, top, common)
+            ]
 
-            top = stats.sort_values("weighted_rating", ascending=False).head(n)
-            recs = top.merge(self.movies_df, on="movieId", how="left")
+        except Exception as e:
+            print(f"❌ Error finding similar users: {e}")
+            return []
+
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_popular_recommendations(self, n=N_RECOMMENDATIONS, filters=None):
+        """Recommend globally popular movies."""
+        try:
+            # Weighted rating (Bayesian), prior fitted on movies with at least MIN_RATINGS ratings
+            weighted = self._popularity_scores()
+            allowed = self._allowed_columns(filters, MIN_RATINGS)
+            top = self.top_movies(np.where(allowed, weighted, -np.inf)[None, :], n)[0]
+            top = top[top >= 0]
+            if top.size == 0:
+                return []
 
-            recs["avg_rating"] = recs["avg_rating"].round(2)
-            recs["weighted_rating"] = recs["weighted_rating"].round(2)
+            recs = self.movies_df.iloc[self.column_rows[top]][["movieId", "title", "genres"]].copy()
+            recs["avg_rating"] = np.round(self.column_averages[top], 2)
+            recs["rating_count"] = self.column_counts[top]
+            recs["weighted_rating"] = np.round(weighted[top], 2)
 
             formatted = []
             for _, row in recs.iterrows():
@@ -290,44 +718,458 @@ class MovieRecommender:
             return []
 
 
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_trending_recommendations(self, n=N_RECOMMENDATIONS, window=TRENDING_DEFAULT_WINDOW, filters=None):
+        """
+        Recommend movies by recent rating activity: decayed rating count times
+        the recent average rating (shrunk towards the global one), over a
+        window given by its half-life. New releases can trend: no MIN_RATINGS.
+        """
+        try:
+            if self.trending is None:
+                return []
+
+            eligible, counts, shrunk, scores = self._trending_scores(window)
+            if filters is not None:
+                keep = self._allowed_rows(filters, 0)[self.trending.rows[eligible]]
+                eligible, counts, shrunk, scores = eligible[keep], counts[keep], shrunk[keep], scores[keep]
+            if eligible.size == 0:
+                return []
+
+            n = min(n, eligible.size)
+            top = np.argpartition(-scores, n - 1)[:n]
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            recs = self.movies_df.iloc[self.trending.rows[eligible[top]]][["movieId", "title", "genres"]].copy()
+            recs["avg_rating"] = self.movie_stats["avg_rating"].reindex(recs["movieId"]).round(2).values
+            recs["rating_count"] = self.movie_stats["rating_count"].reindex(recs["movieId"]).fillna(0).astype(int).values
+            recs["recent_ratings"] = np.round(counts[top], 1)
+            recs["recent_avg_rating"] = np.round(shrunk[top], 2)
+            recs["trending_score"] = np.round(scores[top], 3)
+
+            return recs.to_dict("records")
+
+        except Exception as e:
+            print(f"❌ Error in trending recommendations: {e}")
+            return []
+
+    def _trending_scores(self, window=TRENDING_DEFAULT_WINDOW):
+        """
+        Returns:
+            (eligible accumulator positions, decayed counts, shrunk recent averages, scores),
+            the last three aligned with the first
+        """
+        counts, averages = self.trending.snapshot(window)
+        eligible = np.flatnonzero(counts >= TRENDING_MIN_WEIGHT)
+        if eligible.size == 0:
+            return eligible, counts[:0], averages[:0], counts[:0]
+
+        counts, averages = counts[eligible], averages[eligible]
+        C = np.average(averages, weights=counts)
+        shrunk = (counts * averages + TRENDING_PRIOR_RATINGS * C) / (counts + TRENDING_PRIOR_RATINGS)
+        return eligible, counts, shrunk, counts * shrunk / 5.0
+
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def get_hybrid_recommendations(self, user_id, movie_id=None, n=N_RECOMMENDATIONS, filters=None,
+                                   diversity=None, diversify_by="item"):
+        """
+        Blend collaborative, item-based, content-based and popularity scores (HYBRID_WEIGHTS).
+        Two stages: cheap candidate generation, then exact scoring of the candidates only,
+        optionally followed by a diversity re-ranking (see diversify).
+        """
+        try:
+            movie_ids, scores = self.rank_hybrid(user_id, movie_id, n, filters, diversity, diversify_by)
+            if movie_ids.size == 0:
+                return self.get_popular_recommendations(n, filters=filters)
+
+            return self.movie_records(movie_ids, hybrid_score=np.round(scores.astype(float), 3))
+
+        except Exception as e:
+            print(f"❌ Error in hybrid recommendations: {e}")
+            return self.get_popular_recommendations(n, filters=filters)
+
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
+    def rank_hybrid(self, user_id, movie_id=None, n=N_RECOMMENDATIONS, filters=None, diversity=None,
+                    diversify_by="item"):
+        """
+        Returns:
+            (movie ids, hybrid scores) behind get_hybrid_recommendations, best first
+            (empty when the user cannot be scored)
+        """
+        none = np.empty(0, dtype=np.int64), np.empty(0)
+        if self.user_index is None or user_id not in self.user_index:
+            return none
+
+        allowed = None if filters is None else self._allowed_columns(filters, MIN_RATINGS)
+        candidates = self.generate_candidates(
+            user_id, movie_id, allowed=allowed, fill=filters is not None and filters.restricts_catalogue()
+        )
+        if candidates.size == 0:
+            return none
+
+        scores = self.score_users(
+            [user_id], "hybrid", seed_movies=[movie_id], min_ratings=self._min_ratings(filters, MIN_RATINGS),
+            columns=candidates, allowed=allowed,
+        )[0]
+        top = self.top_movies(scores[None, :], n if diversity is None else MMR_POOL_SIZE)[0]
+        top = top[top >= 0]
+        if diversity is not None and top.size:
+            top = top[self.diversify(candidates[top], scores[top], n, diversity, diversify_by)]
+        return self.movie_index.values[candidates[top]], scores[top]
+
+    def movie_records(self, movie_ids, **scores):
+        """Records with title, genres and rating stats for ranked movie ids, plus the given score columns."""
+        movies = self.movies_df[self.movies_df["movieId"].isin(movie_ids)].drop_duplicates("movieId").set_index("movieId")
+        movies = movies.reindex(movie_ids)
+        stats = self.movie_stats.reindex(movie_ids)
+        recs = pd.DataFrame({
+            "movieId": movie_ids,
+            "title": movies["title"].values,
+            "genres": movies["genres"].values,
+            "avg_rating": stats["avg_rating"].round(2).values,
+            "rating_count": stats["rating_count"].fillna(0).astype(int).values,
+            **scores,
+        })
+        return recs.to_dict("records")
+
+    # =======================================================
+    # =================== DIVERSITY =========================
+    # =======================================================
+    def diversify(self, columns, scores, n, diversity, by="item"):
+        """
+        Re-rank a ranked list of rating matrix columns with maximal marginal relevance.
+
+        Args:
+            columns, scores: the candidates and their relevance
+            diversity: MMR weight of dissimilarity in [0, 1] (0 keeps the relevance order)
+            by: "item" (rating-pattern cosine of movie_similarity) or "genre" (cosine of genre vectors)
+
+        Returns:
+            positions in `columns` of the n picks, in MMR order
+        """
+        if by == "item" and self.movie_similarity is not None:
+            similarity = self.movie_similarity
+            similarity_to = lambda i: similarity.block([columns[i]], columns)[0]
+        elif by in DIVERSITY_SIMILARITIES:
+            genres = self.movie_genre_matrix[columns].toarray()
+            genres /= np.maximum(np.sqrt(genres.sum(axis=1, keepdims=True)), 1)
+            similarity_to = lambda i: genres @ genres[i]
+        else:
+            raise ValueError(f"Unknown diversity similarity: {by} (expected one of {DIVERSITY_SIMILARITIES})")
+        return mmr(scores, similarity_to, n, 1 - diversity)
+
+    # =======================================================
+    # ==================== FILTERS ==========================
+    # =======================================================
+    @staticmethod
+    def _min_ratings(filters, default):
+        """Minimum rating count of a query: the filter's, else the method's default."""
+        return default if filters is None or filters.min_ratings is None else filters.min_ratings
+
+    def _allowed_rows(self, filters, min_ratings):
+        """Boolean mask over movies_df rows of the movies a filtered query may return."""
+        counts = np.where(self.row_columns >= 0, self.column_counts[self.row_columns], 0)
+        allowed = counts >= self._min_ratings(filters, min_ratings)
+        if filters is not None and filters.restricts_catalogue():
+            allowed &= filters.catalogue_mask(self.movies_df, self.movie_years)
+        return allowed
+
+    def _allowed_columns(self, filters, min_ratings):
+        """Boolean mask over the rating matrix columns of the movies a filtered query may return."""
+        rows = self._allowed_rows(filters, min_ratings)
+        return (self.column_rows >= 0) & rows[np.maximum(self.column_rows, 0)]
+
+    # =======================================================
+    # ============== CANDIDATE GENERATION ===================
+    # =======================================================
+    def generate_candidates(self, user_id, movie_id=None, limit=CANDIDATE_POOL_SIZE, allowed=None, fill=False):
+        """
+        First stage of the hybrid pipeline: a few hundred unrated movies worth
+        scoring exactly, from precomputed sources whose cost does not depend on
+        the catalogue size:
+        - the most popular movies of the user's favourite genres
+        - the currently trending movies
+        - the movies the user's nearest neighbours rated best
+        - item neighbours of the user's highest-rated movies (and of movie_id)
+        - with `fill`, the most popular `allowed` movies (precomputed order), so
+          that a filter restricting the catalogue still fills the pool
+
+        `allowed` (see _allowed_columns) drops the movies a filtered query may not return.
+
+        Returns:
+            rating matrix column positions, at most `limit`
+        """
+        row = self.user_index.get_loc(user_id)
+        ratings = self.rating_matrix[row]
+
+        counts = self.user_genre_counts[row]
+        rated_genres = np.flatnonzero(counts)
+        averages = self.user_genre_sums[row, rated_genres] / counts[rated_genres]
+        favorite_genres = rated_genres[np.argsort(-averages, kind="stable")[:CANDIDATE_GENRES]]
+        sources = [self.genre_postings[g] for g in favorite_genres]
+        sources.append(self._trending_columns(CANDIDATE_TRENDING))
+        if self.user_similarity is not None:
+            sources.append(self._neighbor_columns(row, CANDIDATE_NEIGHBOR_MOVIES))
+
+        # Neighbours in rank order across seeds: every seed's best neighbour first
+        seeds = ratings.indices[np.argsort(-ratings.data, kind="stable")[:CANDIDATE_SEED_LIKES]]
+        excluded = ratings.indices
+        if movie_id is not None and movie_id in self.movie_index:
+            seed = self.movie_index.get_loc(movie_id)
+            seeds, excluded = np.append(seed, seeds), np.append(excluded, seed)
+        sources.append(self.item_neighbors[seeds].T.ravel())
+        if fill and allowed is not None:
+            popular = self.popularity_order
+            sources.append(popular[allowed[popular]][:limit])
+
+        candidates = pd.unique(np.concatenate(sources).astype(np.int64))
+        candidates = candidates[(candidates >= 0) & ~np.isin(candidates, excluded)]
+        if allowed is not None:
+            candidates = candidates[allowed[candidates]]
+        return candidates[:limit]
+
+    def _neighbor_columns(self, row, k):
+        """Rating matrix columns of the k movies the user's nearest neighbours rate best (similarity-weighted mean)."""
+        similarity = self.user_similarity.row(row)
+        similarity[row] = -np.inf
+        n = min(TOP_SIMILAR_USERS, similarity.size - 1)
+        neighbors = np.argpartition(-similarity, n - 1)[:n]
+        weights = csr_matrix(np.maximum(similarity[neighbors], 0))
+        sums, counts = weights @ self.rating_matrix[neighbors], weights @ self.rated_matrix[neighbors]
+        columns = counts.indices[counts.data > 0]
+        means = sums[:, columns].toarray().ravel() / counts[:, columns].toarray().ravel()
+        popular = self.column_counts[columns] >= MIN_RATINGS
+        columns, means = columns[popular], means[popular]
+        return columns[np.argsort(-means, kind="stable")[:k]]
+
+    def _trending_columns(self, k):
+        """Rating matrix columns of the k most trending movies."""
+        if self.trending is None:
+            return np.empty(0, dtype=np.int64)
+        eligible, _, _, scores = self._trending_scores()
+        if eligible.size == 0:
+            return np.empty(0, dtype=np.int64)
+        top = eligible[np.argpartition(-scores, min(k, eligible.size) - 1)[:k]]
+        return self.movie_index.get_indexer(self.trending.movie_ids.values[top])
+
+    # =======================================================
+    # ================ BATCH SCORING ========================
+    # =======================================================
+    def score_users(self, user_ids, method="hybrid", seed_movies=None, weights=None,
+                    neighbors=TOP_SIMILAR_USERS, min_ratings=MIN_RATINGS, columns=None, allowed=None):
+        """
+        Score movies of the rating matrix for a batch of users at once.
+
+        Returns a (len(user_ids), n_movies) array aligned with
+        movie_index, or with `columns` (rating matrix column
+        positions) when given: candidate re-ranking then costs O(candidates).
+        Movies a user already rated, movies with fewer than `min_ratings`
+        ratings and movies a method cannot score are -inf. `seed_movies` (one
+        movieId or None per user) switches the content part from the user's
+        genre profile to similarity with that movie. `allowed` (a boolean mask
+        over all rating matrix columns, see _allowed_columns) pushes filters
+        down: other movies are -inf before any top-n selection.
+        """
+        rows = self.user_index.get_indexer(user_ids)
+        if (rows < 0).any():
+            raise KeyError("score_users() needs users present in the rating matrix")
+        if columns is not None:
+            columns = np.asarray(columns)
+        width = len(self.movie_index) if columns is None else len(columns)
+        selected = slice(None) if columns is None else columns
+
+        if method == "hybrid":
+            weights = weights or HYBRID_WEIGHTS
+            parts = {
+                "collaborative": lambda: self._collaborative_scores(rows, neighbors, columns),
+                "item_based": lambda: self._item_scores(rows, columns),
+                "content_based": lambda: self._content_scores(rows, seed_movies, columns),
+                "popularity": lambda: np.broadcast_to(self._popularity_scores(min_ratings)[selected], (len(rows), width)),
+            }
+            scores = np.zeros((len(rows), width))
+            for part, weight in weights.items():
+                if weight:
+                    scores += weight * _min_max(parts[part]())
+        elif method == "popular":
+            scores = np.tile(self._popularity_scores(min_ratings)[selected], (len(rows), 1))
+        elif method == "content":
+            scores = self._content_scores(rows, seed_movies, columns)
+        elif method == "tags":
+            scores = self._tag_scores(rows)[:, selected]
+        elif method == "item":
+            scores = self._item_scores(rows, columns)
+        elif method == "collaborative":
+            scores = self._collaborative_scores(rows, neighbors, columns)
+        else:
+            raise ValueError(f"Unknown scoring method: {method} (expected one of {self.SCORERS})")
+
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        rated = self.rated_matrix[rows]
+        if columns is not None:
+            rated = rated[:, columns]
+        scores[rated.toarray() > 0] = -np.inf
+        scores[:, self.column_counts[selected] < min_ratings] = -np.inf
+        if allowed is not None:
+            scores[:, ~allowed[selected]] = -np.inf
+        return scores
+
+    @staticmethod
+    def top_movies(scores, k):
+        """Column positions of the k best finite scores of each row, best first (-1 pads)."""
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        return np.where(np.isfinite(np.take_along_axis(top_scores, order, axis=1)), top, -1)
+
+    def _collaborative_scores(self, rows, neighbors, columns=None):
+        """Mean rating of each movie among the user's top neighbours who rated it, weighted by similarity."""
+        similarity = self.user_similarity.rows(rows)
+        similarity[np.arange(len(rows)), rows] = -np.inf
+        k = min(neighbors, similarity.shape[1] - 1)
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        weights = np.maximum(np.take_along_axis(similarity, top, axis=1), 0)
+        weights = csr_matrix(
+            (weights.ravel(), (np.repeat(np.arange(len(rows)), k), top.ravel())),
+            shape=similarity.shape,
+        )
+        sums, counts = weights @ self.rating_matrix, weights @ self.rated_matrix
+        if columns is not None:
+            sums, counts = sums[:, columns], counts[:, columns]
+        return _ratio(sums.toarray(), counts.toarray())
+
+    def _item_scores(self, rows, columns=None):
+        """Similarity-weighted mean of the user's own ratings, for every movie (or the given columns)."""
+        similarity = self.movie_similarity
+        ratings, rated = self.rating_matrix[rows], self.rated_matrix[rows]
+        # Same dtype on both sides, or scipy upcasts (copies) the dense similarity matrix
+        rated = rated.astype(similarity.dtype)
+        ratings = ratings.astype(similarity.dtype)
+        if columns is None:
+            return _ratio(similarity.left_multiply(ratings), similarity.left_multiply(rated))
+        # Only the (rated movies × candidates) block of the similarity matrix is read
+        sources = np.unique(rated.indices)
+        block = similarity.block(sources, columns)
+        ratings, rated = ratings[:, sources], rated[:, sources]
+        return _ratio(ratings @ block, rated @ block)
+
+    def _content_scores(self, rows, seed_movies=None, columns=None):
+        """
+        Mean of the user's genre preferences (genre average minus overall
+        average) over each movie's genres; or Jaccard genre similarity to the
+        user's seed movie when one is given.
+        """
+        sums, counts = self.user_genre_sums[rows], self.user_genre_counts[rows]
+        rated = self.rated_matrix[rows].sum(axis=1).A.ravel()
+        mean = self.rating_matrix[rows].sum(axis=1).A.ravel() / np.maximum(rated, 1)
+        preference = np.where(counts > 0, sums / np.maximum(counts, 1) - mean[:, None], 0.0)
+
+        genres = self.movie_genre_matrix if columns is None else self.movie_genre_matrix[columns]
+        sizes = genres.sum(axis=1).A.ravel()
+        scores = _ratio((genres @ preference.T).T, np.broadcast_to(sizes, (len(rows), len(sizes))))
+
+        if seed_movies is not None:
+            seeds = self.movie_index.get_indexer(
+                [m if m is not None else -1 for m in seed_movies]
+            )
+            seeded = np.flatnonzero(seeds >= 0)
+            if seeded.size:
+                seed_genres = self.movie_genre_matrix[seeds[seeded]]
+                common = (seed_genres @ genres.T).toarray()
+                union = seed_genres.sum(axis=1).A + sizes[None, :] - common
+                scores[seeded] = _ratio(common, union)
+        return scores
+
+
+    def _tag_scores(self, rows):
+        """Sum of the user's ratings over each movie's precomputed tag neighbours."""
+        columns = self.movie_index
+        # Neighbour lists hold movies_df rows: map them to rating matrix columns
+        positions = self.tag_movie_ids.reindex(columns).fillna(-1).astype(int).values
+        to_column = np.full(len(self.movies_df), -1)
+        to_column[positions[positions >= 0]] = np.flatnonzero(positions >= 0)
+
+        known = np.flatnonzero(positions >= 0)
+        neighbors = self.tag_neighbors[positions[known]]
+        targets = np.where(neighbors >= 0, to_column[neighbors], -1)
+        valid = targets >= 0
+        sources = np.broadcast_to(known[:, None], targets.shape)
+        similarity = csr_matrix(
+            (self.tag_neighbor_scores[positions[known]][valid], (sources[valid], targets[valid])),
+            shape=(len(columns), len(columns)),
+        )
+        return (self.rating_matrix[rows] @ similarity).toarray()
+
+    def _popularity_scores(self, min_ratings=MIN_RATINGS):
+        """Bayesian weighted rating of every movie (same formula as get_popular_recommendations)."""
+        counts, averages = self.column_counts, self.column_averages
+        eligible = counts >= min_ratings
+        if not eligible.any():
+            return np.full(len(counts), np.nan)
+        C = averages[eligible].mean()
+        m = np.quantile(counts[eligible], 0.7)
+        return counts / (counts + m) * averages + m / (counts + m) * C
+
     # =======================================================
     # =============== USER PROFILE ANALYSIS =================
     # =======================================================
+    @timed(RECOMMENDER_CALL_SECONDS)
+    @single_flight
     def get_user_profile(self, user_id):
         """Analyze a user's preferences (favorite genres, ratings)."""
         try:
-            if user_id not in self.user_item_matrix.index:
+            if user_id not in self.user_index:
                 return None
 
-            user_ratings = self.ratings_df[self.ratings_df["userId"] == user_id]
-            if user_ratings.empty:
+            row = self.user_index.get_loc(user_id)
+            user_ratings = self.rating_matrix[row].data
+            if user_ratings.size == 0:
                 return None
 
-            user_movies = user_ratings.merge(self.movies_df, on="movieId", how="left")
+            # Genre preferences from the precomputed (user, genre) aggregates
+            counts = self.user_genre_counts[row]
+            rated = np.flatnonzero(counts)
+            avg = self.user_genre_sums[row, rated] / counts[rated]
+            order = rated[np.argsort(-avg, kind="stable")][:5]
 
-            # Genre preferences
-            genre_data = []
-            for _, row in user_movies.iterrows():
-                for genre in str(row["genres"]).split("|"):
-                    genre_data.append({"genre": genre, "rating": row["rating"]})
+            favorite_genres = [
+                {
+                    "genre": self.genre_names[g],
+                    "avg_rating": float(self.user_genre_sums[row, g] / counts[g]),
+                    "count": int(counts[g])
+                }
+                for g in order
+            ]
 
-            genre_df = pd.DataFrame(genre_data)
-            genre_stats = (
-                genre_df.groupby("genre")["rating"]
-                .agg(["mean", "count"])
-                .rename(columns={"mean": "avg_rating"})
-                .reset_index()
-                .sort_values("avg_rating", ascending=False)
-            )
+            values, frequencies = np.unique(user_ratings, return_counts=True)
 
             return {
                 "user_id": user_id,
-                "total_ratings": len(user_ratings),
-                "avg_rating": round(user_ratings["rating"].mean(), 2),
-                "favorite_genres": genre_stats.head(5).to_dict("records"),
-                "rating_distribution": user_ratings["rating"].value_counts().sort_index().to_dict()
+                "total_ratings": int(user_ratings.size),
+                "avg_rating": round(float(user_ratings.mean()), 2),
+                "favorite_genres": favorite_genres,
+                "rating_distribution": {float(v): int(c) for v, c in zip(values, frequencies)}
             }
 
         except Exception as e:
             print(f"❌ Error generating user profile: {e}")
             return None
+
+
+def _ratio(numerator, denominator):
+    """Element-wise numerator / denominator, NaN where the denominator is 0."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=np.asarray(denominator) > 0)
+
+
+def _min_max(scores):
+    """Rescale each row to [0, 1] over its finite values (others become 0)."""
+    finite = np.isfinite(scores)
+    low = np.where(finite, scores, np.inf).min(axis=1, keepdims=True)
+    span = np.where(finite, scores, -np.inf).max(axis=1, keepdims=True) - low
+    with np.errstate(invalid="ignore"):
+        return np.divide(scores - low, span, out=np.zeros(scores.shape), where=finite & (span > 0))
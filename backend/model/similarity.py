@@ -0,0 +1,116 @@
+"""
+Dense symmetric similarity matrices (user × user, movie × movie) with
+copy-on-write row updates.
+
+A model update recomputes the similarity rows of the users or movies whose
+ratings changed. Writing them into the matrix would change the version being
+served, and copying the matrix costs O(n²) time and memory per update. A
+SimilarityMatrix is instead a read-only base shared by every version, plus a
+patch: the recomputed rows, which by symmetry also stand for the matching
+columns. An update copies only the patch, O(patched rows × n). Once the patch
+covers more than `compact_fraction` of the rows, it is folded into a new base,
+so the full copy is paid once per that many updated rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class SimilarityMatrix:
+    """Read-only symmetric matrix: a shared base plus patched rows (and, by symmetry, columns)."""
+
+    def __init__(self, values, index, patched=None, patch=None):
+        """
+        Args:
+            values: (n, n) base matrix (never written to)
+            index: ids of the rows (and columns)
+            patched: positions of the rows replaced by `patch`, in patch order
+            patch: (len(patched), n) rows that override the base
+        """
+        self.base = values
+        self.index = pd.Index(index)
+        self.patched = np.empty(0, dtype=np.int64) if patched is None else patched
+        self.patch = np.empty((0, len(values)), dtype=values.dtype) if patch is None else patch
+        self._order = np.argsort(self.patched, kind="stable")
+        self._sorted = self.patched[self._order]
+
+    @property
+    def shape(self):
+        return self.base.shape
+
+    @property
+    def dtype(self):
+        return self.base.dtype
+
+    def row(self, position):
+        """One row, as a new array."""
+        return self.block([position])[0]
+
+    def rows(self, positions):
+        """Rows at the given positions, as a new (len(positions), n) array."""
+        return self.block(positions)
+
+    def block(self, rows, columns=None):
+        """The rows × columns block (all columns by default), as a new array."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if columns is None:
+            out = self.base[rows]
+            columns = np.arange(self.shape[1])
+        else:
+            columns = np.asarray(columns, dtype=np.int64)
+            out = self.base[np.ix_(rows, columns)]
+        if self.patched.size:
+            # Patched columns first, then patched rows (which hold the final values of their cells)
+            slots = self._slots(columns)
+            hit = np.flatnonzero(slots >= 0)
+            out[:, hit] = self.patch[slots[hit]][:, rows].T
+            slots = self._slots(rows)
+            hit = np.flatnonzero(slots >= 0)
+            out[hit] = self.patch[slots[hit]][:, columns]
+        return out
+
+    def left_multiply(self, other):
+        """other @ matrix, for a sparse or dense left operand with n columns (same dtype, or the base is upcast)."""
+        out = np.asarray(other @ self.base)
+        if self.patched.size:
+            # Patched rows change every column; patched columns are then the patch rows transposed
+            out += np.asarray(other[:, self.patched] @ (self.patch - self.base[self.patched]))
+            out[:, self.patched] = np.asarray(other @ self.patch.T)
+        return out
+
+    def with_rows(self, positions, values, compact_fraction):
+        """
+        New matrix with the rows (and columns) at `positions` replaced; this one is left unchanged.
+
+        Args:
+            positions: unique row positions
+            values: (len(positions), n) new rows, symmetric with each other on `positions`
+            compact_fraction: fold the patch into a new base past this fraction of patched rows
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        values = values.astype(self.dtype, copy=False)
+        kept = ~np.isin(self.patched, positions)
+        earlier = self.patch if kept.all() else self.patch[kept]
+
+        # One new array: the shared patch is never written to
+        patched = np.concatenate([self.patched[kept], positions])
+        patch = np.concatenate([earlier, values])
+        patch[:len(earlier), positions] = values[:, self.patched[kept]].T
+
+        if len(patched) > compact_fraction * self.shape[0]:
+            base = self.base.copy()
+            base[patched] = patch
+            base[:, patched] = patch.T
+            return SimilarityMatrix(base, self.index)
+        return SimilarityMatrix(self.base, self.index, patched, patch)
+
+    def to_numpy(self):
+        """The full matrix, as a new array."""
+        return self.rows(np.arange(self.shape[0]))
+
+    def _slots(self, positions):
+        """Position of each row in the patch, -1 when it is not patched."""
+        slots = np.searchsorted(self._sorted, positions)
+        found = slots < len(self._sorted)
+        found[found] = self._sorted[slots[found]] == positions[found]
+        return np.where(found, self._order[np.minimum(slots, len(self._order) - 1)], -1)
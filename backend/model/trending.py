@@ -0,0 +1,109 @@
+"""
+Time-decayed popularity ("trending") maintained incrementally.
+
+Each window keeps, per movie, an exponentially decayed rating count and
+rating sum. They are stored as forward-decay accumulators relative to a
+landmark time t0: a rating at time t adds exp(lambda * (t - t0)). So a new
+rating is an O(1) update and never rescans history, and all movies share
+the same decay factor at query time. Rankings therefore come straight from
+the accumulators.
+
+Scores are decayed to one reference time: the request time for live data,
+or a fixed time for an offline dataset (by default a high quantile of its
+rating times), in which case later events count as happening at that time.
+A single new or outlying event can therefore never move the reference and
+decay the whole history.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Rebase the landmark before exp(lambda * (t - t0)) gets close to float64 overflow
+MAX_EXPONENT = 300.0
+
+
+class TrendingIndex:
+    """Decayed rating counts and sums per movie, one pair of accumulators per window."""
+
+    def __init__(self, movie_ids, ratings_df, half_lives, reference="now", quantile=1.0):
+        """
+        Args:
+            movie_ids: catalogue movie ids, in movies_df row order (ratings of other movies are ignored)
+            ratings_df: existing ratings (movieId, rating, timestamp)
+            half_lives: {window name: half-life in seconds}
+            reference: time scores are decayed to: "now" (request time), "data" (the
+                `quantile` of ratings_df timestamps, for offline datasets) or a fixed Unix time
+            quantile: quantile of the rating times used by the "data" reference; below 1.0 it
+                ignores a few outlying ratings dated far after the rest of the history
+        """
+        self._lock = threading.Lock()
+        movie_ids = pd.Index(np.asarray(movie_ids))
+        # One accumulator per distinct movie; rows maps it back to its first catalogue row
+        self.rows = np.flatnonzero(~movie_ids.duplicated())
+        self.movie_ids = movie_ids[self.rows]
+        self.rates = {window: math.log(2) / half_life for window, half_life in half_lives.items()}
+        self.landmark = float(ratings_df["timestamp"].max()) if len(ratings_df) else 0.0
+        if reference == "now":
+            self.reference = None
+        elif reference == "data":
+            self.reference = float(np.quantile(ratings_df["timestamp"], quantile)) if len(ratings_df) else 0.0
+        else:
+            self.reference = float(reference)
+        self.counts = {window: np.zeros(len(self.movie_ids)) for window in self.rates}
+        self.sums = {window: np.zeros(len(self.movie_ids)) for window in self.rates}
+        self.add(ratings_df["movieId"].values, ratings_df["rating"].values, ratings_df["timestamp"].values)
+
+    def add(self, movie_ids, ratings, timestamps):
+        """Account for new rating events (an updated rating counts as a new event)."""
+        positions = self.movie_ids.get_indexer(np.asarray(movie_ids))
+        known = positions >= 0
+        positions = positions[known]
+        ratings = np.asarray(ratings, dtype=np.float64)[known]
+        timestamps = np.asarray(timestamps, dtype=np.float64)[known]
+        if positions.size == 0:
+            return
+        if self.reference is not None:
+            # Events after a fixed reference time count as happening at it
+            timestamps = np.minimum(timestamps, self.reference)
+
+        with self._lock:
+            latest = float(timestamps.max())
+            if max(self.rates.values()) * (latest - self.landmark) > MAX_EXPONENT:
+                self._rebase(latest)
+            for window, rate in self.rates.items():
+                weights = np.exp(rate * (timestamps - self.landmark))
+                self.counts[window] += np.bincount(positions, weights, minlength=len(self.movie_ids))
+                self.sums[window] += np.bincount(positions, weights * ratings, minlength=len(self.movie_ids))
+
+    def _rebase(self, landmark):
+        """Move the landmark forward, rescaling every accumulator (caller holds the lock)."""
+        for window, rate in self.rates.items():
+            factor = math.exp(-rate * (landmark - self.landmark))
+            self.counts[window] *= factor
+            self.sums[window] *= factor
+        self.landmark = landmark
+
+    def snapshot(self, window, now=None):
+        """
+        Decayed counts and average ratings of every movie, as of the reference time.
+
+        Args:
+            now: request time used when the reference is "now" (default: time.time())
+
+        Returns:
+            (counts, averages) arrays aligned with movie_ids (averages NaN when unrated)
+        """
+        if self.reference is not None:
+            now = self.reference
+        elif now is None:
+            now = time.time()
+        with self._lock:
+            factor = math.exp(-self.rates[window] * (now - self.landmark))
+            counts = self.counts[window] * factor
+            sums = self.sums[window] * factor
+        averages = np.divide(sums, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+        return counts, averages
@@ -3,19 +3,28 @@ server.py - Point d'entrée de l'application Flask
 Configure et démarre le serveur API
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 import sys
 import os
+import threading
+import time
 from datetime import datetime
 
 # Ajouter le répertoire courant au path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from config import HOST, PORT, DEBUG
-from database.db_manager import DatabaseManager
-from model.recommender import MovieRecommender
+from config import (
+    HOST, PORT, DEBUG, PROFILE_TOKEN, PROFILE_INTERVAL, PROFILE_DIR, PROFILE_HISTORY,
+    CACHE_ENABLED, CACHE_TIMEOUT, RESULT_CACHE_ENTRIES
+)
 from api.routes import register_routes
+from utils import metrics
+from utils.profiling import ProfileStore, SamplingProfiler, authorized
+from utils.result_cache import ResultCache
+
+# pandas, scikit-learn et scipy ne sont importés qu'à l'initialisation
+# (DatabaseManager, MovieRecommender) : importer ce module reste rapide.
 
 # Initialisation de l'application Flask
 app = Flask(__name__)
@@ -33,16 +42,28 @@ CORS(app, resources={
 app.config['JSON_SORT_KEYS'] = False
 app.config['JSON_AS_ASCII'] = False
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = True
+app.config['JSONIFY_PRETTYPRINT_REGULAR'] = DEBUG
+app.json.compact = not DEBUG  # Compact JSON outside of debug mode
 
 # Variables globales pour partager entre les routes
 db_manager = None
 recommender = None
+model_error = None
+app.db_manager = None
+app.recommender = None
+app.result_cache = ResultCache(RESULT_CACHE_ENTRIES, CACHE_TIMEOUT, enabled=CACHE_ENABLED)
+profile_store = ProfileStore(PROFILE_DIR, PROFILE_HISTORY)
+
 
+def initialize_system(background=False):
+    """
+    Initialise la base de données et le système de recommandation
 
-def initialize_system():
-    """Initialise la base de données et le système de recommandation"""
-    global db_manager, recommender
+    Args:
+        background: construit le modèle dans un thread ; le catalogue est servi
+            immédiatement et /api/health indique l'état de chaque composant
+    """
+    global db_manager
     
     print("\n" + "="*60)
     print("🎬 Movie Recommendation System")
@@ -53,6 +74,7 @@ def initialize_system():
         
         # Initialiser la base de données
         print("📊 Chargement de la base de données...")
+        from database.db_manager import DatabaseManager
         db_manager = DatabaseManager()
         
         if db_manager.movies_df is None or db_manager.ratings_df is None:
@@ -64,14 +86,15 @@ def initialize_system():
         if db_manager.users_df is not None:
             print(f"   ✓ {len(db_manager.users_df)} utilisateurs chargés")
         
-        # Initialiser le système de recommandation
-        print("🤖 Initialisation du système de recommandation...")
-        recommender = MovieRecommender(db_manager.movies_df, db_manager.ratings_df)
-        print("   ✓ Modèle de recommandation prêt")
-        
         # Stocker dans l'app context
         app.db_manager = db_manager
-        app.recommender = recommender
+        
+        # Initialiser le système de recommandation
+        if background:
+            print("🤖 Construction du modèle de recommandation en arrière-plan...")
+            threading.Thread(target=build_recommender, name="model-build", daemon=True).start()
+        elif not build_recommender():
+            return False
         
         print("\n✅ Système initialisé avec succès !")
         print("="*60 + "\n")
@@ -86,13 +109,68 @@ def initialize_system():
         return False
 
 
+def build_recommender():
+    """Importe et construit le modèle de recommandation, composant par composant"""
+    global recommender, model_error
+    
+    try:
+        print("🤖 Initialisation du système de recommandation...")
+        from model.recommender import MovieRecommender
+        recommender = MovieRecommender(
+            db_manager.movies_df, db_manager.ratings_df, db_manager.tags_df, build=False
+        )
+        app.recommender = recommender
+        recommender.build()
+        print("   ✓ Modèle de recommandation prêt")
+        return True
+        
+    except Exception as e:
+        model_error = str(e)
+        print(f"\n❌ Erreur lors de la construction du modèle: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 @app.before_request
 def log_request():
     """Log les requêtes entrantes"""
+    g.request_start = time.perf_counter()
     if DEBUG:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] {request.method} {request.path}")
 
 
+@app.before_request
+def start_profiling():
+    """Profile la requête si elle porte un X-Profile-Token d'administrateur valide"""
+    token = request.headers.get('X-Profile-Token')
+    if token and authorized(token, PROFILE_TOKEN) and not request.path.startswith('/api/profiles'):
+        g.profiler = SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL).start()
+
+
+@app.after_request
+def stop_profiling(response):
+    """Enregistre le profil de la requête et renvoie son identifiant (X-Profile-Id)"""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        duration = profiler.stop()
+        profile_id = profile_store.save(profiler, duration, request.method, request.full_path.rstrip('?'), response.status_code)
+        response.headers['X-Profile-Id'] = profile_id
+        response.headers['X-Profile-Samples'] = str(profiler.samples)
+    return response
+
+
+@app.after_request
+def record_request(response):
+    """Mesure la latence de la requête, par route (règle d'URL) et statut"""
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe(metrics.HTTP_REQUEST_SECONDS, time.perf_counter() - start, route=route, method=request.method)
+        metrics.increment(metrics.HTTP_REQUESTS, route=route, method=request.method, status=response.status_code)
+    return response
+
+
 @app.after_request
 def add_headers(response):
     """Ajoute des headers de sécurité et cache"""
@@ -147,6 +225,8 @@ def home():
         'endpoints': {
             'documentation': 'GET /api/docs',
             'health': 'GET /api/health',
+            'metrics': 'GET /api/metrics',
+            'profiles': 'GET /api/profiles (X-Profile-Token)',
             'movies': {
                 'list': 'GET /api/movies',
                 'details': 'GET /api/movies/<id>',
@@ -157,15 +237,19 @@ def home():
             },
             'recommendations': {
                 'content_based': 'GET /api/recommendations/content/<movie_id>',
+                'tag_based': 'GET /api/recommendations/tags/<movie_id>',
                 'item_based': 'GET /api/recommendations/item/<movie_id>',
                 'collaborative': 'GET /api/recommendations/collaborative/<user_id>',
                 'hybrid': 'GET /api/recommendations/hybrid/<user_id>',
                 'personalized': 'GET /api/recommendations/personalized/<user_id>',
+                'because_you_watched': 'GET /api/recommendations/because-you-watched/<user_id>',
                 'popular': 'GET /api/recommendations/popular',
+                'trending': 'GET /api/recommendations/trending?window=<week|month|year>',
                 'compare': 'POST /api/recommendations/compare'
             },
             'ratings': {
                 'add': 'POST /api/ratings',
+                'bulk': 'POST /api/ratings/bulk',
                 'user_ratings': 'GET /api/ratings/user/<user_id>',
                 'movie_ratings': 'GET /api/ratings/movie/<movie_id>'
             },
@@ -189,30 +273,67 @@ def home():
 def health_check():
     """Endpoint de santé pour monitoring"""
     db_status = 'connected' if db_manager and db_manager.movies_df is not None else 'disconnected'
-    rec_status = 'ready' if recommender and recommender.user_item_matrix is not None else 'not_ready'
+    
+    # État de chaque composant du modèle (construit en arrière-plan au démarrage)
+    recommender = app.recommender  # Version publiée (remplacée à chaque mise à jour du modèle)
+    model_status = dict(recommender.status) if recommender else {}
+    if recommender and recommender.is_ready():
+        rec_status = 'ready'
+    elif model_error or 'failed' in model_status.values():
+        rec_status = 'failed'
+    else:
+        rec_status = 'building'
     
     is_healthy = db_status == 'connected' and rec_status == 'ready'
+    is_starting = db_status == 'connected' and rec_status == 'building'
     
     return jsonify({
-        'status': 'healthy' if is_healthy else 'degraded',
+        'status': 'healthy' if is_healthy else 'starting' if is_starting else 'degraded',
         'timestamp': datetime.now().isoformat(),
         'components': {
             'database': db_status,
-            'recommender': rec_status
+            'recommender': rec_status,
+            'model': model_status
         },
         'stats': {
             'movies': len(db_manager.movies_df) if db_manager else 0,
             'ratings': len(db_manager.ratings_df) if db_manager else 0,
             'users': len(db_manager.users_df) if db_manager and db_manager.users_df is not None else 0
         }
-    }), 200 if is_healthy else 503
+    }), 200 if is_healthy or is_starting else 503
+
+
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Métriques du processus au format texte Prometheus (latences, compteurs, caches, construction du modèle)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/profiles')
+def list_profiles():
+    """Profils de requêtes enregistrés (jeton X-Profile-Token requis)"""
+    if not authorized(request.headers.get('X-Profile-Token'), PROFILE_TOKEN):
+        return jsonify({'success': False, 'error': 'Profiling token required'}), 403
+    profiles = profile_store.list()
+    return jsonify({'success': True, 'count': len(profiles), 'data': profiles}), 200
+
+
+@app.route('/api/profiles/<profile_id>')
+def get_profile(profile_id):
+    """Piles échantillonnées d'une requête, au format folded (flamegraph.pl, speedscope)"""
+    if not authorized(request.headers.get('X-Profile-Token'), PROFILE_TOKEN):
+        return jsonify({'success': False, 'error': 'Profiling token required'}), 403
+    folded = profile_store.folded(profile_id)
+    if folded is None:
+        return jsonify({'success': False, 'error': f'Profile {profile_id} not found'}), 404
+    return Response(folded, mimetype='text/plain; charset=utf-8')
 
 
 def main():
     """Fonction principale pour démarrer le serveur"""
     
-    # Initialiser le système
-    if not initialize_system():
+    # Initialiser le système (le modèle se construit pendant que le serveur démarre)
+    if not initialize_system(background=True):
         print("❌ Impossible de démarrer le serveur sans données valides")
         print("⚠️  Veuillez vérifier vos fichiers de configuration et de données\n")
         return
@@ -0,0 +1,63 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from database import storage
+from database.db_manager import DatabaseManager
+from database.storage import CSV_FILES, CSVStorage
+
+
+@pytest.fixture
+def db(tmp_path):
+    """DatabaseManager over a copy of the shipped CSV files (writes never touch data/)."""
+    files = {table: shutil.copy(path, tmp_path) for table, path in CSV_FILES.items()}
+    db = DatabaseManager(CSVStorage(files))
+    yield db
+    db.flush()
+
+
+@pytest.mark.parametrize("rating", [0, 0.0, 0.25, 3.3, 4.75, 5.5, -1])
+def test_upsert_rating_rejects_ratings_off_the_half_star_scale(db, rating):
+    before = db.ratings_df
+    assert db.upsert_rating(1, 2, rating) == (False, False)
+    assert db.ratings_df is before
+
+
+@pytest.mark.parametrize("rating", [0.5, 3.5, 5.0])
+def test_upsert_rating_accepts_half_stars(db, rating):
+    assert db.upsert_rating(1, 2, rating)[0]
+    stored = db.ratings_df[(db.ratings_df["userId"] == 1) & (db.ratings_df["movieId"] == 2)]
+    assert stored["rating"].tolist() == [rating]
+
+
+def _sorted_ratings(db):
+    return db.ratings_df.sort_values(["userId", "movieId"]).reset_index(drop=True)
+
+
+def test_rating_updates_and_deletes_are_appended_and_reloaded(db):
+    path = db.storage.files["ratings"]
+    with open(path, "rb") as f:
+        head = f.read()
+    assert db.upsert_rating(1, 1, 1.5) == (True, True)
+    assert db.delete_rating(1, 3)
+    db.flush()
+
+    with open(path, "rb") as f:
+        assert f.read().startswith(head)
+    reloaded = DatabaseManager(CSVStorage(db.storage.files))
+    pd.testing.assert_frame_equal(_sorted_ratings(reloaded), _sorted_ratings(db))
+
+
+def test_csv_log_is_compacted(db, monkeypatch):
+    monkeypatch.setattr(storage, "CSV_COMPACT_FRACTION", 0)
+    monkeypatch.setattr(storage, "CSV_COMPACT_MIN_ROWS", 2)
+    path = db.storage.files["ratings"]
+    rows = len(db.ratings_df)
+    for movie_id in (1, 3, 6):
+        db.upsert_rating(1, movie_id, 0.5)
+    db.flush()
+
+    assert len(pd.read_csv(path)) == rows
+    reloaded = DatabaseManager(CSVStorage(db.storage.files))
+    pd.testing.assert_frame_equal(_sorted_ratings(reloaded), _sorted_ratings(db))
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import numpy as np
+
+from model.filters import MovieFilter
+from utils.metrics import CACHE_REQUESTS, REGISTRY
+from utils.singleflight import SingleFlight, single_flight
+
+
+class SlowRecommender:
+    """Stand-in whose recommendation call blocks until released, counting computations."""
+
+    def __init__(self):
+        self._single_flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    @single_flight
+    def recommend(self, user_id, seed_movies, n=10, filters=None):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return [user_id, list(seed_movies), n]
+
+
+def _hits():
+    return REGISTRY.get(CACHE_REQUESTS, cache="single_flight", result="hit") or 0
+
+
+def test_movie_filters_compare_by_value():
+    a = MovieFilter(genres=["Drama", "comedy"], year_min=1990, exclude=[3, 1])
+    b = MovieFilter(genres=["Comedy", "drama"], year_min=1990, exclude=(1, 3, 3))
+    assert a == b and hash(a) == hash(b)
+    assert a != MovieFilter(genres=["Drama"], year_min=1990, exclude=[1, 3])
+
+
+def test_concurrent_filtered_calls_share_one_computation():
+    recommender = SlowRecommender()
+    results = []
+
+    def call(seeds):
+        filters = MovieFilter(genres=["Drama"], year_min=1990, exclude=[5])
+        results.append(recommender.recommend(7, seeds, filters=filters))
+
+    hits = _hits()
+    leader = threading.Thread(target=call, args=([1, 2, 3],))
+    follower = threading.Thread(target=call, args=(np.array([1, 2, 3]),))
+    leader.start()
+    assert recommender.started.wait(5)
+    follower.start()
+    deadline = time.monotonic() + 5
+    while _hits() == hits and time.monotonic() < deadline:
+        time.sleep(0.001)
+    recommender.release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert recommender.calls == 1
+    assert results == [[7, [1, 2, 3], 10]] * 2
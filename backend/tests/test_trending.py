@@ -0,0 +1,26 @@
+import pytest
+
+from config import TRENDING_HALF_LIVES
+from database.storage import CSVStorage
+from model.recommender import MovieRecommender
+
+
+@pytest.fixture(scope="module")
+def recommender():
+    """Trending built from the shipped dataset, whose latest rating is years after the rest."""
+    storage = CSVStorage()
+    recommender = MovieRecommender(storage.load("movies", required=True), storage.load("ratings", required=True), build=False)
+    recommender._build_component("rating_matrix", recommender._build_rating_matrix)
+    recommender._build_component("trending", recommender._build_trending)
+    return recommender
+
+
+@pytest.mark.parametrize("window", sorted(TRENDING_HALF_LIVES))
+def test_trending_returns_n_movies_on_shipped_data(recommender, window):
+    assert len(recommender.get_trending_recommendations(n=10, window=window)) == 10
+
+
+def test_outlying_late_rating_does_not_set_the_reference(recommender):
+    timestamps = recommender.ratings_df["timestamp"]
+    assert recommender.trending.reference < timestamps.max()
+    assert recommender.trending.reference >= timestamps.quantile(0.99)
@@ -0,0 +1,208 @@
+"""
+metrics.py - Instrumentation légère (compteurs, jauges, histogrammes de latence)
+
+Les mesures sont gardées en mémoire, par processus, et exposées au format
+texte Prometheus par /api/metrics. Les quantiles p50/p95/p99 sont estimés
+à partir des buckets des histogrammes (interpolation linéaire).
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Bornes des buckets de latence (secondes)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+HTTP_REQUEST_SECONDS = "cinematch_http_request_duration_seconds"
+HTTP_REQUESTS = "cinematch_http_requests_total"
+DB_QUERY_SECONDS = "cinematch_db_query_duration_seconds"
+DB_WRITE_FAILURES = "cinematch_db_write_failures_total"
+RECOMMENDER_CALL_SECONDS = "cinematch_recommender_call_duration_seconds"
+CACHE_REQUESTS = "cinematch_cache_requests_total"
+MODEL_BUILD_SECONDS = "cinematch_model_build_duration_seconds"
+MODEL_BUILDS = "cinematch_model_builds_total"
+
+# Familles exposées : nom → (type, description)
+FAMILIES = {
+    HTTP_REQUEST_SECONDS: ("histogram", "HTTP request latency by route"),
+    HTTP_REQUESTS: ("counter", "HTTP requests by route and status"),
+    DB_QUERY_SECONDS: ("histogram", "DatabaseManager query latency"),
+    DB_WRITE_FAILURES: ("counter", "Writes that could not be saved to storage, by table"),
+    RECOMMENDER_CALL_SECONDS: ("histogram", "MovieRecommender call latency"),
+    CACHE_REQUESTS: ("counter", "Cache lookups by cache and result (hit/miss)"),
+    MODEL_BUILD_SECONDS: ("gauge", "Duration of the last build of each model component"),
+    MODEL_BUILDS: ("counter", "Model component builds"),
+}
+
+
+class Histogram:
+    """Histogramme cumulatif à buckets fixes."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernier bucket : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estime le quantile q à partir des buckets (comme histogram_quantile)."""
+        if self.count == 0:
+            return float("nan")
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count > 0:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Registre thread-safe des séries (famille + labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {name: {} for name in FAMILIES}
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series[name]
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[name][key] = value
+
+    def get(self, name, **labels):
+        """Retourne la valeur courante d'une série (Histogram pour un histogramme), ou None."""
+        with self._lock:
+            return self._series[name].get(tuple(sorted(labels.items())))
+
+    def render(self):
+        """Retourne toutes les séries au format texte Prometheus (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (kind, description) in FAMILIES.items():
+                series = self._series[name]
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(series.items()):
+                    if kind == "histogram":
+                        lines.extend(self._render_histogram(name, dict(key), value))
+                    else:
+                        lines.append(f"{name}{_labels(dict(key))} {_number(value)}")
+
+                if kind == "histogram":
+                    quantiles = f"{name.replace('_seconds', '')}_quantile_seconds"
+                    lines.append(f"# HELP {quantiles} {description} (p50/p95/p99 estimated from buckets)")
+                    lines.append(f"# TYPE {quantiles} gauge")
+                    for key, histogram in sorted(series.items()):
+                        for q in QUANTILES:
+                            labels = dict(key, quantile=str(q))
+                            lines.append(f"{quantiles}{_labels(labels)} {_number(histogram.quantile(q))}")
+
+            lines.extend(self._render_hit_ratios())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(name, labels, histogram):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _number(bound)
+            lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return lines
+
+    def _render_hit_ratios(self):
+        """Taux de hit par cache, calculé à partir de cinematch_cache_requests_total."""
+        totals = {}
+        for key, count in self._series[CACHE_REQUESTS].items():
+            labels = dict(key)
+            hits, total = totals.get(labels.get("cache"), (0, 0))
+            totals[labels.get("cache")] = (hits + (count if labels.get("result") == "hit" else 0), total + count)
+
+        name = "cinematch_cache_hit_ratio"
+        lines = [f"# HELP {name} Share of cache lookups served without computing", f"# TYPE {name} gauge"]
+        for cache, (hits, total) in sorted(totals.items()):
+            lines.append(f"{name}{_labels({'cache': cache})} {_number(hits / total if total else 0.0)}")
+        return lines
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Registre partagé par tout le processus
+REGISTRY = MetricsRegistry()
+
+observe = REGISTRY.observe
+increment = REGISTRY.increment
+set_gauge = REGISTRY.set
+render = REGISTRY.render
+
+
+@contextmanager
+def timer(name, **labels):
+    """Mesure la durée du bloc dans l'histogramme `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(name):
+    """Décorateur : mesure chaque appel dans l'histogramme `name`, label method=<nom>."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start, method=fn.__name__)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,159 @@
+"""
+profiling.py - Profilage à la demande d'une requête (échantillonnage de pile)
+
+Un thread échantillonne la pile du thread qui traite la requête à
+intervalle fixe. Les piles sont agrégées au format « folded » de
+flamegraph.pl (une ligne `frame;frame;frame count`), lisible aussi par
+speedscope, et enregistrées dans PROFILE_DIR : n'importe quel worker peut
+ensuite les relire. Sans en-tête de profilage, rien n'est démarré.
+"""
+
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SamplingProfiler:
+    """Échantillonne la pile d'un thread jusqu'à stop()."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête l'échantillonnage et retourne la durée profilée (s)."""
+        self._stop.set()
+        self._thread.join()
+        return time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def _label(self, code):
+        """`fonction (fichier:ligne)`, fichier relatif à backend/ ou à site-packages."""
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def by_package(self):
+        """Échantillons par paquet de la frame feuille (temps propre : model, pandas, numpy...)."""
+        packages = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            path = leaf[leaf.rfind(" (") + 2:].rsplit(":", 1)[0]
+            package = path.split("/", 1)[0] if "/" in path else path.removesuffix(".py")
+            packages[package] = packages.get(package, 0) + count
+        return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def _short_path(filename):
+    if filename.startswith(BACKEND_DIR):
+        return os.path.relpath(filename, BACKEND_DIR)
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        return filename[marker + len("site-packages") + 1:]
+    return os.path.basename(filename)
+
+
+# ======================================================
+# === Stockage des profils ===
+# ======================================================
+
+class ProfileStore:
+    """Profils enregistrés sur disque (<id>.folded + <id>.json), les `history` plus récents conservés."""
+
+    def __init__(self, directory, history):
+        self.directory = directory
+        self.history = history
+
+    def save(self, profiler, duration, method, path, status):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = uuid.uuid4().hex[:12]
+        summary = {
+            "id": profile_id,
+            "created": datetime.now().isoformat(),
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration": duration,
+            "interval": profiler.interval,
+            "samples": profiler.samples,
+            "by_package": profiler.by_package(),
+        }
+        with open(os.path.join(self.directory, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+            f.write(profiler.folded())
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f)
+        self._prune()
+        return profile_id
+
+    def list(self):
+        """Résumés des profils, du plus récent au plus ancien."""
+        summaries = []
+        for path in self._files(".json"):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(summaries, key=lambda s: s["created"], reverse=True)
+
+    def folded(self, profile_id):
+        """Piles au format folded, ou None si le profil n'existe pas."""
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.folded"), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _files(self, suffix):
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(suffix)]
+
+    def _prune(self):
+        summaries = sorted(self._files(".json"), key=os.path.getmtime, reverse=True)
+        for path in summaries[self.history:]:
+            for suffix in (".json", ".folded"):
+                try:
+                    os.remove(path[:-len(".json")] + suffix)
+                except OSError:
+                    pass
+
+
+def authorized(token, expected):
+    """Vrai si le jeton fourni correspond au jeton d'administration configuré."""
+    return bool(expected) and bool(token) and hmac.compare_digest(token.encode(), expected.encode())
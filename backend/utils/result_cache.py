@@ -0,0 +1,102 @@
+"""
+result_cache.py - Cache des listes de recommandations classées (pagination)
+
+Une liste est calculée une fois en profondeur, puis servie page par page
+depuis ce cache. Elle est stockée sous forme compacte : ids int32 et scores
+float32, soit 8 octets par film. Les entrées expirent après `ttl` secondes
+ou dès que leur génération change : celle de la base (`generation` du
+DatabaseManager) et la version du modèle qui a classé la liste. Au-delà de
+`max_entries`, la moins récemment utilisée est évincée (LRU).
+
+Les curseurs sont opaques pour le client : ils contiennent la position
+dans la liste, une empreinte de la requête et la génération de la liste.
+Un curseur reste donc valide même si l'entrée a été évincée (la liste est
+alors recalculée), mais il est refusé pour une autre requête ou une fois
+les données changées : la liste n'est plus la même, la page suivante
+sauterait ou répéterait des films.
+"""
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import CACHE_REQUESTS, increment
+
+
+class ResultCache:
+    """Listes classées (ids int32 + scores float32) par clé, avec LRU et expiration."""
+
+    def __init__(self, max_entries, ttl, enabled=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, generation):
+        """(ids, scores) en cache pour `key` calculés à cette génération, ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] != generation or time.monotonic() - entry[1] > self.ttl):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        increment(CACHE_REQUESTS, cache="recommendation_pages", result="miss" if entry is None else "hit")
+        return None if entry is None else entry[2]
+
+    def put(self, key, generation, ids, scores):
+        """Enregistre une liste classée et retourne (ids, scores) au format compact."""
+        ranked = (ids.astype("int32"), scores.astype("float32"))
+        if not self.enabled:
+            return ranked
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic(), ranked)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return ranked
+
+    def clear(self):
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ======================================================
+# === Curseurs ===
+# ======================================================
+
+def _fingerprint(key):
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+
+
+def encode_cursor(key, offset, generation):
+    """Curseur opaque de la page qui commence à `offset` dans la liste de `key` à cette génération."""
+    payload = json.dumps({"k": _fingerprint(key), "o": offset, "g": generation}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(key, cursor):
+    """
+    Position et génération encodées dans le curseur
+
+    Returns:
+        tuple: (position, génération de la liste)
+    Raises:
+        ValueError: curseur illisible ou émis pour une autre requête
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        fingerprint, offset, generation = payload["k"], int(payload["o"]), payload["g"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if fingerprint != _fingerprint(key) or offset < 0:
+        raise ValueError("Cursor does not belong to this query")
+    return offset, generation
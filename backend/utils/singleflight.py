@@ -0,0 +1,102 @@
+"""
+singleflight.py - Regroupement des appels identiques simultanés
+
+Quand plusieurs threads demandent le même calcul en même temps, un seul
+l'exécute ; les autres attendent et reçoivent le même résultat.
+"""
+
+import functools
+import inspect
+import threading
+
+from utils.metrics import CACHE_REQUESTS, increment
+
+
+class _Call:
+    """Un calcul en cours, partagé par tous les appelants de la même clé."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Exécute au plus un calcul à la fois par clé."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Exécute fn(*args, **kwargs), ou attend le calcul déjà en cours pour `key`
+
+        Returns:
+            Le résultat du calcul (partagé entre les appelants, à ne pas modifier)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        increment(CACHE_REQUESTS, cache="single_flight", result="miss" if leader else "hit")
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+def _freeze(value):
+    """
+    Valeur d'argument utilisable dans une clé : les séquences (listes, tuples,
+    tableaux numpy, Series...) deviennent des tuples et les ensembles des
+    frozenset, comparés par valeur et non par identité.
+    """
+    if isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if hasattr(value, "tolist") and getattr(value, "ndim", 0) > 0:
+        return _freeze(value.tolist())
+    return value
+
+
+def single_flight(method):
+    """
+    Décorateur de méthode : les appels simultanés avec les mêmes arguments
+    (après application des valeurs par défaut) partagent un seul calcul.
+    Les arguments sont comparés par valeur (voir _freeze) ; un argument non
+    hachable désactive le regroupement pour cet appel.
+    L'instance doit exposer un attribut `_single_flight` (SingleFlight).
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__,) + tuple(_freeze(value) for value in list(bound.arguments.values())[1:])
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        return self._single_flight.do(key, method, self, *args, **kwargs)
+
+    return wrapper
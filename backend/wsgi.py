@@ -0,0 +1,21 @@
+"""
+wsgi.py - Point d'entrée WSGI pour le mode production
+Charge les données et le modèle une seule fois à l'import, avant le fork des workers
+
+Usage :
+    CINEMATCH_ENV=production gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server import app, initialize_system
+from api.routes import register_routes
+
+# Construction synchrone : le modèle doit être prêt avant le fork pour être partagé
+if not initialize_system():
+    raise RuntimeError("Impossible de démarrer le serveur sans données valides")
+
+register_routes(app)